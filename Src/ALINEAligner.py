@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+
+''' a Python port of the ALINE phonetic aligner (Kondrak 2000), as it is run by the bundled ./nusimil binary.
+Words are in ALINE notation: each lower case letter is a segment, and any upper case letters after it modify that segment
+(eg: "cV" is a palato-alveolar c, "aF" is a front a).
+
+Like nusimil, the alignment always starts at the beginning of both words, but can stop anywhere (the rest of both words is left
+unaligned), and there are no compressions/expansions. The score of the best alignment is normalized by the length of the words.
+
+alignmentFeatures.getAlignmentFeatures(s1, s2) uses this to return the same (score, normalizedAlignedConsonants) as running the pair
+through nusimil and then alignmentFeatures.getAlignmentFeaturesFromNusimilOutput. ALINEAligner.alignOneToMany aligns one word
+against many words at once, with numpy, so no intermediate files need to be written.
+'''
+
+import re
+
+import numpy as np
+
+
+C_SKIP = -10 # the score of aligning a segment with nothing
+C_SUB = 35 # the maximum score of aligning two segments
+C_VWL = 10 # taken off for each vowel in a substitution, so that consonants count more
+
+salience = {"syllabic": 5, "place": 40, "manner": 50, "voice": 10, "nasal": 10, "retroflex": 10, "lateral": 10, "aspirated": 5,
+            "high": 5, "back": 5, "round": 5, "long": 5}
+
+consonantFeatures = ["syllabic", "place", "manner", "voice", "nasal", "retroflex", "lateral", "aspirated"]
+vowelFeatures = ["syllabic", "nasal", "retroflex", "high", "back", "round", "long"]
+allFeatures = sorted(salience)
+
+place = {"bilabial": 1.0, "labiodental": 0.95, "dental": 0.9, "alveolar": 0.85, "retroflex": 0.8, "palato-alveolar": 0.75,
+         "palatal": 0.7, "velar": 0.6, "uvular": 0.5, "pharyngeal": 0.3, "glottal": 0.1,
+         "labiovelar": (1.0, 0.6)} # both bilabial and velar, whichever is closer
+manner = {"stop": 1.0, "affricate": 0.9, "fricative": 0.8, "approximant": 0.6, "high vowel": 0.4, "mid vowel": 0.2, "low vowel": 0.0}
+high = {"high": 1.0, "mid": 0.5, "low": 0.0}
+back = {"front": 1.0, "central": 0.5, "back": 0.0}
+
+
+def consonant(placeName, mannerName, voice=0.0, **features):
+    return dict(place=place[placeName], manner=manner[mannerName], voice=voice, **features)
+
+def vowel(placeName, mannerName, highName, backName, syllabic=1.0, **features):
+    return dict(place=place[placeName], manner=manner[mannerName], high=high[highName], back=back[backName], syllabic=syllabic,
+                voice=1.0, **features)
+
+
+# the features of each letter. Any feature not given is 0
+letterFeatures = {
+    "a": vowel("velar", "low vowel", "low", "central"),
+    "b": consonant("bilabial", "stop", voice=1.0),
+    "c": consonant("alveolar", "affricate"),
+    "d": consonant("alveolar", "stop", voice=1.0),
+    "e": vowel("palatal", "mid vowel", "mid", "front"),
+    "f": consonant("labiodental", "fricative"),
+    "g": consonant("velar", "stop", voice=1.0),
+    "h": consonant("glottal", "fricative"),
+    "i": vowel("palatal", "high vowel", "high", "front"),
+    "j": consonant("alveolar", "affricate", voice=1.0),
+    "k": consonant("velar", "stop"),
+    "l": consonant("alveolar", "approximant", voice=1.0, lateral=1.0),
+    "m": consonant("bilabial", "stop", voice=1.0, nasal=1.0),
+    "n": consonant("alveolar", "stop", voice=1.0, nasal=1.0),
+    "o": vowel("velar", "mid vowel", "mid", "back", round=1.0),
+    "p": consonant("bilabial", "stop"),
+    "q": consonant("glottal", "stop"),
+    "r": consonant("retroflex", "approximant", voice=1.0, retroflex=1.0),
+    "s": consonant("alveolar", "fricative"),
+    "t": consonant("alveolar", "stop"),
+    "u": vowel("velar", "high vowel", "high", "back", round=1.0),
+    "v": consonant("labiodental", "fricative", voice=1.0),
+    "w": vowel("labiovelar", "high vowel", "high", "back", syllabic=0.0, round=1.0),
+    "x": consonant("velar", "fricative"),
+    "y": vowel("palatal", "high vowel", "high", "front", syllabic=0.0),
+    "z": consonant("alveolar", "fricative", voice=1.0),
+}
+
+# the upper case modifiers, and the feature values they set
+modifiers = {
+    "A": {"aspirated": 1.0},
+    "B": {"back": back["back"]},
+    "C": {"back": back["central"]},
+    "D": {"place": place["dental"]},
+    "F": {"back": back["front"]},
+    "G": {},
+    "H": {"long": 1.0},
+    "L": {},
+    "N": {"nasal": 1.0},
+    "P": {"place": place["palatal"]},
+    "Q": {},
+    "R": {"round": 1.0},
+    "S": {"manner": manner["fricative"]},
+    "T": {"lateral": 1.0},
+    "U": {"place": place["uvular"]},
+    "V": {"place": place["palato-alveolar"]},
+    "X": {"retroflex": 1.0},
+    "Y": {"voice": 1.3},
+}
+
+segmentRegex = re.compile("[^A-Z][A-Z]*")
+
+
+def getSegments(alineWord):
+    ''' splits an ALINE word into its segments, eg: "acVaF" -> ["a", "cV", "aF"] '''
+    return segmentRegex.findall(alineWord)
+
+
+def getFeatures(segment):
+    ''' returns the dict of feature values of the segment (a letter followed by any modifiers) '''
+    features = dict.fromkeys(allFeatures, 0.0)
+    features.update(letterFeatures[segment[0]])
+    for modifier in segment[1:]:
+        features.update(modifiers[modifier])
+    return features
+
+
+def isVowel(features):
+    # glides (w and y) count as vowels too
+    return features["manner"] <= manner["high vowel"]
+
+
+def delta(features1, features2):
+    ''' the weighted difference between two segments. Only the vowel features are compared between two vowels '''
+    if isVowel(features1) and isVowel(features2):
+        featureNames = vowelFeatures
+    else:
+        featureNames = consonantFeatures
+    return sum(featureDifference(name, features1[name], features2[name]) * salience[name] for name in featureNames)
+
+
+def featureDifference(name, value1, value2):
+    if name == "place" and (isinstance(value1, tuple) or isinstance(value2, tuple)):
+        # a double articulation is as close as its closest place
+        places1 = value1 if isinstance(value1, tuple) else (value1,)
+        places2 = value2 if isinstance(value2, tuple) else (value2,)
+        return min(abs(place1 - place2) for place1 in places1 for place2 in places2)
+    return abs(value1 - value2)
+
+
+def sigmaSub(segment1, segment2):
+    ''' the score of aligning the two segments '''
+    features1 = getFeatures(segment1)
+    features2 = getFeatures(segment2)
+    score = C_SUB - delta(features1, features2) - C_VWL * isVowel(features1) - C_VWL * isVowel(features2)
+    return round(score, 4) # so that eg: 0.15 * 40 is exactly 6, and equal alignments tie like they do in nusimil
+
+
+def normalizeScore(score, length1, length2):
+    ''' divides the alignment score by the score of two perfectly matching consonants for each segment of the average word length.
+    Worked out in single precision and rounded to the 6 significant digits that nusimil prints '''
+    if length1 + length2 == 0:
+        return 0.0
+    normalized = np.float32(score) / np.float32(C_SUB * (length1 + length2) / 2)
+    return float("{0:g}".format(normalized))
+
+
+
+class ALINEAligner(object):
+    ''' aligns words in ALINE notation. The segments of every word, and the substitution scores between every two segments,
+    are cached so that aligning the same words again (eg: every word of one language against every word of another) is cheap '''
+
+    def __init__(self, batchSize=4096):
+        self.batchSize = batchSize # the most other words aligned at once by alignOneToMany, which bounds the size of its score matrices
+        self.segmentToID = {} # maps a segment (eg: "cV") to its row and column in self.subScores
+        self.segments = []
+        self.subScores = np.zeros((0, 0))
+        self.wordToSegmentIDs = {}
+
+
+    def getSegmentIDs(self, alineWord):
+        segmentIDs = self.wordToSegmentIDs.get(alineWord)
+        if segmentIDs is None:
+            segments = getSegments(alineWord)
+            newSegments = [segment for segment in set(segments) if segment not in self.segmentToID]
+            if newSegments:
+                self.addSegments(newSegments)
+            segmentIDs = np.array([self.segmentToID[segment] for segment in segments], dtype=np.intp)
+            self.wordToSegmentIDs[alineWord] = segmentIDs
+        return segmentIDs
+
+
+    def addSegments(self, newSegments):
+        for segment in sorted(newSegments):
+            self.segmentToID[segment] = len(self.segments)
+            self.segments.append(segment)
+        self.subScores = np.array([[sigmaSub(segment1, segment2) for segment2 in self.segments] for segment1 in self.segments])
+
+
+    def align(self, word1, word2):
+        ''' returns (score, alignment) of the two ALINE words, like alignOneToMany '''
+        return self.alignOneToMany(word1, [word2])[0]
+
+
+    def alignOneToMany(self, word, otherWords, threshold=None):
+        ''' aligns the ALINE word against each of the other ALINE words. Returns a list of (score, alignment) for each other word,
+        where alignment is the pair of lists of segments that nusimil prints for the best alignment (see getAlignmentLines).
+        The alignment is only worked out for the words that score above the threshold (it is None for the rest) '''
+        segmentIDs = self.getSegmentIDs(word)
+        results = []
+        for start in range(0, len(otherWords), self.batchSize):
+            otherSegmentIDs = [self.getSegmentIDs(otherWord) for otherWord in otherWords[start:start + self.batchSize]]
+            results.extend(self.alignBatch(segmentIDs, otherSegmentIDs, threshold))
+        return results
+
+
+    def alignBatch(self, segmentIDs, otherSegmentIDs, threshold):
+        otherLengths = np.array([len(otherIDs) for otherIDs in otherSegmentIDs])
+        numOthers = len(otherSegmentIDs)
+        length = len(segmentIDs)
+        maxLength = int(otherLengths.max())
+
+        # the other words padded to the same length. The scores past the end of a word are ignored
+        padded = np.zeros((numOthers, maxLength), dtype=np.intp)
+        for k, otherIDs in enumerate(otherSegmentIDs):
+            padded[k, :len(otherIDs)] = otherIDs
+
+        # scores[k, i, j] is the best score of aligning the first i segments of the word and the first j segments of other word k.
+        # Alignments always start at the start of both words, so the first row and column are all skips
+        skipRow = C_SKIP * np.arange(maxLength + 1)
+        scores = np.empty((numOthers, length + 1, maxLength + 1))
+        scores[:, 0, :] = skipRow
+        for i in range(1, length + 1):
+            fromAbove = np.empty((numOthers, maxLength + 1))
+            fromAbove[:, 0] = C_SKIP * i
+            np.maximum(scores[:, i-1, 1:] + C_SKIP, scores[:, i-1, :-1] + self.subScores[segmentIDs[i-1]][padded], out=fromAbove[:, 1:])
+            # skipping segments of the other word carries a score along the row: the best of fromAbove[:, k] + C_SKIP * (j - k)
+            scores[:, i, :] = np.maximum.accumulate(fromAbove - skipRow, axis=1) + skipRow
+
+        # the alignment can stop anywhere, so the score is the best cell (which is at least the 0 of aligning nothing)
+        scores[np.arange(maxLength + 1) > otherLengths[:, None, None].repeat(length + 1, axis=1)] = -np.inf
+        bestScores = scores.reshape(numOthers, -1).max(axis=1)
+
+        results = []
+        for k in range(numOthers):
+            score = normalizeScore(bestScores[k], length, otherLengths[k])
+            alignment = None
+            if threshold is None or score > threshold:
+                alignment = self.getAlignmentLines(segmentIDs, otherSegmentIDs[k])
+            results.append((score, alignment))
+        return results
+
+
+    def getAlignmentLines(self, segmentIDs1, segmentIDs2):
+        ''' finds the best alignment of the two words the same way nusimil does, so that equally good alignments are broken the same
+        way. Returns the two lines that nusimil prints, split on whitespace: the aligned segments between "|"s ("-" for a skip),
+        followed by the unaligned rest of both words '''
+        # nusimil works backwards from the ends of the words: suffixScores[i, j] is the best score of aligning (the start of) the
+        # last i segments of word 1 with the last j segments of word 2, or 0 for aligning nothing. In hundredths, like nusimil
+        length1, length2 = len(segmentIDs1), len(segmentIDs2)
+        subScores = np.rint(self.subScores[np.ix_(segmentIDs1[::-1], segmentIDs2[::-1])] * 100).astype(int).tolist()
+        skip = C_SKIP * 100
+        suffixScores = [[0] * (length2 + 1) for i in range(length1 + 1)]
+        for i in range(1, length1 + 1):
+            row, previousRow, rowSubScores = suffixScores[i], suffixScores[i-1], subScores[i-1]
+            for j in range(1, length2 + 1):
+                row[j] = max(previousRow[j] + skip, row[j-1] + skip, previousRow[j-1] + rowSubScores[j-1], 0)
+
+        # then takes the first move that can still make the best score: a substitution, then a skip in word 2, then a skip in
+        # word 1, and otherwise stops
+        target = suffixScores[length1][length2]
+        i, j, score = length1, length2, 0
+        aligned1 = []
+        aligned2 = []
+        while i > 0 and j > 0:
+            if suffixScores[i-1][j-1] + subScores[i-1][j-1] + score >= target:
+                score += subScores[i-1][j-1]
+                aligned1.append(self.segments[segmentIDs1[length1 - i]])
+                aligned2.append(self.segments[segmentIDs2[length2 - j]])
+                i -= 1
+                j -= 1
+            elif suffixScores[i][j-1] + skip + score >= target:
+                score += skip
+                aligned1.append("-")
+                aligned2.append(self.segments[segmentIDs2[length2 - j]])
+                j -= 1
+            elif suffixScores[i-1][j] + skip + score >= target:
+                score += skip
+                aligned1.append(self.segments[segmentIDs1[length1 - i]])
+                aligned2.append("-")
+                i -= 1
+            else:
+                break
+        rest1 = [self.segments[segmentID] for segmentID in segmentIDs1[length1 - i:]]
+        rest2 = [self.segments[segmentID] for segmentID in segmentIDs2[length2 - j:]]
+        line1 = ["|"] + aligned1 + ["|"] + rest1 + ["-"] * len(rest2)
+        line2 = ["|"] + aligned2 + ["|"] + ["-"] * len(rest1) + rest2
+        return line1, line2
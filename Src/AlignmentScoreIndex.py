@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+
+''' a memory-mapped index of the alignment features binary files (see binaryReadAndWrite.py), so that the scores of a word pair can be looked up
+without first reading the whole file into a dict.
+
+For each alignment features file "name.bin" an index file "name.bin.idx" is built once (and again whenever the .bin file is newer). It holds:
+    header   - the signature, the number of pairs and the length of the words blob
+    hashes   - uint64, the hash of each pair (see getPairHashes), sorted. The two words are taken in the canonical order
+               (see binaryReadAndWrite.getCanonicalPair), so a pair can be found with one search whichever order it is asked for in
+    checks   - uint64, a second hash of each pair, independent of the first, that tells apart the pairs with the same hash
+    offsets  - uint64, the words of pair i are at offsets[i]:offsets[i+1] in the words blob
+    scores   - float32 (numPairs, 2), the ALINE score and normalized aligned consonants of each pair
+    swapped  - uint8, 1 if the pair was aligned (and written) in the other order than the canonical one
+    words    - the "aline1\\0aline2" bytes of every pair, in the canonical order and the same order as the hashes
+The normalized aligned consonants depend on the order the words were aligned in, so a file can have a pair in both orders with different
+scores. Both are found by the same search, and the one that was aligned in the order asked for is used if there is one, like the baseline
+lookup of (aline1, aline2) and then (aline2, aline1).
+
+The hash and check of a pair are made from a 128 bit hash of each of its words, so the words of a batch (eg: all the partners of a word in
+GeneralFeaturizer.featurizeBatch) are each hashed once and all their pairs are looked up with one vectorised search (see getPairs).
+
+AlignmentScoreIndex puts the tables of all its files together into one, keeping for each pair (and order it was aligned in) the scores of the
+last file it is in, so a lookup is a single binary search however many files there are. With one file the table is the mapped index file
+itself, so forked processes all share the same pages, and pickling an index (eg: for a spawned process) only sends the file names.
+
+AlignmentScoreIndex can be used in place of the dict from binaryReadAndWrite.readFromBinary, eg: by alignmentFeatures.lookUpWordPairStrict.
+
+example run (builds the index files ahead of time):
+./AlignmentScoreIndex.py ../Output/AlignmentValues/alignment_features_*_0.35Threshold.bin
+
+'''
+
+from bisect import bisect_left
+from hashlib import blake2b
+import os
+from struct import Struct
+import sys
+
+import numpy as np
+
+import binaryReadAndWrite
+
+
+INDEX_SIGNATURE = b"ALNIDX04" # 04: the pairs are hashed from the hashes of their words, with a second hash to check them
+headerStruct = Struct('<8sQQ') # the signature, the number of pairs, and the length of the words blob
+
+UINT64_MASK = (1 << 64) - 1
+PAIR_MULTIPLIER = 0x9E3779B97F4A7C15 # odd, so that the hash of the first word is mixed into every bit above its lowest set one
+
+
+def getIndexFileName(alignFeaturesFile):
+    return alignFeaturesFile + ".idx"
+
+
+def hashWord(aline):
+    ''' the two 64 bit halves of a 128 bit hash of the ALINE string, which are the same in every process (unlike the built-in hash) '''
+    digest = blake2b(aline.encode("ASCII"), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little')
+
+
+def mixHashes(firstHash, secondHash):
+    ''' the hash of a pair from the hashes of its two words, which depends on their order. The word hashes are random, so two different
+    pairs have the same hash with a chance of 1 in 2^64, and the hashes only need to be sorted and searched, not spread over buckets '''
+    return (firstHash * PAIR_MULTIPLIER + secondHash) & UINT64_MASK
+
+
+def mixHashArrays(firstHashes, secondHashes):
+    ''' mixHashes of uint64 arrays (the products wrap around at 64 bits like the masked ones do) '''
+    return firstHashes * np.uint64(PAIR_MULTIPLIER) + secondHashes
+
+
+def getPairHashes(wordHashes1, wordHashes2):
+    ''' the (hash, check) of a pair in the canonical order, from the hashWord of its two words '''
+    return mixHashes(wordHashes1[0], wordHashes2[0]), mixHashes(wordHashes1[1], wordHashes2[1])
+
+
+def buildIndexFile(alignFeaturesFile, indexFileName=None):
+    ''' writes the index file for the given alignment features file '''
+    if indexFileName is None:
+        indexFileName = getIndexFileName(alignFeaturesFile)
+
+    scoresDict = binaryReadAndWrite.readFromBinary(alignFeaturesFile) # the keys are in the order each pair was aligned in
+    canonicalPairs = [binaryReadAndWrite.getCanonicalPair(*wordTuple) for wordTuple in scoresDict]
+    swapped = np.array([canonicalPair != wordTuple for canonicalPair, wordTuple in zip(canonicalPairs, scoresDict)], dtype=np.uint8)
+    wordHashes = {}
+    for canonicalPair in canonicalPairs:
+        for word in canonicalPair:
+            if word not in wordHashes:
+                wordHashes[word] = hashWord(word.decode("ASCII"))
+    pairHashes = [getPairHashes(wordHashes[word1], wordHashes[word2]) for word1, word2 in canonicalPairs]
+    hashes = np.array([pairHash for pairHash, check in pairHashes], dtype=np.uint64)
+    checks = np.array([check for pairHash, check in pairHashes], dtype=np.uint64)
+    order = np.lexsort((swapped, checks, hashes))
+    wordPairs = [b"\x00".join(canonicalPairs[i]) for i in order.tolist()]
+    offsets = np.zeros(len(wordPairs) + 1, dtype=np.uint64)
+    offsets[1:] = np.cumsum([len(wordPair) for wordPair in wordPairs])
+    scores = np.array(list(scoresDict.values()), dtype=np.float32).reshape(-1, 2)[order]
+    words = b"".join(wordPairs)
+
+    # written under another name and then renamed, so that a process never sees half an index. The name has the process ID, so that two
+    # processes building the same index at once don't write to the same file
+    partFileName = "{0}.{1}.part".format(indexFileName, os.getpid())
+    with open(partFileName, 'wb') as file:
+        file.write(headerStruct.pack(INDEX_SIGNATURE, len(wordPairs), len(words)))
+        file.write(hashes[order].astype('<u8').tobytes())
+        file.write(checks[order].astype('<u8').tobytes())
+        file.write(offsets.astype('<u8').tobytes())
+        file.write(scores.astype('<f4').tobytes())
+        file.write(swapped[order].tobytes())
+        file.write(words)
+    os.replace(partFileName, indexFileName)
+
+
+def isIndexFileCurrent(alignFeaturesFile, indexFileName):
+    if not os.path.exists(indexFileName) or os.path.getmtime(indexFileName) < os.path.getmtime(alignFeaturesFile):
+        return False
+    with open(indexFileName, 'rb') as file:
+        return file.read(len(INDEX_SIGNATURE)) == INDEX_SIGNATURE # an index from an older version is built again
+
+
+
+class AlignmentScoreIndexFile(object):
+    ''' the memory-mapped index of one alignment features file '''
+
+    def __init__(self, alignFeaturesFile):
+        self.alignFeaturesFile = alignFeaturesFile
+        indexFileName = getIndexFileName(alignFeaturesFile)
+        if not isIndexFileCurrent(alignFeaturesFile, indexFileName):
+            sys.stderr.write("building the index of alignment file {0}...\n".format(alignFeaturesFile))
+            buildIndexFile(alignFeaturesFile, indexFileName)
+        self.openIndexFile(indexFileName)
+
+
+    def openIndexFile(self, indexFileName):
+        content = np.memmap(indexFileName, dtype=np.uint8, mode='r')
+        signature, self.numPairs, wordsLength = headerStruct.unpack(content[:headerStruct.size].tobytes())
+        if signature != INDEX_SIGNATURE:
+            sys.stderr.write("{0} is not an alignment score index file!\n".format(indexFileName))
+            exit(-1)
+        start = headerStruct.size
+        self.hashes = content[start : start + 8*self.numPairs].view('<u8')
+        start += 8*self.numPairs
+        self.checks = content[start : start + 8*self.numPairs].view('<u8')
+        start += 8*self.numPairs
+        self.offsets = content[start : start + 8*(self.numPairs + 1)].view('<u8')
+        start += 8*(self.numPairs + 1)
+        self.scores = content[start : start + 8*self.numPairs].view('<f4').reshape(-1, 2)
+        start += 8*self.numPairs
+        self.swapped = content[start : start + self.numPairs]
+        start += self.numPairs
+        self.words = content[start : start + wordsLength]
+
+
+    # only the file name is pickled; the index is mapped again when unpickled
+    def __getstate__(self):
+        return {"alignFeaturesFile": self.alignFeaturesFile}
+
+    def __setstate__(self, state):
+        self.__init__(state["alignFeaturesFile"])
+
+
+    def __len__(self):
+        return self.numPairs
+
+
+    def iterPairs(self):
+        ''' yields (aline1, aline2, alineScore, consScore) for every pair in the file, in the order it was aligned in '''
+        words = self.words.tobytes().decode("ASCII")
+        offsets = self.offsets.tolist()
+        for i, ((alineScore, consScore), swapped) in enumerate(zip(self.scores.tolist(), self.swapped.tolist())):
+            aline1, aline2 = words[offsets[i]:offsets[i+1]].split("\x00")
+            if swapped:
+                aline1, aline2 = aline2, aline1
+            yield aline1, aline2, alineScore, consScore
+
+
+
+class AlignmentScoreIndex(object):
+    ''' looks up word pairs in any number of alignment features files, without reading them into memory. Can be used like the scores dict
+    from binaryReadAndWrite.readFromBinary: keys are (aline1, aline2) tuples of bytes, and values are (alineScore, consScore). Like dict.update,
+    a pair in a later file takes the place of the same pair in an earlier one '''
+
+    def __init__(self, alignFeaturesFiles=()):
+        self.indexFiles = []
+        self.wordHashes = {} # the hashWord of each ALINE string looked up so far
+        self.table = None # the (hashes, checks, swapped, scores) of all the files, made when it is first needed
+        self.tableViews = None # memoryviews of the table, which are quicker than the arrays to look up a single pair in
+        for alignFeaturesFile in alignFeaturesFiles:
+            self.addFile(alignFeaturesFile)
+
+
+    def addFile(self, alignFeaturesFile):
+        self.indexFiles.append(AlignmentScoreIndexFile(alignFeaturesFile))
+        self.table = self.tableViews = None
+
+
+    # only the file names are pickled; the files are mapped again when unpickled
+    def __getstate__(self):
+        return {"alignFeaturesFiles": [indexFile.alignFeaturesFile for indexFile in self.indexFiles]}
+
+    def __setstate__(self, state):
+        self.__init__(state["alignFeaturesFiles"])
+
+
+    def getTable(self):
+        if self.table is None:
+            self.table = self.createTable()
+            hashes, checks, swapped, scores = self.table
+            self.tableViews = memoryview(hashes), memoryview(checks), memoryview(swapped), memoryview(scores.reshape(-1))
+        return self.table
+
+
+    def createTable(self):
+        ''' returns the (hashes, checks, swapped, scores) of the pairs of all the files, sorted by hash, check and swapped like in an index
+        file. Of a pair that is in several files in the same order, only the one in the last file is kept '''
+        if len(self.indexFiles) == 1:
+            indexFile = self.indexFiles[0]
+            return indexFile.hashes, indexFile.checks, indexFile.swapped, indexFile.scores
+        if not self.indexFiles:
+            return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.uint8), np.zeros((0, 2), dtype=np.float32)
+
+        hashes = np.concatenate([indexFile.hashes for indexFile in self.indexFiles])
+        checks = np.concatenate([indexFile.checks for indexFile in self.indexFiles])
+        swapped = np.concatenate([indexFile.swapped for indexFile in self.indexFiles])
+        fileNumbers = np.concatenate([np.full(len(indexFile), n) for n, indexFile in enumerate(self.indexFiles)])
+        order = np.lexsort((fileNumbers, swapped, checks, hashes))
+        hashes, checks, swapped = hashes[order], checks[order], swapped[order]
+        # the last of each run of the same pair in the same order is the one from the last file
+        isLast = np.ones(len(order), dtype=bool)
+        isLast[:-1] = (hashes[1:] != hashes[:-1]) | (checks[1:] != checks[:-1]) | (swapped[1:] != swapped[:-1])
+        scores = np.concatenate([indexFile.scores for indexFile in self.indexFiles])[order[isLast]]
+        return hashes[isLast], checks[isLast], swapped[isLast], scores
+
+
+    def __len__(self):
+        return len(self.getTable()[0])
+
+
+    def iterPairs(self):
+        ''' yields (aline1, aline2, alineScore, consScore) for every pair of every file (so a pair in several files is given for each of them) '''
+        for indexFile in self.indexFiles:
+            yield from indexFile.iterPairs()
+
+
+    def getWordHashes(self, aline):
+        wordHashes = self.wordHashes.get(aline)
+        if wordHashes is None:
+            wordHashes = self.wordHashes[aline] = hashWord(aline)
+        return wordHashes
+
+
+    def get(self, wordTuple, default=None):
+        ''' returns the (alineScore, consScore) of the (aline1, aline2) bytes tuple (see getPair), or default if the pair isn't in any file '''
+        word1, word2 = wordTuple
+        return self.getPair(word1.decode("ASCII"), word2.decode("ASCII"), default)
+
+
+    def getPair(self, aline1, aline2, default=None):
+        ''' returns the (alineScore, consScore) of the two ALINE strings, from a file where the pair was aligned in the order given, and
+        otherwise from one where it was aligned in the other order, or default if the pair isn't in any file '''
+        swapped = aline2 < aline1
+        if swapped:
+            pairHash, check = getPairHashes(self.getWordHashes(aline2), self.getWordHashes(aline1))
+        else:
+            pairHash, check = getPairHashes(self.getWordHashes(aline1), self.getWordHashes(aline2))
+        self.getTable()
+        hashes, checks, swappedFlags, scores = self.tableViews
+        otherScores = None
+        i = bisect_left(hashes, pairHash)
+        while i < len(hashes) and hashes[i] == pairHash:
+            if checks[i] == check:
+                alineScore, consScore = scores[2*i], scores[2*i + 1]
+                # a pair of a word with itself is the same in both orders
+                if bool(swappedFlags[i]) == swapped or aline1 == aline2:
+                    return alineScore, consScore
+                otherScores = (alineScore, consScore)
+            i += 1
+        return default if otherScores is None else otherScores
+
+
+    def getPairs(self, aline1, alines2):
+        ''' looks up the pairs of aline1 with each of the alines2 at once, and returns the (alineScore, consScore) of each pair as a float64
+        array of shape (len(alines2), 2), along with a boolean array of which pairs were found. The scores are those getPair gives '''
+        hashes, checks, swappedFlags, scores = self.getTable()
+        pairScores = np.zeros((len(alines2), 2))
+        if len(hashes) == 0:
+            return pairScores, np.zeros(len(alines2), dtype=bool)
+        wordHashes1 = self.getWordHashes(aline1)
+        wordHashes2 = np.array([self.getWordHashes(aline2) for aline2 in alines2], dtype=np.uint64).reshape(-1, 2)
+        swapped = np.array([aline2 < aline1 for aline2 in alines2], dtype=bool)
+        sameWord = np.array([aline2 == aline1 for aline2 in alines2], dtype=bool)
+        firstHashes = np.where(swapped[:, None], wordHashes2, np.array(wordHashes1, dtype=np.uint64))
+        secondHashes = np.where(swapped[:, None], np.array(wordHashes1, dtype=np.uint64), wordHashes2)
+        pairHashes = mixHashArrays(firstHashes[:, 0], secondHashes[:, 0])
+        pairChecks = mixHashArrays(firstHashes[:, 1], secondHashes[:, 1])
+
+        # a pair is in at most two places, one after the other: aligned in the canonical order, and then in the other order
+        starts = np.searchsorted(hashes, pairHashes)
+        rows = []
+        matches = []
+        forwards = []
+        for offset in range(2):
+            row = np.minimum(starts + offset, len(hashes) - 1)
+            match = (starts + offset < len(hashes)) & (hashes[row] == pairHashes) & (checks[row] == pairChecks)
+            rows.append(row)
+            matches.append(match)
+            forwards.append(match & ((swappedFlags[row].astype(bool) == swapped) | sameWord))
+
+        found = matches[0] | matches[1]
+        # the scores aligned in the order asked for are used if there are any
+        useSecond = forwards[1] | (~forwards[0] & ~matches[0] & matches[1])
+        pairScores[found] = scores[np.where(useSecond, rows[1], rows[0])[found]]
+
+        # another pair with the same hash (and a different check) can be in the way, which happens too rarely to be worth vectorising
+        lastRow = np.minimum(starts + 2, len(hashes) - 1)
+        blocked = ((starts < len(hashes)) & (hashes[rows[0]] == pairHashes) & ~matches[0]) | \
+                  ((starts + 2 < len(hashes)) & (hashes[lastRow] == pairHashes))
+        for k in blocked.nonzero()[0].tolist():
+            pairScore = self.getPair(aline1, alines2[k])
+            found[k] = pairScore is not None
+            pairScores[k] = pairScore if pairScore is not None else (0.0, 0.0)
+        return pairScores, found
+
+
+    def __contains__(self, wordTuple):
+        return self.get(wordTuple) is not None
+
+
+    def __getitem__(self, wordTuple):
+        scores = self.get(wordTuple)
+        if scores is None:
+            raise KeyError(wordTuple)
+        return scores
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    parser = optparse.OptionParser(usage="%prog alignmentFeaturesFile(s)")
+    parser.add_option('-f', action='store_true', dest='force', help="rebuild the index files even if they are up to date.", default=False)
+
+    options, args = parser.parse_args()
+
+    if len(args) == 0:
+        parser.print_help()
+        exit(-1)
+
+    for alignFeaturesFile in args:
+        if options.force or not isIndexFileCurrent(alignFeaturesFile, getIndexFileName(alignFeaturesFile)):
+            buildIndexFile(alignFeaturesFile)
+            sys.stderr.write("built the index of {0}\n".format(alignFeaturesFile))
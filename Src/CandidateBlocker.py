@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+
+''' finds the candidate pairs between the words of two language dictionaries, so that the rest of the words1 x words2 cross product never needs to
+be visited. Words are referred to by their index in the sorted word list of their dictionary (the order the runners go through them in), and
+getCandidates(i) returns the sorted indices of the words2 that word i of words1 is paired with. As elsewhere, when both dictionaries are the same
+language a word is only paired with the words after it.
+
+There are three kinds of blocking:
+    AlignmentThresholdBlocker - exact. The pairs are the ones whose ALINE score in the alignment features file(s) is above the threshold,
+                                found through the ALINE forms of the words. These are exactly the pairs that pass
+                                RunnerForLangDicts.belowThreshold, but found in time linear in the number of them.
+    KeyBlocker                - approximate, for when there are no alignment scores yet. Each word gets keys, and words are paired if they
+                                share at least minSharedKeys of them. The key types are:
+                                    sound       - bigrams of the consonant skeleton of the ASJP word, in coarse places of articulation
+                                    definition  - the content words of the cleaned definitions
+                                    firstLetter - the first letter of the ASJP word (how findIdenticalDefs.py splits up its sets)
+    SemanticNeighbourBlocker  - approximate. Each word is paired with the numNeighbours words whose definitions are nearest to its own in the
+                                word2vec space, so pairs with similar meanings can be featurized even when they sound too different to pass
+                                the ALINE threshold. Each cleaned split definition gets the unit mean vector of its content words, the
+                                similarity of two words is the best cosine between their vectors, and the nearest neighbours are looked for
+                                among the words that share a bucket of a random projection LSH (numTables hashes of numBits hyperplanes each)
+                                rather than among all the words.
+UnionBlocker pairs the words that any of the given blockers pair, eg: the pairs above the ALINE threshold along with the semantic neighbours.
+
+run as a script it reports, for each pair of Algonquian languages, how much of the cross product is left and the recall of the gold cognate pairs:
+./CandidateBlocker.py -k sound,definition -a ../Output/AlignmentValues -t 0.35 -s 10 -v ../Data/GoogleNews-vectors-negative300.bin.gz
+
+'''
+
+from collections import defaultdict, Counter
+import sys
+
+import numpy as np
+
+from UniToASJPConverter import uniToASJP
+from UniToALINEConverter import uniToALINE
+import DefinitionCleaner
+
+
+# the places of articulation that the ASJP consonants are grouped into for the sound keys, since the consonants of cognates often differ
+# within a place (eg: Cree s and Fox š) but rarely across places
+coarsePlaces = {}
+for consonant in "pbfvmw":
+    coarsePlaces[consonant] = "P" # labial
+for consonant in "84tdszcnrlSZCjT5L":
+    coarsePlaces[consonant] = "T" # coronal
+for consonant in "kgxNqGXy":
+    coarsePlaces[consonant] = "K" # dorsal
+for consonant in "h7":
+    coarsePlaces[consonant] = "H" # glottal
+
+keyTypes = ["sound", "definition", "firstLetter"]
+
+
+def getSoundKeys(asjp):
+    skeleton = "".join(coarsePlaces[letter] for letter in asjp if letter in coarsePlaces)
+    if len(skeleton) < 2:
+        return {"S" + skeleton}
+    return {"S" + skeleton[i:i+2] for i in range(len(skeleton) - 1)}
+
+
+def getDefinitionKeys(definitions, stopWords):
+    keys = set()
+    for defn in definitions:
+        for cleanDef in DefinitionCleaner.definitionCleanAndSplit(defn):
+            for word in cleanDef.lower().split():
+                if len(word) > 2 and word not in stopWords:
+                    keys.add("D" + word)
+    return keys
+
+
+def getFirstLetterKeys(asjp):
+    return {"F" + asjp[:1]}
+
+
+def getDefinitionVectors(definitions, model, stopWords):
+    ''' returns the unit mean vectors of the content words (that are in the model) of each cleaned split definition, as the rows of a float32
+    matrix. The split definitions with none of their content words in the model have no row '''
+    vectors = []
+    for defn in definitions:
+        for cleanDef in DefinitionCleaner.definitionCleanAndSplit(defn):
+            wordsInModel = [word for word in cleanDef.split() if word not in stopWords and word in model]
+            if wordsInModel:
+                meanVector = np.mean([model[word] for word in wordsInModel], axis=0, dtype=np.float32)
+                norm = np.linalg.norm(meanVector)
+                if norm > 0:
+                    vectors.append(meanVector / norm)
+    return np.array(vectors, dtype=np.float32).reshape(-1, model.vector_size)
+
+
+
+class CandidateBlocker(object):
+    ''' the base class. Subclasses fill in self.candidates: for each index of words1, the sorted list of candidate indices of words2 '''
+
+    def __init__(self, langDict1, langDict2, sameLanguage):
+        self.words1 = sorted(langDict1)
+        self.words2 = sorted(langDict2)
+        self.sameLanguage = sameLanguage
+        self.candidates = [[] for word1 in self.words1]
+
+
+    def getCandidates(self, i):
+        return self.candidates[i]
+
+
+    def iterCandidatePairs(self):
+        ''' yields (word1, word2) for every candidate pair, in the same order as going through the full cross product '''
+        for i, word1 in enumerate(self.words1):
+            for j in self.candidates[i]:
+                yield word1, self.words2[j]
+
+
+    def __len__(self):
+        return sum(len(candidates) for candidates in self.candidates)
+
+
+    def getCrossProductSize(self):
+        if self.sameLanguage:
+            return len(self.words1) * (len(self.words1) - 1) // 2
+        return len(self.words1) * len(self.words2)
+
+
+    def setCandidates(self, i, indices):
+        if self.sameLanguage:
+            indices = (j for j in indices if j > i)
+        self.candidates[i] = sorted(indices)
+
+
+
+class KeyBlocker(CandidateBlocker):
+    ''' pairs the words that share at least minSharedKeys keys of the given types (see the top of this module) '''
+
+    def __init__(self, langDict1, langDict2, sameLanguage, useKeyTypes=("sound", "definition"), minSharedKeys=1, stopWords=None):
+        super().__init__(langDict1, langDict2, sameLanguage)
+        if "definition" in useKeyTypes and stopWords is None:
+            from StopWords import EnglishStopWords
+            stopWords = EnglishStopWords()
+        self.useKeyTypes = useKeyTypes
+        self.stopWords = stopWords
+
+        # an inverted index from each key to the words2 that have it, so each word1 only meets the words2 it shares a key with
+        keyToIndices = defaultdict(list)
+        for j, word2 in enumerate(self.words2):
+            for key in self.getKeys(word2, langDict2[word2]):
+                keyToIndices[key].append(j)
+
+        for i, word1 in enumerate(self.words1):
+            keys = self.getKeys(word1, langDict1[word1])
+            if minSharedKeys <= 1:
+                indices = set()
+                for key in keys:
+                    indices.update(keyToIndices.get(key, ()))
+            else:
+                numShared = Counter()
+                for key in keys:
+                    numShared.update(keyToIndices.get(key, ()))
+                indices = [j for j, count in numShared.items() if count >= minSharedKeys]
+            self.setCandidates(i, indices)
+
+
+    def getKeys(self, word, definitions):
+        asjp = uniToASJP(word)
+        keys = set()
+        if "sound" in self.useKeyTypes:
+            keys |= getSoundKeys(asjp)
+        if "definition" in self.useKeyTypes:
+            keys |= getDefinitionKeys(definitions, self.stopWords)
+        if "firstLetter" in self.useKeyTypes:
+            keys |= getFirstLetterKeys(asjp)
+        return keys
+
+
+
+class AlignmentThresholdBlocker(CandidateBlocker):
+    ''' pairs the words whose ALINE forms score above the threshold in the given AlignmentScoreIndex '''
+
+    def __init__(self, langDict1, langDict2, sameLanguage, alignmentScores, threshold, getALINE=uniToALINE):
+        super().__init__(langDict1, langDict2, sameLanguage)
+
+        # several words can have the same ALINE form, so each form maps to all of their indices
+        alineToIndices2 = defaultdict(list)
+        for j, word2 in enumerate(self.words2):
+            alineToIndices2[getALINE(word2)].append(j)
+        alines1 = [getALINE(word1) for word1 in self.words1]
+
+        # the pairs are stored in either order, so both are followed
+        alineToPartners = defaultdict(set)
+        alines1Set = set(alines1)
+        for aline1, aline2, alineScore, consScore in alignmentScores.iterPairs():
+            if alineScore > threshold:
+                if aline1 in alines1Set and aline2 in alineToIndices2:
+                    alineToPartners[aline1].add(aline2)
+                if aline2 in alines1Set and aline1 in alineToIndices2:
+                    alineToPartners[aline2].add(aline1)
+
+        for i, aline1 in enumerate(alines1):
+            self.setCandidates(i, (j for partner in alineToPartners.get(aline1, ()) for j in alineToIndices2[partner]))
+
+
+
+class SemanticNeighbourBlocker(CandidateBlocker):
+    ''' pairs each word with the numNeighbours words2 whose definitions are the most similar to its own (see the top of this module) '''
+
+    def __init__(self, langDict1, langDict2, sameLanguage, model, numNeighbours=10, numTables=8, numBits=12, stopWords=None, seed=0):
+        super().__init__(langDict1, langDict2, sameLanguage)
+        if stopWords is None:
+            from StopWords import EnglishStopWords
+            stopWords = EnglishStopWords()
+        self.numNeighbours = numNeighbours
+
+        # the vectors of all the definitions of the words2, and the index of the word each one belongs to
+        vectors2 = [getDefinitionVectors(langDict2[word2], model, stopWords) for word2 in self.words2]
+        rowWords2 = np.repeat(np.arange(len(self.words2)), [len(vectors) for vectors in vectors2])
+        vectors2 = np.concatenate(vectors2) if vectors2 else np.zeros((0, model.vector_size), dtype=np.float32)
+
+        # the bucket of a vector in each table is the side it is on of each of the table's hyperplanes, and each table maps its buckets to
+        # the rows of vectors2 in them
+        self.hyperplanes = np.random.default_rng(seed).standard_normal((numTables, numBits, model.vector_size)).astype(np.float32)
+        self.bitValues = 1 << np.arange(numBits)
+        tables = [defaultdict(list) for hyperplanes in self.hyperplanes]
+        for row, buckets in enumerate(self.getBuckets(vectors2).tolist()):
+            for table, bucket in zip(tables, buckets):
+                table[bucket].append(row)
+
+        neighbours = [set() for word1 in self.words1]
+        for i, word1 in enumerate(self.words1):
+            vectors1 = getDefinitionVectors(langDict1[word1], model, stopWords)
+            rows = set()
+            for buckets in self.getBuckets(vectors1).tolist():
+                for table, bucket in zip(tables, buckets):
+                    rows.update(table.get(bucket, ()))
+            if not rows:
+                continue
+            rows = np.fromiter(rows, dtype=np.int64)
+            # the similarity of two words is the best of their definitions, so the rows' similarities are reduced to the best of each word
+            rowSimilarities = np.max(vectors1 @ vectors2[rows].T, axis=0)
+            candidateWords, rowToCandidate = np.unique(rowWords2[rows], return_inverse=True)
+            similarities = np.full(len(candidateWords), -np.inf, dtype=np.float32)
+            np.maximum.at(similarities, rowToCandidate, rowSimilarities)
+            if sameLanguage:
+                similarities[candidateWords == i] = -np.inf # a word isn't its own neighbour
+            numNearest = min(numNeighbours, len(candidateWords))
+            for j in candidateWords[np.argpartition(-similarities, numNearest - 1)[:numNearest]].tolist():
+                if not sameLanguage:
+                    neighbours[i].add(j)
+                elif j != i:
+                    # the pair is only visited from the first of the two words (see setCandidates), so it is given to that one
+                    neighbours[min(i, j)].add(max(i, j))
+
+        for i, indices in enumerate(neighbours):
+            self.setCandidates(i, indices)
+
+
+    def getBuckets(self, vectors):
+        # the (numVectors, numTables) buckets of the vectors
+        sides = np.einsum('vd,tbd->vtb', vectors, self.hyperplanes) > 0
+        return sides.astype(np.int64) @ self.bitValues
+
+
+
+class UnionBlocker(CandidateBlocker):
+    ''' pairs the words that are paired by any of the given blockers, which must all be of the same two dictionaries '''
+
+    def __init__(self, langDict1, langDict2, sameLanguage, blockers):
+        super().__init__(langDict1, langDict2, sameLanguage)
+        self.blockers = blockers
+        for i in range(len(self.words1)):
+            self.setCandidates(i, set().union(*(blocker.getCandidates(i) for blocker in blockers)))
+
+
+
+def getGoldPairs(numToCognateSet, acc1, acc2, langDict1, langDict2):
+    ''' returns the set of (word1, word2) that are in the same gold cognate set, for words that are in the two dictionaries '''
+    goldPairs = set()
+    for cognateSet in numToCognateSet.values():
+        words1 = [word for acc, word, defn in cognateSet if acc == acc1 and word in langDict1]
+        words2 = [word for acc, word, defn in cognateSet if acc == acc2 and word in langDict2]
+        for word1 in words1:
+            for word2 in words2:
+                if acc1 != acc2 or word1 < word2:
+                    goldPairs.add((word1, word2))
+                elif word2 < word1:
+                    goldPairs.add((word2, word1))
+    return goldPairs
+
+
+def reportRecall(name, blocker, goldPairs):
+    candidatePairs = set(blocker.iterCandidatePairs())
+    numFound = len(goldPairs & candidatePairs)
+    sys.stderr.write("\t{0}: {1} / {2} pairs ({3:.2%})\tgold recall {4} / {5} ({6:.2%})\n".format(name, len(blocker), blocker.getCrossProductSize(),
+                     len(blocker) / max(blocker.getCrossProductSize(), 1), numFound, len(goldPairs), numFound / max(len(goldPairs), 1)))
+    return candidatePairs
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    from LanguageDictParser import AlgonquianLanguageDictParser
+    from CogSetFileReader import CogSetFileReader
+
+    parser = optparse.OptionParser()
+    parser.add_option('-k', action='store', dest='keyTypes', help="the comma separated key types for the key blocking (any of {0}). default = sound,definition".format(",".join(keyTypes)),
+                      default="sound,definition")
+    parser.add_option('-m', action='store', dest='minSharedKeys', type='int', help="the number of keys two words must share to be paired. default = 1", default=1)
+    parser.add_option('-a', action='store', dest='alignmentPath', help="the path to the alignment features files, to also report the alignment threshold blocking.")
+    parser.add_option('-t', action='store', dest='threshold', help="the ALINE score threshold. default = 0.35", default="0.35")
+    parser.add_option('-s', action='store', dest='numNeighbours', type='int', help="the number of semantic neighbours of each word, to also report "
+                      "the semantic blocking (and its union with the threshold blocking). Needs the vectors file -v")
+    parser.add_option('-v', action='store', dest='vectorsPath', help="the word2vec vectors file, or the one a snapshot was made of (see VectorSnapshot.py)")
+    parser.add_option('-g', action='store', dest='goldFile', help="the gold cognate sets. default = ../Data/GoldSetsAlgonquian.txt", default="../Data/GoldSetsAlgonquian.txt")
+
+    options, args = parser.parse_args()
+
+    useKeyTypes = options.keyTypes.split(",")
+    if not set(useKeyTypes) <= set(keyTypes):
+        sys.stderr.write("Unknown key type in {0}!\n".format(options.keyTypes))
+        exit(-1)
+
+    if options.numNeighbours is not None:
+        if options.vectorsPath is None:
+            sys.stderr.write("Must provide the vectors file for the semantic blocking!\n")
+            exit(-1)
+        import VectorSnapshot
+        snapshotPath = VectorSnapshot.getSnapshotPath(options.vectorsPath)
+        if VectorSnapshot.isSnapshotCurrent(options.vectorsPath, snapshotPath):
+            model = VectorSnapshot.VectorSnapshot(snapshotPath)
+        else:
+            from gensim.models import KeyedVectors
+            model = KeyedVectors.load_word2vec_format(options.vectorsPath, binary=True)
+
+    ldp = AlgonquianLanguageDictParser()
+    numToCognateSet = CogSetFileReader(options.goldFile).getNumToCognateSet()
+    langTuples = [("cree", "C"), ("fox", "F"), ("meno", "M"), ("oji", "O")]
+
+    for i, (lang1, acc1) in enumerate(langTuples):
+        for j in range(i, len(langTuples)):
+            lang2, acc2 = langTuples[j]
+            langDict1, langDict2 = ldp[acc1], ldp[acc2]
+            goldPairs = getGoldPairs(numToCognateSet, acc1, acc2, langDict1, langDict2)
+            sys.stderr.write("{0} and {1}:\n".format(lang1, lang2))
+
+            keyBlocker = KeyBlocker(langDict1, langDict2, acc1 == acc2, useKeyTypes, options.minSharedKeys)
+            keyPairs = reportRecall("key blocking", keyBlocker, goldPairs)
+
+            thresholdBlocker = None
+            if options.alignmentPath is not None:
+                from AlignmentScoreIndex import AlignmentScoreIndex
+                alignmentFile = "{0}/alignment_features_{1}_{2}_{3}Threshold.bin".format(options.alignmentPath, lang1, lang2, options.threshold)
+                thresholdBlocker = AlignmentThresholdBlocker(langDict1, langDict2, acc1 == acc2, AlignmentScoreIndex([alignmentFile]),
+                                                             float(options.threshold))
+                thresholdPairs = reportRecall("threshold blocking", thresholdBlocker, goldPairs)
+                numKept = len(keyPairs & thresholdPairs)
+                sys.stderr.write("\tkey blocking keeps {0} / {1} ({2:.2%}) of the pairs above the threshold\n".format(numKept, len(thresholdPairs),
+                                                                                                                 numKept / max(len(thresholdPairs), 1)))
+
+            if options.numNeighbours is not None:
+                semanticBlocker = SemanticNeighbourBlocker(langDict1, langDict2, acc1 == acc2, model, options.numNeighbours)
+                reportRecall("semantic blocking", semanticBlocker, goldPairs)
+                if thresholdBlocker is not None:
+                    reportRecall("threshold and semantic blocking", UnionBlocker(langDict1, langDict2, acc1 == acc2, [thresholdBlocker, semanticBlocker]),
+                                 goldPairs)
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+
+''' a compact binary version of the classified pairs file that formatSvmOutput.py prints.
+Rather than "SVM Value:" text blocks that need to be parsed back in, the pairs are stored as columns in a numpy .npz file:
+    words          - the word table: every distinct "acc\tword\tdefn" joined by newlines, as utf-8 bytes
+    pairs          - int32 (numPairs, 2), the IDs (line numbers in the word table) of the two words of each pair
+    scores         - float64, the svm score of each pair (kept at full precision, so the clustering is the same as from the text)
+    labels         - int8, the class label that starts the features line of each pair
+    featureIndptr  - int64, the features of pair i are at featureIndptr[i]:featureIndptr[i+1] in the next two arrays
+    featureNums    - int32, the feature numbers
+    featureValues  - float32, the feature values
+Any script that reads classified pairs through ClassifiedPairsReader.readClassifiedPairs can read either format.
+'''
+
+from array import array
+from itertools import repeat
+import os
+import sys
+
+import numpy as np
+
+from WordTupleTable import WordTupleTable
+
+
+BINARY_PAIRS_SIGNATURE = b"PK\x03\x04" # an .npz file is a zip archive
+
+
+def isBinaryPairsFile(fileName):
+    ''' returns True if the file is a binary classified pairs file, rather than the text format '''
+    with open(fileName, 'rb') as file:
+        return file.read(len(BINARY_PAIRS_SIGNATURE)) == BINARY_PAIRS_SIGNATURE
+
+
+def writeClassifiedPairsFile(fileName, records):
+    ''' given an iterable of (wordTuple1, wordTuple2, svmScore, featureLine) where featureLine is the svm features line
+    (eg: "-1 1:0 2:1 3:0.5"), writes them to a binary classified pairs file. Returns the number of pairs written '''
+    writer = ClassifiedPairsWriter()
+    for wordTuple1, wordTuple2, svmScore, featureLine in records:
+        writer.addPair(wordTuple1, wordTuple2, svmScore, featureLine)
+    writer.write(fileName)
+    return len(writer)
+
+
+
+class ClassifiedPairsWriter(object):
+    ''' collects pairs one at a time into the compact arrays of a binary classified pairs file, so that a stream of pairs can be kept
+    without holding their text, and then writes them out '''
+
+    def __init__(self):
+        self.wordTable = WordTupleTable()
+        self.pairs = array('i')
+        self.scores = array('d')
+        self.labels = array('b')
+        self.featureIndptr = array('q', [0])
+        self.featureNums = array('i')
+        self.featureValues = array('f')
+
+
+    def __len__(self):
+        return len(self.scores)
+
+
+    def addPair(self, wordTuple1, wordTuple2, svmScore, featureLine):
+        ''' adds a pair with its svm features line (eg: "-1 1:0 2:1 3:0.5") '''
+        from ClassifiedPairsReader import parseFeatures # imported here since ClassifiedPairsReader imports this module
+        firstToken = featureLine.split(None, 1)[0] if featureLine.strip() else ""
+        label = int(firstToken) if firstToken and ":" not in firstToken else 0
+        features = parseFeatures(featureLine)
+        self.addPairFeatures(wordTuple1, wordTuple2, svmScore, label, [featureNum for featureNum, value in features],
+                             [value for featureNum, value in features])
+
+
+    def addPairFeatures(self, wordTuple1, wordTuple2, svmScore, label, featureNums, featureValues):
+        ''' adds a pair with its features as a list of feature numbers and a list of their values '''
+        self.pairs.append(self.wordTable.getID(wordTuple1))
+        self.pairs.append(self.wordTable.getID(wordTuple2))
+        self.scores.append(float(svmScore))
+        self.labels.append(label)
+        self.featureNums.extend(featureNums)
+        self.featureValues.extend(featureValues)
+        self.featureIndptr.append(len(self.featureNums))
+
+
+    def addPairRows(self, wordTuples1, wordTuples2, svmScores, label, featureMatrix):
+        ''' adds the pairs of the rows of a feature matrix, where column i is the value of feature number i+1 (eg: from
+        GeneralFeaturizer.featurizeBatch), without writing out and parsing back their features lines '''
+        numPairs, numFeatures = featureMatrix.shape
+        for wordTuple1, wordTuple2 in zip(wordTuples1, wordTuples2):
+            self.pairs.append(self.wordTable.getID(wordTuple1))
+            self.pairs.append(self.wordTable.getID(wordTuple2))
+        self.scores.extend(map(float, svmScores))
+        self.labels.extend([label] * numPairs)
+        end = self.featureIndptr[-1]
+        self.featureIndptr.extend(range(end + numFeatures, end + numFeatures*numPairs + 1, numFeatures) if numFeatures else [end] * numPairs)
+        self.featureNums.frombytes(np.tile(np.arange(1, numFeatures + 1, dtype=np.int32), numPairs).tobytes())
+        self.featureValues.frombytes(np.ascontiguousarray(featureMatrix, dtype=np.float32).tobytes())
+
+
+    def write(self, fileName, sortByScore=False):
+        ''' writes the pairs to a binary classified pairs file, in the order they were added or from the highest score down '''
+        arrays = (np.frombuffer(self.pairs, dtype=np.int32).reshape(-1, 2), np.frombuffer(self.scores, dtype=np.float64),
+                  np.frombuffer(self.labels, dtype=np.int8), np.frombuffer(self.featureIndptr, dtype=np.int64),
+                  np.frombuffer(self.featureNums, dtype=np.int32), np.frombuffer(self.featureValues, dtype=np.float32))
+        if sortByScore:
+            arrays = sortArraysByScore(*arrays)
+        writeArrays(fileName, self.wordTable, *arrays)
+
+
+def sortArraysByScore(pairs, scores, labels, featureIndptr, featureNums, featureValues):
+    ''' reorders the arrays of the pairs from the highest score down. Pairs with the same score stay in the order they were in,
+    which is the order formatSvmOutput.py writes them in '''
+    order = np.argsort(-scores, kind='stable')
+    lengths = np.diff(featureIndptr)[order]
+    newIndptr = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=newIndptr[1:])
+    # the position in the old feature arrays of each feature in the new ones
+    featureOrder = np.repeat(featureIndptr[:-1][order] - newIndptr[:-1], lengths) + np.arange(newIndptr[-1])
+    return pairs[order], scores[order], labels[order], newIndptr, featureNums[featureOrder], featureValues[featureOrder]
+
+
+def writeArrays(fileName, wordTable, pairs, scores, labels, featureIndptr, featureNums, featureValues):
+    words = "\n".join("\t".join(wordTuple) for wordTuple in wordTable).encode("utf-8")
+    with open(fileName, 'wb') as file:
+        # written to an open file so that numpy doesn't add .npz to the file name
+        np.savez(file,
+                 words=np.frombuffer(words, dtype=np.uint8),
+                 pairs=np.frombuffer(pairs, dtype=np.int32).reshape(-1, 2),
+                 scores=np.frombuffer(scores, dtype=np.float64),
+                 labels=np.frombuffer(labels, dtype=np.int8),
+                 featureIndptr=np.frombuffer(featureIndptr, dtype=np.int64),
+                 featureNums=np.frombuffer(featureNums, dtype=np.int32),
+                 featureValues=np.frombuffer(featureValues, dtype=np.float32))
+
+
+class ClassifiedPairsFile(object):
+    ''' reads in a binary classified pairs file. wordTuples[i] is the (acc, word, defn) with ID i, and the other attributes are
+    the arrays described at the top of this module '''
+
+    def __init__(self, fileName):
+        with np.load(fileName, allow_pickle=False) as data:
+            words = data["words"].tobytes().decode("utf-8")
+            self.pairs = data["pairs"]
+            self.scores = data["scores"]
+            self.labels = data["labels"]
+            self.featureIndptr = data["featureIndptr"]
+            self.featureNums = data["featureNums"]
+            self.featureValues = data["featureValues"]
+        self.wordTuples = [tuple(line.split("\t")) for line in words.split("\n")] if words else []
+
+
+    def __len__(self):
+        return len(self.scores)
+
+
+    def getScoreStrings(self, start=0, end=None):
+        # the svm values as they were written in the text format
+        return list(map(str, self.scores[start:end].tolist()))
+
+
+    def getFeatures(self, i):
+        ''' returns the features of pair i as a list of (featureNum, value), like ClassifiedPairsReader.parseFeatures '''
+        start, end = self.featureIndptr[i], self.featureIndptr[i+1]
+        return list(zip(self.featureNums[start:end].tolist(), self.featureValues[start:end].tolist()))
+
+
+    def getFeatureLine(self, i):
+        ''' returns the svm features line of pair i, as it would be in the text format '''
+        start, end = self.featureIndptr[i], self.featureIndptr[i+1]
+        values = self.featureValues[start:end].astype(str).tolist()
+        featureNums = self.featureNums[start:end].tolist()
+        features = ["{0}:{1}".format(featureNum, formatFeatureValue(value)) for featureNum, value in zip(featureNums, values)]
+        return " ".join([str(self.labels[i])] + features)
+
+
+    def iterBatches(self, withFeatures=False, batchSize=1<<16, rawFeatureLines=False):
+        ''' yields the pairs in the same columns as ClassifiedPairsReader.readClassifiedPairBatches:
+        (list of wordTuple1, list of wordTuple2, list of svmValue strings, features) '''
+        for start in range(0, len(self), batchSize):
+            end = min(start + batchSize, len(self))
+            wordTuples1 = list(map(self.wordTuples.__getitem__, self.pairs[start:end, 0].tolist()))
+            wordTuples2 = list(map(self.wordTuples.__getitem__, self.pairs[start:end, 1].tolist()))
+            svmValues = self.getScoreStrings(start, end)
+            if rawFeatureLines:
+                features = map(self.getFeatureLine, range(start, end))
+            elif withFeatures:
+                features = map(self.getFeatures, range(start, end))
+            else:
+                features = repeat(None, end - start)
+            yield wordTuples1, wordTuples2, svmValues, features
+
+
+    def writeText(self, file):
+        ''' writes the pairs to the file handle in the text format that formatSvmOutput.py prints '''
+        for i in range(len(self)):
+            wordID1, wordID2 = self.pairs[i].tolist()
+            file.write("SVM Value: {0}\n".format(self.getScoreStrings(i, i+1)[0]))
+            file.write(self.getFeatureLine(i) + "\n")
+            file.write("\t".join(self.wordTuples[wordID1]) + "\n")
+            file.write("\t".join(self.wordTuples[wordID2]) + "\n")
+            file.write("\n")
+
+
+def formatFeatureValue(value):
+    # whole numbers are written as ints, like the featurizers do
+    if value.endswith(".0"):
+        return value[:-2]
+    return value
+
+
+def mergeClassifiedPairsFiles(outputFileName, inputFileNames, sortByScore=False):
+    ''' concatenates binary classified pairs files (the binary version of cat-ing the text files together).
+    The word tables are merged so that each word is only stored once. The output file is skipped if it is also an input
+    (eg: from a glob that matches it). With sortByScore the merged pairs are sorted from the highest score down '''
+    inputFileNames = [name for name in inputFileNames if os.path.abspath(name) != os.path.abspath(outputFileName)]
+    wordTable = WordTupleTable()
+    allPairs, allScores, allLabels, allNums, allValues = [], [], [], [], []
+    allIndptr = [np.zeros(1, dtype=np.int64)]
+    for inputFileName in inputFileNames:
+        pairsFile = ClassifiedPairsFile(inputFileName)
+        newIDs = np.array([wordTable.getID(wordTuple) for wordTuple in pairsFile.wordTuples], dtype=np.int32)
+        if len(pairsFile):
+            allPairs.append(newIDs[pairsFile.pairs])
+        allScores.append(pairsFile.scores)
+        allLabels.append(pairsFile.labels)
+        allIndptr.append(pairsFile.featureIndptr[1:] + (allIndptr[-1][-1]))
+        allNums.append(pairsFile.featureNums)
+        allValues.append(pairsFile.featureValues)
+
+    pairs = np.concatenate(allPairs) if allPairs else np.zeros((0, 2), dtype=np.int32)
+    arrays = (pairs.astype(np.int32), np.concatenate(allScores).astype(np.float64), np.concatenate(allLabels).astype(np.int8),
+              np.concatenate(allIndptr), np.concatenate(allNums).astype(np.int32), np.concatenate(allValues).astype(np.float32))
+    if sortByScore:
+        arrays = sortArraysByScore(*arrays)
+    writeArrays(outputFileName, wordTable, *arrays)
+
+
+
+if __name__ == "__main__":
+    import optparse
+
+    parser = optparse.OptionParser(usage="%prog [options] inputFile(s)")
+    parser.add_option('-o', action='store', dest='outputFile', help="the output binary classified pairs file.")
+    parser.add_option('-c', action='store_true', dest='convert', help="convert the given text classified pairs file to binary.", default=False)
+    parser.add_option('-m', action='store_true', dest='merge', help="merge the given binary classified pairs files into one.", default=False)
+    parser.add_option('-t', action='store_true', dest='toText', help="print the given binary classified pairs file in the text format.", default=False)
+
+    options, args = parser.parse_args()
+
+    if len(args) == 0 or ((options.convert or options.merge) and options.outputFile is None):
+        parser.print_help()
+        exit(-1)
+
+    if options.convert:
+        from ClassifiedPairsReader import readClassifiedPairs
+        numPairs = writeClassifiedPairsFile(options.outputFile, readClassifiedPairs(args[0], rawFeatureLines=True))
+        sys.stderr.write("wrote {0} pairs to {1}\n".format(numPairs, options.outputFile))
+    elif options.merge:
+        mergeClassifiedPairsFiles(options.outputFile, args)
+    elif options.toText:
+        ClassifiedPairsFile(args[0]).writeText(sys.stdout)
+    else:
+        parser.print_help()
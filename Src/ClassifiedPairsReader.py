@@ -1,69 +1,234 @@
 #!/usr/bin/env python3
 
 
-import re
 from collections import defaultdict
+from itertools import repeat
+from operator import itemgetter
 import sys
 
+import numpy as np
+
+from ClassifiedPairsFile import isBinaryPairsFile, ClassifiedPairsFile
+
+
+SVMPrefixBytes = b"SVM Value: "
+
+
+def isWordLine(line):
+    ''' a word line is "Acc\tword\tdefn" where Acc is a single capital letter and neither the word nor the defn is empty '''
+    if len(line) < 5 or line[1] != "\t" or not ("A" <= line[0] <= "Z"):
+        return False
+    parts = line.split("\t")
+    return len(parts) == 3 and parts[1] != "" and parts[2] != ""
+
+
+def parseFeatures(featureLine):
+    ''' given the svm features line of a pair (eg: "-1 1:0 2:1 3:0.5"), returns a list of (featureNum, value) with the values as floats.
+    The class label at the start of the line is skipped '''
+    tokens = featureLine.replace(":", " ").split()
+    if len(tokens) % 2 == 1:
+        tokens = tokens[1:] # the class label is the only token without a colon
+    return list(zip(map(int, tokens[0::2]), map(float, tokens[1::2])))
+
+
+def readClassifiedPairs(fileName, withFeatures=False, rawFeatureLines=False):
+    ''' streams through a classified pairs file, only holding one chunk of the file in memory at a time.
+    Each pair is a block of lines separated by a blank line:
+        SVM Value: <score>
+        <features>
+        Acc1\tword1\tdefn1
+        Acc2\tword2\tdefn2
+    and yields (wordTuple1, wordTuple2, svmValue, features) for each one. svmValue is the score as it was written (a string)
+    and features is the list from parseFeatures if withFeatures is True, the features line itself if rawFeatureLines is True, 
+    otherwise None. 
+    The file can also be a binary classified pairs file (see ClassifiedPairsFile.py), which is read without any parsing. '''
+    for batch in readClassifiedPairBatches(fileName, withFeatures, rawFeatureLines=rawFeatureLines):
+        yield from zip(*batch)
+
+
+def readClassifiedPairBatches(fileName, withFeatures=False, chunkSize=1<<24, rawFeatureLines=False):
+    ''' the same as readClassifiedPairs, but for each chunk of the file yields the records as columns:
+    (list of wordTuple1, list of wordTuple2, list of svmValue, features), where features is an iterator that can only be 
+    looped over once.
+    Looping over zip(*batch) directly saves resuming a generator for every single pair '''
+    if isBinaryPairsFile(fileName):
+        yield from ClassifiedPairsFile(fileName).iterBatches(withFeatures, rawFeatureLines=rawFeatureLines)
+        return
+
+    if rawFeatureLines:
+        featureParser = str
+    elif withFeatures:
+        featureParser = parseFeatures
+    else:
+        featureParser = None # the features are never decoded at all
+    with open(fileName, "rb") as file:
+        # read bytes rather than text, so only the parts of each block that are needed ever get decoded (see parseBlocks)
+        leftoverLines = [b""]
+        while True:
+            chunk = file.read(chunkSize)
+            if not chunk:
+                break
+            lines = chunk.split(b"\n")
+            lines[0] = leftoverLines.pop() + lines[0] # the last line of the previous chunk was cut off by this chunk
+            if leftoverLines:
+                lines = leftoverLines + lines
+            # only parse whole blocks, the lines of the last block wait for the next chunk
+            lastBlank = len(lines) - 2 # the very last line is never known to be complete
+            while lastBlank >= 0 and lines[lastBlank] != b"":
+                lastBlank -= 1
+            leftoverLines = lines[lastBlank+1:]
+            if lastBlank >= 0:
+                yield parseBlocks(lines[:lastBlank+1], featureParser)
+        if any(leftoverLines):
+            # the last block may not have a blank line after it
+            yield parseBlocks(leftoverLines + [b""], featureParser)
+
+
+def parseBlocks(lines, featureParser):
+    ''' parses the lines (as bytes) of whole blocks into the columns of a batch (see readClassifiedPairBatches). 
+    When every block is laid out exactly as formatSvmOutput writes them (five lines with the last one blank), each kind of line 
+    is picked out with a slice and parsed all at once. Anything else is decoded and goes line by line '''
+    if len(lines) % 5 == 0 and lines[4::5].count(b"") == len(lines) // 5:
+        svmLines = lines[0::5]
+        wordLines1 = lines[2::5]
+        wordLines2 = lines[3::5]
+        # the same word is usually in many pairs, so each distinct word line only gets decoded and split once 
+        # and all its pairs share the one tuple
+        lineToTuple = dict.fromkeys(wordLines1)
+        lineToTuple.update(dict.fromkeys(wordLines2))
+        lineToTuple = dict(zip(lineToTuple, map(tuple, map(str.split, map(bytes.decode, lineToTuple), repeat("\t")))))
+        if all(map(bytes.startswith, svmLines, repeat(SVMPrefixBytes))) and areWordTuples(lineToTuple.values()):
+            # strip the prefixes and decode the whole column of svm values at once
+            svmValues = b"\n".join(svmLines).replace(SVMPrefixBytes, b"").decode("utf-8").split("\n")
+            if len(svmValues) == len(svmLines) and all(svmValues):
+                if featureParser is not None:
+                    # parsed as the records are looped over, holding the features of a whole chunk at once is slow and big
+                    features = map(featureParser, map(bytes.decode, lines[1::5]))
+                else:
+                    features = repeat(None, len(svmValues))
+                wordTuples1 = list(map(lineToTuple.__getitem__, wordLines1))
+                wordTuples2 = list(map(lineToTuple.__getitem__, wordLines2))
+                return wordTuples1, wordTuples2, svmValues, features
+    return parseLines(list(map(bytes.decode, lines)), featureParser)
+
+
+def areWordTuples(wordTuples):
+    ''' checks that every tuple is (Acc, word, defn) with a single capital letter Acc and a non empty word and defn '''
+    wordTuples = list(wordTuples)
+    if set(map(len, wordTuples)) - {3}:
+        return False
+    accs = set(map(itemgetter(0), wordTuples))
+    if not all(len(acc) == 1 and "A" <= acc <= "Z" for acc in accs):
+        return False
+    return all(map(itemgetter(1), wordTuples)) and all(map(itemgetter(2), wordTuples))
+
+
+def parseLines(lines, featureParser):
+    ''' the slow but general way of parsing blocks into the columns of a batch, one line at a time. 
+    A block without an svm value is skipped since something is weird with it '''
+    records = []
+    svmValue = None
+    featureLine = None
+    wordTuples = []
+    for line in lines:
+        if line == "":
+            # end of a block
+            if svmValue is not None:
+                records.append(makePairRecord(svmValue, featureLine, wordTuples, featureParser))
+            svmValue = None
+            featureLine = None
+            wordTuples = []
+        elif isWordLine(line):
+            wordTuples.append(tuple(line.split("\t")))
+        elif svmValue is None and "Value: " in line:
+            svmValue = line[line.index("Value: ") + len("Value: "):]
+            if svmValue == "":
+                svmValue = None
+        elif featureLine is None:
+            featureLine = line
+    if svmValue is not None:
+        records.append(makePairRecord(svmValue, featureLine, wordTuples, featureParser))
+    if not records:
+        return [], [], [], iter(())
+    wordTuples1, wordTuples2, svmValues, features = map(list, zip(*records))
+    return wordTuples1, wordTuples2, svmValues, iter(features)
+
+
+def makePairRecord(svmValue, featureLine, wordTuples, featureParser):
+    if len(wordTuples) < 2:
+        sys.stderr.write("problem with pair with SVM Value: {0}, found words {1}\n".format(svmValue, wordTuples))
+        exit(-1)
+    if featureParser is not None:
+        features = featureParser(featureLine if featureLine is not None else "")
+    else:
+        features = None
+    return wordTuples[0], wordTuples[1], svmValue, features
+
+
+
 class ClassifiedPairsReader(object):
     ''' class to read in the classified  pair file (with the pairs and score and features) and populate a pairDict'''
-    def __init__(self, pairFileName, bothWays=True):
-        self.bothWays = bothWays # bothWays==True makes the second word of each compared pair have an entry in the dict as well
-        # for grouping into protoSets, want bothWays=False since only want to group the words INTO protosets, not the words already in them
-        self.pairSets = self.readFileIntoPairSets(pairFileName)
-        self.pairDict = self.createPairDict()
 
+    withFeatures = False # subclasses that need to look at the features of each pair set this to True
 
-    def readFileIntoPairSets(self, fileName):
-        with open(fileName) as file:
-            textFile = file.read()
-            pairSets = textFile.split("\n\n")
-            while pairSets[-1] == "":
-                pairSets.pop() # if end set is empty
-        return pairSets
-    
+    def __init__(self, pairFileName, bothWays=True, wordTable=None):
+        self.bothWays = bothWays # bothWays==True makes the second word of each compared pair have an entry in the dict as well
+        # for grouping into protoSets, want bothWays=False since only want to group the words INTO protosets, not the words already in them
+        self.wordTable = wordTable # if given a WordTupleTable, the pairDict is keyed on word IDs rather than word tuples (see addPair)
+        self.pairDict = self.createPairDict(pairFileName)
 
-    def getWordPattern(self):
-        wordPattern = "^([A-Z])\t([^\t]+)\t([^\t]+)$"
-        return wordPattern
 
-    def createPairDict(self):
-        ''' given the pair sets, this creates a dict self.pairDict where key is the compare word tuple (acc, word, defn) and 
+    def createPairDict(self, pairFileName):
+        ''' reads the pairs file, and creates a dict self.pairDict where key is the compare word tuple (acc, word, defn) and 
         value is a list of tuples (acc, word, defn, SVMValue) '''
 
         pairDict = defaultdict(list)
-        SVMPattern = "Value: ([^\n]+)"
-        wordPattern = self.getWordPattern()
-        for pairSet in self.pairSets:
-            SVMmatch = re.search(SVMPattern, pairSet) # use regex to find the svm value
-            wordmatch = re.findall(wordPattern, pairSet, re.MULTILINE) # use regex to find the two words in this set
-            if SVMmatch is None:
-                continue # something is weird with this set so move on
-
-            SVMvalue = SVMmatch.groups(0)#[0] # a tuple with just the SVMvalue
-
-            try:
-                compareTuple = wordmatch[0]
-            except:
-                sys.stderr.write("problem with \n{0}\n".format(pairSet))
-                exit(-1)
-
-            otherWordTuple = wordmatch[1] # the other word acc,word,defn tuple
-            try:
-                value = otherWordTuple + SVMvalue # the value is the (acc, word, defn, svmScore) of the other word
-            except:
-                print("Problem with otherTuple = {0} and SVMvalue = {1}".format(otherWordTuple, SVMvalue))
-                print("SVMmatch.groups(0) = {0}".format(SVMmatch.groups(0)))
-                exit()
-
-
-            pairDict[compareTuple].append(otherWordTuple + SVMvalue) # add it to the list of other values for this compar word
-            # this is why we use a defaultdict(list), since assumes there is an empty list at this key when not used yet
+        if self.wordTable is not None and not self.withFeatures and isBinaryPairsFile(pairFileName):
+            self.addBinaryPairs(pairDict, ClassifiedPairsFile(pairFileName))
+            return pairDict
+
+        for batch in readClassifiedPairBatches(pairFileName, self.withFeatures):
+            for compareTuple, otherWordTuple, SVMvalue, features in zip(*batch):
+                self.addPair(pairDict, compareTuple, otherWordTuple, SVMvalue)
+                if self.withFeatures:
+                    self.checkFeatures(compareTuple, otherWordTuple, features)
+        return pairDict
+
 
+    def addPair(self, pairDict, compareTuple, otherWordTuple, SVMvalue):
+        ''' adds the pair to the pairDict. Normally the key is the compare word tuple and the value appended is 
+        (acc, word, defn, svmScore) of the other word. 
+        With a wordTable, the key is the ID of the compare word and the value appended is (otherID, svmScore) '''
+        if self.wordTable is not None:
+            compareID = self.wordTable.getID(compareTuple)
+            otherID = self.wordTable.getID(otherWordTuple)
+            pairDict[compareID].append((otherID, SVMvalue))
             if self.bothWays:
-                pairDict[otherWordTuple].append(compareTuple + SVMvalue) # add the other direction, 
+                pairDict[otherID].append((compareID, SVMvalue))
+            return
+
+        pairDict[compareTuple].append(otherWordTuple + (SVMvalue,)) # add it to the list of other values for this compar word
+        # this is why we use a defaultdict(list), since assumes there is an empty list at this key when not used yet
+
+        if self.bothWays:
+            pairDict[otherWordTuple].append(compareTuple + (SVMvalue,)) # add the other direction, 
+
+
+    def addBinaryPairs(self, pairDict, pairsFile):
+        ''' the same as calling addPair for every pair in the binary pairs file, but only the words in its word table
+        get looked up in our wordTable, rather than both words of every pair '''
+        fileIDToWordID = np.array([self.wordTable.getID(wordTuple) for wordTuple in pairsFile.wordTuples], dtype=np.int64)
+        wordIDs = fileIDToWordID[pairsFile.pairs] if len(pairsFile) else np.zeros((0, 2), dtype=np.int64)
+        for compareID, otherID, SVMvalue in zip(wordIDs[:, 0].tolist(), wordIDs[:, 1].tolist(), pairsFile.scores.tolist()):
+            pairDict[compareID].append((otherID, SVMvalue))
+            if self.bothWays:
+                pairDict[otherID].append((compareID, SVMvalue))
+
+
+    def checkFeatures(self, compareTuple, otherWordTuple, features):
+        # the features of each pair are passed here (if withFeatures is True), so subclasses can look at them
+        pass
 
-        return pairDict
 
     def __getitem__(self, item):
         return self.pairDict[item]
@@ -83,56 +248,22 @@ class ClassifiedPairsReaderWithHopelessPairs(ClassifiedPairsReader):
     # this reads in the pairs an can analyze the features to find "hopeless" pairs, i.e. 
     # pairs that don't fire any definition features
 
-    def createPairDict(self):
-        ''' given the pair sets, this creates a dict self.pairDict where key is the compare word tuple (acc, word, defn) and 
-        value is a list of tuples (acc, word, defn, SVMValue) '''
+    withFeatures = True
 
-        pairDict = defaultdict(list)
+    def createPairDict(self, pairFileName):
         self.hopelessPairs = set()
+        return super().createPairDict(pairFileName)
 
-        SVMPattern = "Value: ([^\n]+)"
-        wordPattern = self.getWordPattern()
-        featurePattern = "[0-9]+:[0-9]+"
-
-        for pairSet in self.pairSets:
-            SVMmatch = re.search(SVMPattern, pairSet) # use regex to find the svm value
-            wordmatch = re.findall(wordPattern, pairSet, re.MULTILINE) # use regex to find the two words in this set
-
-            if SVMmatch is None:
-                continue # something is weird with this set so move on
-
-            SVMvalue = SVMmatch.groups(0)#[0] # a tuple with just the SVMvalue
-
-            compareTuple = wordmatch[0]
-            otherWordTuple = wordmatch[1] # the other word acc,word,defn tuple
-            try:
-                value = otherWordTuple + SVMvalue # the value is the (acc, word, defn, svmScore) of the other word
-            except:
-                print("Problem with otherTuple = {0} and SVMvalue = {1}".format(otherWordTuple, SVMvalue))
-                print("SVMmatch.groups(0) = {0}".format(SVMmatch.groups(0)))
-                exit()
 
+    def checkFeatures(self, compareTuple, otherWordTuple, features):
+        if self.isHopeless(features):
+            self.hopelessPairs.add((compareTuple, otherWordTuple))
 
-            pairDict[compareTuple].append(otherWordTuple + SVMvalue) # add it to the list of other values for this compar word
-            # this is why we use a defaultdict(list), since assumes there is an empty list at this key when not used yet
 
-            if self.bothWays:
-                pairDict[otherWordTuple].append(compareTuple + SVMvalue) # add the other direction, 
-
-
-            featurematch = re.findall(featurePattern, pairSet)
-            if self.isHopeless(featurematch):
-                self.hopelessPairs.add((compareTuple, otherWordTuple))
-
-        return pairDict
-
-
-    def isHopeless(self, featurematch):
-        # given a list of feature matches (eg: "2:0") this checks if any of the first 12 features are 1, in which case return False since not hopeless
-        for feature in featurematch:
-            featureNum, featureValue = feature.split(":")
-            number = int(featureNum)
-            value = int(featureValue)
+    def isHopeless(self, features):
+        # given a list of (featureNum, value) this checks if any of the first 12 features are 1, in which case return False since not hopeless
+        for number, featureValue in features:
+            value = int(featureValue) # only the whole part of the value counts, as before
             if number < 10 and value > 0:
                 # if any of the first 9 features are 1 (the feature fired) then it is not hopeless
                 #print("not hopeless: feature {0} has value {1}".format(number, value))
@@ -151,60 +282,25 @@ class ClassifiedPairsReaderCountWordNetFeatures(ClassifiedPairsReader):
     # useful to find a good example for the paper
 
     wordNetCount = 1
+    withFeatures = True
 
-    def createPairDict(self):
-        ''' given the pair sets, this creates a dict self.pairDict where key is the compare word tuple (acc, word, defn) and 
-        value is a list of tuples (acc, word, defn, SVMValue) '''
-
-        pairDict = defaultdict(list)
+    def createPairDict(self, pairFileName):
         self.wordNetPairs = set() # this are pairs with 
+        return super().createPairDict(pairFileName)
 
-        SVMPattern = "Value: ([^\n]+)"
-        wordPattern = self.getWordPattern()
-        featurePattern = "[0-9]+:[0-9]+"
-
-        for pairSet in self.pairSets:
-            SVMmatch = re.search(SVMPattern, pairSet) # use regex to find the svm value
-            wordmatch = re.findall(wordPattern, pairSet, re.MULTILINE) # use regex to find the two words in this set
 
-            if SVMmatch is None:
-                continue # something is weird with this set so move on
+    def checkFeatures(self, compareTuple, otherWordTuple, features):
+        numWordNet = self.enoughWordNet(features)
+        if numWordNet >= self.wordNetCount:
+            #print(features)
+            self.wordNetPairs.add((compareTuple, otherWordTuple, numWordNet))
 
-            SVMvalue = SVMmatch.groups(0)#[0] # a tuple with just the SVMvalue
 
-            compareTuple = wordmatch[0]
-            otherWordTuple = wordmatch[1] # the other word acc,word,defn tuple
-            try:
-                value = otherWordTuple + SVMvalue # the value is the (acc, word, defn, svmScore) of the other word
-            except:
-                print("Problem with otherTuple = {0} and SVMvalue = {1}".format(otherWordTuple, SVMvalue))
-                print("SVMmatch.groups(0) = {0}".format(SVMmatch.groups(0)))
-                exit()
-
-
-            pairDict[compareTuple].append(otherWordTuple + SVMvalue) # add it to the list of other values for this compar word
-            # this is why we use a defaultdict(list), since assumes there is an empty list at this key when not used yet
-
-            if self.bothWays:
-                pairDict[otherWordTuple].append(compareTuple + SVMvalue) # add the other direction, 
-
-
-            featurematch = re.findall(featurePattern, pairSet)
-            numWordNet = self.enoughWordNet(featurematch)
-            if numWordNet >= self.wordNetCount:
-                #print(featurematch)
-                self.wordNetPairs.add((compareTuple, otherWordTuple, numWordNet))
-
-        return pairDict
-
-
-    def enoughWordNet(self, featurematch):
-        # given a list of feature matches (eg: "2:0") this checks enough of the word net features (4-9) are turned on
+    def enoughWordNet(self, features):
+        # given a list of (featureNum, value) this checks enough of the word net features (4-9) are turned on
         total = 0
-        for feature in featurematch:
-            featureNum, featureValue = feature.split(":")
-            number = int(featureNum)
-            value = int(featureValue)
+        for number, featureValue in features:
+            value = int(featureValue) # only the whole part of the value counts, as before
             if number > 8 and number < 10:
                 total += value
         return total
@@ -216,3 +312,4 @@ class ClassifiedPairsReaderCountWordNetFeatures(ClassifiedPairsReader):
 
     def getWordNetPairs(self):
         return self.wordNetPairs
+
@@ -3,6 +3,7 @@
 from collections import defaultdict
 
 from GoldEvaluator import GoldEvaluator
+from WordTupleTable import WordTupleTable
 import metrics
 
 from LanguageDictParser import AlgonquianLanguageDictParser
@@ -162,6 +163,11 @@ class CognateClustersEvaluator(object):
     def __init__(self, goldSetsFile, clusters):
         self.goldEvaluator = GoldEvaluator(goldSetsFile)
         self.clusterDict = clusters
+        # bCubed works on int IDs of the word tuples, so the tuples are only hashed once here
+        self.wordTable = WordTupleTable()
+        self.idClusterDict = {}
+        for clusterLabel, cluster in self.clusterDict.items():
+            self.idClusterDict[clusterLabel] = [self.wordTable.getID(wordTuple) for wordTuple in cluster]
 
 
     def runAllEvaluationMetrics(self):
@@ -181,7 +187,7 @@ class CognateClustersEvaluator(object):
             print("Do not zero-weight singletons")
 
         print("Calculating bCubed...")
-        recall, precision, fscore = metrics.bCubed(self.clusterDict, self.goldEvaluator, zeroWeightSingletons)
+        recall, precision, fscore = metrics.bCubed(self.idClusterDict, self.goldEvaluator, zeroWeightSingletons, self.wordTable)
         print("bCubed recall, precision, fscore = {0:.3f}, {1:.3f}, {2:.3f}\n".format(recall, precision, fscore))
 
 
@@ -9,6 +9,7 @@ from UniToALINEConverter import uniToALINE
 
 
 import DefinitionCleaner
+from SVMLightModel import formatScore
 
 
 class FeatureRunner(object):
@@ -33,12 +34,36 @@ class FeatureRunner(object):
 
 
 class GeneralFeatureRunner(FeatureRunner):
+    ''' when given an SVMLightModel, each pair is scored as it is featurized and its score is written to the predictions file, like svm_classify
+    would write it. If there is also a score threshold, only the pairs that score at least the threshold are written to either file '''
 
-    def __init__(self, outputFeaturesFile, featurizer):
+    def __init__(self, outputFeaturesFile, featurizer, model=None, outputPredictionsFile=None, scoreThreshold=None):
         super().__init__(outputFeaturesFile, featurizer)
         self.asjpConversionDict = {}
         self.alineConversionDict = {}
         self.defnToCleanDict = {}
+        self.wordRecordDict = {}
+        self.model = model
+        self.outputPredictionsFile = outputPredictionsFile
+        self.scoreThreshold = scoreThreshold
+
+
+    def __enter__(self):
+        super().__enter__()
+        self.outputPredictionsHandle = None
+        if self.outputPredictionsFile is not None:
+            self.outputPredictionsHandle = open(self.outputPredictionsFile, 'w')
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        super().__exit__(exc_type, exc_value, traceback)
+        if self.outputPredictionsHandle is not None:
+            self.outputPredictionsHandle.close()
+
+
+    def writeScoreToFile(self, score):
+        if self.outputPredictionsHandle is not None:
+            self.outputPredictionsHandle.write(formatScore(score) + "\n")
 
 
     def getASJP(self, uni):
@@ -70,11 +95,47 @@ class GeneralFeatureRunner(FeatureRunner):
 
     def featurizeGivenPair(self, word1, word2, asjp1, asjp2, aline1, aline2, def1, def2, cleanedDef1, cleanedDef2, acc1, acc2, classification=-1):
         ''' given a word pair in asjp and their definitions, runs the featurizer on them and outputs the pair
-        and feature values to their respective files '''
+        and feature values to their respective files. Returns False if the pair was left out for scoring below the score threshold '''
 
         self.featurizer.setWords(word1, word2, asjp1, asjp2, aline1, aline2, def1, def2, cleanedDef1, cleanedDef2, acc1, acc2, classification)
         self.featurizer.runAllFeatures()
+        if self.model is not None:
+            score = self.model.scoreFeatureValues(self.featurizer.featureValues)
+            if self.scoreThreshold is not None and score < self.scoreThreshold:
+                return False
+            self.writeScoreToFile(score)
         self.writeFeaturesToFile()
+        return True
+
+
+    def getWordRecord(self, word, asjp, aline, defn, cleanDef, acc):
+        # the featurizer's record of the word and definition (see GeneralFeaturizer.createWordRecord) is only made the first time it is needed
+        key = (acc, word, defn)
+        if key in self.wordRecordDict:
+            record = self.wordRecordDict[key]
+        else:
+            record = self.featurizer.createWordRecord(word, asjp, aline, defn, cleanDef, acc)
+            self.wordRecordDict[key] = record
+        return record
+
+
+    def featurizeGivenBatch(self, record1, records2, classification=-1):
+        ''' runs the featurizer on the word of record1 against each word of records2 (see GeneralFeaturizer.featurizeBatch), and outputs the
+        feature values of each pair to the features file. Returns the indices into records2 of the pairs that were written, which is all of
+        them unless some were left out for scoring below the score threshold '''
+        featureMatrix = self.featurizer.featurizeBatch(record1, records2)
+        indices = range(len(records2))
+        if self.model is not None:
+            scores = self.model.scoreFeatureMatrix(featureMatrix)
+            if self.scoreThreshold is not None:
+                indices = (scores >= self.scoreThreshold).nonzero()[0].tolist()
+                featureMatrix = featureMatrix[indices]
+                scores = scores[indices]
+            for score in scores.tolist():
+                self.writeScoreToFile(score)
+        for lineToPrint in self.featurizer.getBatchOutputLines(classification, featureMatrix):
+            self.outputFeatureHandle.write(lineToPrint + "\n")
+        return indices
 
 
 
@@ -3,22 +3,23 @@
 
 
 from StopWords import EnglishStopWords, SpanishStopWords
-from WordNetFileHandler import WordNetFileHandler
+from WordNetFileHandler import WordNetFileHandler, BitsetWordNetFileHandler, WordNetVocabulary
 
 from UniToASJPConverter import uniToASJP
 from UniToALINEConverter import uniToALINE
 from alignmentFeatures import getAlignmentFeatures, lookUpWordPairStrict
-import binaryReadAndWrite
+from AlignmentScoreIndex import AlignmentScoreIndex
 
 import DefinitionCleaner
+import VectorSnapshot
 
 import StringSimilarity
+from functools import lru_cache
+import numpy as np
+import os
 import sys
 import time
 
-from gensim.models import Word2Vec as w2v
-#from gensim.models.keyedvectors import KeyedVectors as w2v
-
 import editdistance
 
 
@@ -30,6 +31,71 @@ ENGLISH_VECTORS = "GoogleNews-vectors-negative300.bin.gz"
 # download from http://crscardellino.me/SBWCE/
 SPANISH_VECTORS = "SBW-vectors-300-min5.bin"
 
+PROFILE_CACHE_SIZE = 20000 # the number of definition profiles that are kept
+
+def formatFeatureValue(featureValue):
+    featureValue = round(featureValue, 15) # round to 15 spots like old perl output so easier to compare
+    # turn 1.0 and 0.0 into ints so it matches the old perl output
+    if featureValue == 1.0:
+        featureValue = 1
+    if featureValue == 0.0:
+        featureValue = 0
+    return str(featureValue)
+
+
+def getOutputLine(classification, featureValues):
+    ''' creates the string of SVM features to be printed to the output file, from the classification and the list of feature values '''
+    outputLine = str(classification)
+    for i in range(len(featureValues)):
+        featureNum = i + 1 # i starts at 0 but features start at 1
+        outputLine += " " + str(featureNum) + ":" + formatFeatureValue(featureValues[i])
+    return outputLine
+
+
+
+class DefinitionProfile(object):
+    ''' everything about a cleaned definition that the features need, including its WordNet sets (see GeneralFeaturizer.createDefinitionProfile).
+    It doesn't depend on the word it belongs to, so it is worked out once and then shared by every pair the definition is in.
+    The keywords and WordNet sets are sets of strings, or bitsets if the featurizer uses wordNetBitsets '''
+
+    def __init__(self, cleanDef):
+        self.cleanDef = cleanDef
+        self.splitDefs = None
+        self.splitDefsWords = None # the words of each split definition
+        self.splitDefsNoStop = None # each split definition without its stop words
+        self.keywords = None
+        self.forms = None
+        # the WordNet sets, which are only worked out if the semantic features (4 to 9) are used
+        self.synonyms = None # of the keywords
+        self.synonymsOfForms = None
+        self.synsets = None # of the keywords
+        self.hyperonyms = None # of the synsets
+        self.formSynsets = None # of the forms and keywords
+        self.formHyperonyms = None # of the formSynsets
+        # the unit mean word2vec vector of each split definition, as the rows of a float32 matrix, which are only worked out if the word2vec
+        # features (16 and 17) are used. A split definition with no words in the model has a row of zeros
+        self.allWordsVectors = None
+        self.contentWordsVectors = None # of the split definitions without their stop words
+
+
+
+class WordRecord(object):
+    ''' a word and one of its definitions, along with the profile of the definition (see GeneralFeaturizer.createWordRecord) '''
+
+    def __init__(self, word, asjp, aline, defn, cleanDef, acc, profile):
+        self.word = word
+        self.asjp = asjp
+        self.aline = aline
+        self.defn = defn
+        self.cleanDef = cleanDef
+        self.acc = acc
+        # if we featurize against proto words that are only in ASJP, then that word does not have a UNI representation to print out
+        self.printForm = asjp if word is None else word
+        self.profile = profile
+        self.asjpMasks = StringSimilarity.getPositionMasks(asjp) # for the LCS of the word with every word it is paired with (see normalizedLCSForm)
+
+
+
 class GeneralFeaturizer(object):
 
     # define different feature sets
@@ -43,23 +109,19 @@ class GeneralFeaturizer(object):
 
     featureMapping = {"phonetic": phoneticFeatures, "surface":surfaceSemanticFeatures, "wordNet":wordNetFeatures, "word2Vec":word2VecFeatures, "word2VecNoWordNet":word2VecFeaturesNoWordNet}
 
-    def __init__(self, definitionLanguage, alignFeaturesFile=None, featureNumbersToUse=allFeatures): # features 11,12 (prefix and suffix) off by default
-        ''' loads the default files '''
+    def __init__(self, definitionLanguage, alignFeaturesFile=None, featureNumbersToUse=allFeatures, wordNetBitsets=True): # features 11,12 (prefix and suffix) off by default
+        ''' loads the default files. With wordNetBitsets, the WordNet sets of the definitions are kept as bitsets
+        (see WordNetFileHandler.BitsetWordNetFileHandler), which give the same feature values faster '''
 
+        self.wordNetBitsets = wordNetBitsets
         if definitionLanguage == "en":
             self.stopWords = EnglishStopWords()
-            self.synonyms = WordNetFileHandler(DATA_PATH + "/en_synonyms.txt")
-            self.forms = WordNetFileHandler(DATA_PATH + "/en_forms.txt")
-            self.synsets = WordNetFileHandler(DATA_PATH + "/en_synsets.txt")
-            self.hyperonyms = WordNetFileHandler(DATA_PATH + "/en_hyperonyms.txt")
+            self.createWordNetHandlers("en")
             self.vectorsPath = DATA_PATH + "/" + ENGLISH_VECTORS
             
         elif definitionLanguage == "es":
             self.stopWords = SpanishStopWords()
-            self.synonyms = WordNetFileHandler(DATA_PATH + "/es_synonyms.txt")
-            self.forms = WordNetFileHandler(DATA_PATH + "/es_forms.txt")
-            self.synsets = WordNetFileHandler(DATA_PATH + "/es_synsets.txt")
-            self.hyperonyms = WordNetFileHandler(DATA_PATH + "/es_hyperonyms.txt")
+            self.createWordNetHandlers("es")
             self.vectorsPath = DATA_PATH + "/" + SPANISH_VECTORS 
 
         # by default, features 11 and 12 (PREFIX and SUFFIX) are turned off
@@ -76,8 +138,30 @@ class GeneralFeaturizer(object):
 
         self.vowels = set('aeiou3EOI')
         self.initFeatureList()
+        self.getDefinitionProfile = lru_cache(maxsize=PROFILE_CACHE_SIZE)(self.createDefinitionProfile)
         self.alignFeaturesFile = alignFeaturesFile
         self.readAlignmentFile()
+        # if set, the alignment features of a pair that isn't in the alignment file are worked out rather than being an error
+        # (eg: for the semantic neighbours of runGeneralFeaturizerOnLangDicts.py, which can be below the threshold of the file)
+        self.alignMissingPairs = False
+        self.pairAlignmentScores = None # the looked up scores of the pair being featurized, when featurizeBatch has looked them all up at once
+
+
+    def createWordNetHandlers(self, definitionLanguage):
+        if self.wordNetBitsets:
+            self.words = WordNetVocabulary() # the IDs of the keywords and the words they map to
+            self.synsetIDs = WordNetVocabulary()
+            self.synonyms = BitsetWordNetFileHandler(DATA_PATH + "/{0}_synonyms.txt".format(definitionLanguage), self.words, self.words)
+            self.forms = BitsetWordNetFileHandler(DATA_PATH + "/{0}_forms.txt".format(definitionLanguage), self.words, self.words)
+            self.synsets = BitsetWordNetFileHandler(DATA_PATH + "/{0}_synsets.txt".format(definitionLanguage), self.words, self.synsetIDs)
+            self.hyperonyms = BitsetWordNetFileHandler(DATA_PATH + "/{0}_hyperonyms.txt".format(definitionLanguage), self.synsetIDs, self.synsetIDs)
+            self.difference = lambda bits1, bits2: bits1 & ~bits2
+        else:
+            self.synonyms = WordNetFileHandler(DATA_PATH + "/{0}_synonyms.txt".format(definitionLanguage))
+            self.forms = WordNetFileHandler(DATA_PATH + "/{0}_forms.txt".format(definitionLanguage))
+            self.synsets = WordNetFileHandler(DATA_PATH + "/{0}_synsets.txt".format(definitionLanguage))
+            self.hyperonyms = WordNetFileHandler(DATA_PATH + "/{0}_hyperonyms.txt".format(definitionLanguage))
+            self.difference = lambda set1, set2: set1 - set2
 
 
     def readAlignmentFile(self):
@@ -87,7 +171,8 @@ class GeneralFeaturizer(object):
         else:
             sys.stderr.write("reading alignment file {0}...\n".format(self.alignFeaturesFile))
             t1 = time.time()
-            self.alignmentFeaturesDict = binaryReadAndWrite.readFromBinary(self.alignFeaturesFile)
+            # the file is looked up through a memory-mapped index rather than read into a dict, so this is quick and is shared by forked processes
+            self.alignmentFeaturesDict = AlignmentScoreIndex([self.alignFeaturesFile])
             sys.stderr.write("finished reading alignment file...\n")
             t2 = time.time()
             sys.stderr.write("time to read alignment file = {0:.2f}m\n".format((t2-t1)/60.0))
@@ -99,42 +184,164 @@ class GeneralFeaturizer(object):
         # it reads in an additional alignment features file and adds those pairs to self.alignmentFeaturesDict
 
         if self.alignmentFeaturesDict is None:
-            # if no alignmentFeaturesDict exists yet, just set it to an empty dictionary so it can be added to
-            self.alignmentFeaturesDict = {}
+            # if no alignmentFeaturesDict exists yet, just set it to an empty index so it can be added to
+            self.alignmentFeaturesDict = AlignmentScoreIndex()
 
-        # now read the given alignFeaturesFile into a new dictionary
         sys.stderr.write("reading alignment file {0}...\n".format(alignFeaturesFile))
         t1 = time.time()
-        newAlignmentFeaturesDict = binaryReadAndWrite.readFromBinary(alignFeaturesFile)
+        self.alignmentFeaturesDict.addFile(alignFeaturesFile)
+        # the files are put together into one table to look the pairs up in, which is made here so forked processes share it
+        self.alignmentFeaturesDict.getTable()
         sys.stderr.write("finished reading alignment file...\n")
         t2 = time.time()
         sys.stderr.write("time to read alignment file = {0:.2f}m\n".format((t2-t1)/60.0))
 
-        # now update the overallalignment features dict to contain the new pairs
-        self.alignmentFeaturesDict.update(newAlignmentFeaturesDict)
-
 
     def setWords(self, word1, word2, asjp1, asjp2, aline1, aline2, def1, def2, cleanDef1, cleanDef2, acc1, acc2,  classification=0):
-        self.acc1 = acc1
-        self.acc2 = acc2
-        self.word1 = word1
-        self.word2 = word2
-        self.asjp1 = asjp1
-        self.asjp2 = asjp2
-        self.aline1 = aline1
-        self.aline2 = aline2
-        self.def1 = def1
-        self.def2 = def2
-        self.cleanDef1 = cleanDef1
-        self.cleanDef2 = cleanDef2
-        self.splitDefs1 = self.splitDef(cleanDef1)
-        self.splitDefs2 = self.splitDef(cleanDef2)
+        record1 = self.createWordRecord(word1, asjp1, aline1, def1, cleanDef1, acc1)
+        record2 = self.createWordRecord(word2, asjp2, aline2, def2, cleanDef2, acc2)
+        self.setWordRecords(record1, record2, classification)
+
+
+    def createWordRecord(self, word, asjp, aline, defn, cleanDef, acc):
+        ''' returns the WordRecord of a word and one of its definitions, which holds everything about them that the features need. A word
+        that is featurized against many others (see featurizeBatch) only needs its record made once '''
+        return WordRecord(word, asjp, aline, defn, cleanDef, acc, self.getDefinitionProfile(cleanDef))
+
+
+    def createDefinitionProfile(self, cleanDef):
+        ''' returns the DefinitionProfile of the cleaned definition. This is called through getDefinitionProfile, which keeps the most
+        recently used profiles, so the WordNet sets of a definition are looked up once rather than for each of the many words it is paired with '''
+        profile = DefinitionProfile(cleanDef)
+        profile.splitDefs = self.splitDef(cleanDef)
+        profile.splitDefsWords = [splitDef.split() for splitDef in profile.splitDefs]
+        profile.splitDefsNoStop = [self.stopWords.removeStopWords(splitDef) for splitDef in profile.splitDefs]
+        profile.keywords = self.getKeywords(profile.splitDefs)
+        if self.wordNetBitsets:
+            profile.keywords = self.words.getBits(sorted(profile.keywords))
+        profile.forms = self.forms.at(profile.keywords) #| profile.keywords # consider keyword to be form
+
+        if set((4,5,6,7,8,9)) & self.featureNumbersToUse:
+            profile.synonyms = self.synonyms.at(profile.keywords)
+            profile.synonymsOfForms = self.synonyms.at(profile.forms) #| profile.forms # the forms are considered formsynonyms
+            profile.synsets = self.synsets.at(profile.keywords)
+            profile.hyperonyms = self.hyperonyms.at(profile.synsets)
+            profile.formSynsets = self.synsets.at(profile.forms | profile.keywords)
+            profile.formHyperonyms = self.hyperonyms.at(profile.formSynsets)
+
+        if 16 in self.featureNumbersToUse:
+            profile.allWordsVectors = self.getDefinitionVectors(profile.splitDefsWords)
+            profile.contentWordsVectors = self.getDefinitionVectors([[word for word in words if word not in self.stopWords]
+                                                                     for words in profile.splitDefsWords])
+        return profile
+
+
+    def getDefinitionVectors(self, splitDefsWords):
+        ''' returns the matrix of the unit mean vectors of the words of each split definition that are in the model (see DefinitionProfile).
+        The cosine similarity that model.n_similarity gives two lists of words is then the dot product of their rows '''
+        vectors = np.zeros((len(splitDefsWords), self.model.vector_size), dtype=np.float32)
+        for i, words in enumerate(splitDefsWords):
+            wordsInModel = [word for word in words if word in self.model]
+            if wordsInModel:
+                meanVector = np.mean([self.model[word] for word in wordsInModel], axis=0, dtype=np.float32)
+                norm = np.linalg.norm(meanVector)
+                if norm > 0:
+                    vectors[i] = meanVector / norm
+        return vectors
+
+
+    def setWordRecords(self, record1, record2, classification=0):
+        self.setWordRecord1(record1)
+        self.setWordRecord2(record2)
         self.classification = classification
         self.initLengthStats()
-        self.initPrintForm()
-        self.setKeywords()
-        self.setForms()
         self.featureValues = [] # list keeping the feature values, in order of addition
+        self.pairAlignmentScores = None
+
+
+    def setWordRecord1(self, record):
+        self.acc1 = record.acc
+        self.word1 = record.word
+        self.asjp1 = record.asjp
+        self.aline1 = record.aline
+        self.def1 = record.defn
+        self.cleanDef1 = record.cleanDef
+        self.printForm1 = record.printForm
+        self.asjpMasks1 = record.asjpMasks
+        profile = record.profile
+        self.splitDefs1 = profile.splitDefs
+        self.splitDefsWords1 = profile.splitDefsWords
+        self.splitDefsNoStop1 = profile.splitDefsNoStop
+        self.keywords1 = profile.keywords
+        self.forms1 = profile.forms
+        self.synonyms1 = profile.synonyms
+        self.synonymsOfForms1 = profile.synonymsOfForms
+        self.synsets1 = profile.synsets
+        self.hyperonyms1 = profile.hyperonyms
+        self.formSynsets1 = profile.formSynsets
+        self.formHyperonyms1 = profile.formHyperonyms
+        self.allWordsVectors1 = profile.allWordsVectors
+        self.contentWordsVectors1 = profile.contentWordsVectors
+
+
+    def setWordRecord2(self, record):
+        self.acc2 = record.acc
+        self.word2 = record.word
+        self.asjp2 = record.asjp
+        self.aline2 = record.aline
+        self.def2 = record.defn
+        self.cleanDef2 = record.cleanDef
+        self.printForm2 = record.printForm
+        profile = record.profile
+        self.splitDefs2 = profile.splitDefs
+        self.splitDefsWords2 = profile.splitDefsWords
+        self.splitDefsNoStop2 = profile.splitDefsNoStop
+        self.keywords2 = profile.keywords
+        self.forms2 = profile.forms
+        self.synonyms2 = profile.synonyms
+        self.synonymsOfForms2 = profile.synonymsOfForms
+        self.synsets2 = profile.synsets
+        self.hyperonyms2 = profile.hyperonyms
+        self.formSynsets2 = profile.formSynsets
+        self.formHyperonyms2 = profile.formHyperonyms
+        self.allWordsVectors2 = profile.allWordsVectors
+        self.contentWordsVectors2 = profile.contentWordsVectors
+
+
+    def featurizeBatch(self, word1Record, word2Records):
+        ''' featurizes the word of word1Record against each of the word2Records (see createWordRecord), and returns the feature values as a
+        numpy array with a row for each of the word2Records. The values are exactly the ones featurizing the pairs one at a time would give,
+        but the state of each word is only worked out once rather than for every pair it is in '''
+        featureMatrix = np.zeros((len(word2Records), len(self.featureListNames)))
+        self.setWordRecord1(word1Record)
+        batchAlignmentScores = self.getBatchAlignmentScores(word1Record, word2Records)
+        for i, word2Record in enumerate(word2Records):
+            self.setWordRecord2(word2Record)
+            self.pairAlignmentScores = batchAlignmentScores[i] if batchAlignmentScores is not None else None
+            self.initLengthStats()
+            self.featureValues = []
+            for featureMethod in self.pairFeatureMethods:
+                featureMethod()
+            featureMatrix[i, :len(self.featureValues)] = self.featureValues
+        if 16 in self.featureNumbersToUse and word2Records:
+            # the word2vec features are the last two, and are worked out for all the pairs at once
+            featureMatrix[:, -2] = self.getBatchWord2VecScores(word1Record.profile.allWordsVectors,
+                                                               [word2Record.profile.allWordsVectors for word2Record in word2Records])
+            featureMatrix[:, -1] = self.getBatchWord2VecScores(word1Record.profile.contentWordsVectors,
+                                                               [word2Record.profile.contentWordsVectors for word2Record in word2Records])
+        self.pairAlignmentScores = None
+        return featureMatrix
+
+
+    def getBatchAlignmentScores(self, word1Record, word2Records):
+        ''' looks up the alignment scores of all the pairs of a batch with one search of the alignment index, and returns a
+        (score, normalizedAlignedConsonants) for each, which are both None for a pair that isn't in the index. Returns None if there are
+        no alignment features to look up '''
+        if self.alignmentFeaturesDict is None or self.alignmentFeatures not in self.pairFeatureMethods:
+            return None
+        scores, found = self.alignmentFeaturesDict.getPairs(word1Record.aline, [word2Record.aline for word2Record in word2Records])
+        return [(score, normalizedAlignedConsonants) if isFound else (None, None)
+                for (score, normalizedAlignedConsonants), isFound in zip(scores.tolist(), found.tolist())]
 
 
     def splitDef(self, defn):
@@ -148,15 +355,9 @@ class GeneralFeaturizer(object):
         return defn.split(";")
 
 
-    def setKeywords(self):
+    def getKeywords(self, splitDefs):
         # update March 16, keywords are now just content words
-        self.keywords1 = {word for defn in self.splitDefs1 for word in defn.split() if word not in self.stopWords} # just the non-stop-words of all split definitions
-        self.keywords2 = {word for defn in self.splitDefs2 for word in defn.split() if word not in self.stopWords}
-
-
-    def setForms(self):
-        self.forms1 = self.forms.at(self.keywords1) #| self.keywords1 # consider keyword to be form
-        self.forms2 = self.forms.at(self.keywords2) #| self.keywords2
+        return {word for defn in splitDefs for word in defn.split() if word not in self.stopWords} # just the non-stop-words of all split definitions
 
 
     def initLengthStats(self):
@@ -167,20 +368,6 @@ class GeneralFeaturizer(object):
         self.minLenWord = min(self.lenWord1, self.lenWord2)
 
     
-    def initPrintForm(self):
-        ''' this method sets self.printForm1 and self.printForm2. Needed since if we featurize against proto words that are only in
-        ASJP, then that word does not have a UNI representation to print out. '''
-        if self.word1 is None:
-            self.printForm1 = self.asjp1
-        else:
-            self.printForm1 = self.word1
-
-        if self.word2 is None:
-            self.printForm2 = self.asjp2
-        else:
-            self.printForm2 = self.word2
-
-
     def addFeature(self, value):
         self.featureValues.append(value)
 
@@ -192,19 +379,22 @@ class GeneralFeaturizer(object):
 
     def getOutputLine(self):
         ''' creates the string of SVM features to be printed to the output file '''
-        outputLine = str(self.classification)
-        for i in range(len(self.featureValues)):
-            featureNum = i + 1 # i starts at 0 but features start at 1
-            outputLine += " " + str(featureNum) + ":"
-            featureValue = round(self.featureValues[i], 15) # round to 15 spots like old perl output so easier to compare
-            # turn 1.0 and 0.0 into ints so it matches the old perl output
-            if featureValue == 1.0:
-                featureValue = 1
-            if featureValue == 0.0:
-                featureValue = 0
-            outputLine += str(featureValue)
+        return getOutputLine(self.classification, self.featureValues)
 
-        return outputLine
+
+    def getBatchOutputLines(self, classification, featureMatrix):
+        ''' creates the strings of SVM features of each row of a featurizeBatch array, like getOutputLine '''
+        prefixes = [" {0}:".format(featureNum) for featureNum in range(1, featureMatrix.shape[1] + 1)]
+        valueStrings = {} # most of the values come up again and again (eg: 0 and 1), so each one is only formatted once
+        outputLines = []
+        for featureValues in featureMatrix.tolist():
+            outputLine = [str(classification)]
+            for prefix, featureValue in zip(prefixes, featureValues):
+                if featureValue not in valueStrings:
+                    valueStrings[featureValue] = formatFeatureValue(featureValue)
+                outputLine.append(prefix + valueStrings[featureValue])
+            outputLines.append("".join(outputLine))
+        return outputLines
 
 
     def getReadableOutputLine(self):
@@ -324,10 +514,10 @@ class GeneralFeaturizer(object):
 
 
         if 16 in self.featureNumbersToUse:
-            t1 = time.clock()
+            t1 = time.time()
             sys.stderr.write("reading vectors file...\n")
-            self.model = w2v.load_word2vec_format(self.vectorsPath, binary=True) #
-            t2 = time.clock()
+            self.model = self.loadVectors()
+            t2 = time.time()
             seconds = t2-t1
             minutes = seconds/60.0
             sys.stderr.write("finished reading vectors file in {0:.2f} seconds = {1:.2f} minutes!\n".format(seconds, minutes))
@@ -336,8 +526,33 @@ class GeneralFeaturizer(object):
             self.featureListNames.append("Word2Vec n_Similarity Score") #16
             self.featureListNames.append("Word2Vec content words n_Similarity Score") #17
 
+        # the methods featurizeBatch runs for each pair, since it works out the word2vec features of all the pairs at once
+        self.pairFeatureMethods = [featureMethod for featureMethod in self.featureListMethods if featureMethod != self.word2VecFeatures]
+
 
         
+    def loadVectors(self):
+        ''' if there is a snapshot of the vectors of the definition words (see VectorSnapshot.py), that is loaded, which only takes milliseconds.
+        Otherwise, the first time, the word2vec model is read from the vectors file and saved again in gensim's own format, which keeps the vector matrix in
+        its own .npy file. From then on that copy is loaded with the matrix memory-mapped read-only, so it is quick to load and every process that
+        loads it (or is forked after loading it) shares the same pages of the matrix instead of having its own copy '''
+        snapshotPath = VectorSnapshot.getSnapshotPath(self.vectorsPath)
+        if VectorSnapshot.isSnapshotCurrent(self.vectorsPath, snapshotPath):
+            return VectorSnapshot.VectorSnapshot(snapshotPath)
+
+        # gensim is only imported here, since importing it takes longer than starting a featurizer without the word2vec features
+        from gensim.models import Word2Vec as w2v
+        from gensim.utils import SaveLoad
+        #from gensim.models.keyedvectors import KeyedVectors as w2v
+
+        mappedPath = self.vectorsPath + ".model"
+        if not os.path.exists(mappedPath) or os.path.getmtime(mappedPath) < os.path.getmtime(self.vectorsPath):
+            model = w2v.load_word2vec_format(self.vectorsPath, binary=True)
+            model.save(mappedPath) # the matrix files are written before the model file, so the model file only exists once they are complete
+            del model
+        return SaveLoad.load(mappedPath, mmap='r')
+
+
     def definitionMatch(self):
         # feature 1: do the definitions match exactly?
         # check all split defs of each one, and if there exists any exact match, fire the feature
@@ -353,10 +568,8 @@ class GeneralFeaturizer(object):
     def definitionWithOutStopWordsMatch(self):
         # feature 3: do the definitions match if exlcude stop words?
         # if any of the split defs match, fire the feature
-        for def1 in self.splitDefs1:
-            def1NoStop = self.stopWords.removeStopWords(def1)
-            for def2 in self.splitDefs2:
-                def2NoStop = self.stopWords.removeStopWords(def2)
+        for def1NoStop in self.splitDefsNoStop1:
+            for def2NoStop in self.splitDefsNoStop2:
                 if def1NoStop == def2NoStop:
                     self.addFeature(1)
                     return
@@ -368,10 +581,8 @@ class GeneralFeaturizer(object):
         # new version of NED for definitoins. 
         # use the maximum value between all the split definitions
         maxInverted = 0 # inverted score goes between 0 and 1, so initialize max to 0
-        for def1 in self.splitDefs1:
-            words1 = def1.split()
-            for def2 in self.splitDefs2:
-                words2 = def2.split()
+        for words1 in self.splitDefsWords1:
+            for words2 in self.splitDefsWords2:
                 defEditDistance = editdistance.eval(words1, words2)
                 maxLenDef = max(len(words1), len(words2))
                 normalized = defEditDistance / maxLenDef
@@ -428,7 +639,7 @@ class GeneralFeaturizer(object):
         #print(self.forms1 & self.keywords2) 
         #print(self.forms2 & self.keywords1)
         #print("formsIntersect = {0}".format(formsIntersect))
-        nonTrivialFormsIntersect = formsIntersect - trivialFormsMatches # decouple from the keywords feature
+        nonTrivialFormsIntersect = self.difference(formsIntersect, trivialFormsMatches) # decouple from the keywords feature
         #print("nonTrivFormsIntersect")
         #print(nonTrivialFormsIntersect)
         if 9 in self.featureNumbersToUse:
@@ -443,8 +654,8 @@ class GeneralFeaturizer(object):
         #synonyms1 = self.synonyms.at(self.keywords1) | self.keywords1 # the keywords are considerred a synonym
         #synonyms2 = self.synonyms.at(self.keywords2) | self.keywords2 
         #synonymsIntersect = synonyms1 & synonyms2
-        synonyms1 = self.synonyms.at(self.keywords1) 
-        synonyms2 = self.synonyms.at(self.keywords2) 
+        synonyms1 = self.synonyms1 # the synonyms of the keywords
+        synonyms2 = self.synonyms2
 
         #print("syns1")
         #print(synonyms1)
@@ -466,8 +677,8 @@ class GeneralFeaturizer(object):
         #trivialSynonymOfFormMatches = set()
         # if the defs have form matches, then those will necessarily lead to synonymOfForm matches, but we don't want to count these
         #print("trivialSynForm = {0}".format(trivialSynonymOfFormMatches))
-        synonymOfForms1 = self.synonyms.at(self.forms1) #| self.forms1 # the forms are considered formsynonyms
-        synonymOfForms2 = self.synonyms.at(self.forms2) #| self.forms2 
+        synonymOfForms1 = self.synonymsOfForms1
+        synonymOfForms2 = self.synonymsOfForms2
         
         synonymOfFormsIntersect = (synonymOfForms1 & self.forms2) | (synonymOfForms2 & self.forms1) |  (synonymOfForms1 & self.keywords2) | (synonymOfForms2 & self.keywords1)
         #print("form1 = {0}\nforms2 = {1}".format(self.forms1, self.forms2))
@@ -480,13 +691,13 @@ class GeneralFeaturizer(object):
 
 
     def hyperonymMatch(self):
-        synsets1 = self.synsets.at(self.keywords1)
-        synsets2 = self.synsets.at(self.keywords2)
+        synsets1 = self.synsets1 # the synsets of the keywords
+        synsets2 = self.synsets2
 
         #print("syns1 = {0}".format(synsets1))
         #print("syns2 = {0}".format(synsets2))
-        hyperonyms1 = self.hyperonyms.at(synsets1)
-        hyperonyms2 = self.hyperonyms.at(synsets2)
+        hyperonyms1 = self.hyperonyms1 # the hyperonyms of the synsets
+        hyperonyms2 = self.hyperonyms2
 
         #print("hyp1 = {0}".format(hyperonyms1))
         #print("hyp2 = {0}".format(hyperonyms2))
@@ -505,17 +716,17 @@ class GeneralFeaturizer(object):
 
 
     def formHyperonymMatch(self, synsets1, synsets2, hyperonyms1of2, hyperonyms2of1):
-        formSynsets1 = self.synsets.at(self.forms1 | self.keywords1)
-        formSynsets2 = self.synsets.at(self.forms2 | self.keywords2)
+        formSynsets1 = self.formSynsets1 # the synsets of the forms and keywords
+        formSynsets2 = self.formSynsets2
 
-        formHyperonyms1 = self.hyperonyms.at(formSynsets1)
-        formHyperonyms2 = self.hyperonyms.at(formSynsets2)
+        formHyperonyms1 = self.formHyperonyms1
+        formHyperonyms2 = self.formHyperonyms2
 
         formHyperonyms1of2 = (formHyperonyms1 & formSynsets2) | (formHyperonyms1 & synsets2) 
         formHyperonyms2of1 = (formHyperonyms2 & formSynsets1) | (formHyperonyms2 & synsets1) 
 
-        nonTrivialFormHyperonyms1of2 = formHyperonyms1of2 - hyperonyms1of2 # decouple from hyperonymMatch feature
-        nonTrivialFormHyperonyms2of1 = formHyperonyms2of1 - hyperonyms2of1
+        nonTrivialFormHyperonyms1of2 = self.difference(formHyperonyms1of2, hyperonyms1of2) # decouple from hyperonymMatch feature
+        nonTrivialFormHyperonyms2of1 = self.difference(formHyperonyms2of1, hyperonyms2of1)
 
         if nonTrivialFormHyperonyms1of2 or nonTrivialFormHyperonyms2of1:
             self.addFeature(1)
@@ -561,8 +772,13 @@ class GeneralFeaturizer(object):
             print("no alignment dict to look at")
             score, normalizedAlignedConsonants  = getAlignmentFeatures(self.aline1, self.aline2)
         else:
-            score, normalizedAlignedConsonants = lookUpWordPairStrict(self.alignmentFeaturesDict, self.aline1, self.aline2)
-            if score is None:
+            if self.pairAlignmentScores is not None:
+                score, normalizedAlignedConsonants = self.pairAlignmentScores # looked up along with the rest of the batch
+            else:
+                score, normalizedAlignedConsonants = lookUpWordPairStrict(self.alignmentFeaturesDict, self.aline1, self.aline2)
+            if score is None and self.alignMissingPairs:
+                score, normalizedAlignedConsonants = getAlignmentFeatures(self.aline1, self.aline2)
+            elif score is None:
                 sys.stderr.write("couldn't find pair: {0}, {1}\n".format(self.aline1, self.aline2))
                 exit(-1)
 
@@ -573,66 +789,37 @@ class GeneralFeaturizer(object):
 
     def normalizedLCSForm(self):
         ''' calculates the normalized longest common subsequence and adds it as a feature '''
-        longestCommonSubsequence = StringSimilarity.lcs(self.asjp1, self.asjp2)
-        normalizedLCS = float(len(longestCommonSubsequence)) / self.maxLenWord
+        # only the length of the LCS is needed, which the bit-parallel kernel gives straight from the masks of word1's letters
+        longestCommonSubsequenceLength = StringSimilarity.lcsLength(self.asjp1, self.asjp2, self.asjpMasks1)
+        normalizedLCS = float(longestCommonSubsequenceLength) / self.maxLenWord
         #print("normalizedLCS = {0}".format(normalizedLCS))
         self.addFeature(normalizedLCS)
 
 
     def word2VecFeatures(self):
-        
-        # split the defs on white spaces and semicolons to get a list of words to pass to the model
-        # we are treating the whole thing as one big definition here. Even though
-        # for other features we look at each split on semicolons
-
-        maxAllWords = 0
-        maxContentWords = 0
-        for def1 in self.splitDefs1:
-            words1 = def1.split()
-            wordsInModel1 = [x for x in words1 if x in self.model]
-
-            for def2 in self.splitDefs2:
-                words2 = def2.split()
-                wordsInModel2 = [x for x in words2 if x in self.model]
-
-                #print("words in model1 = {0}".format(wordsInModel1))
-                #print("words in model2 = {0}".format(wordsInModel2))
-                scoreAllWords = self.getWord2VecScoreFromListsOfWords(wordsInModel1, wordsInModel2)
-                #print("ScoreAllWords = {0}".format(scoreAllWords))
-                if scoreAllWords > maxAllWords:
-                    maxAllWords = scoreAllWords
-
-                contentWordsInModel1 = [x for x in wordsInModel1 if x not in self.stopWords]
-                contentWordsInModel2 = [x for x in wordsInModel2 if x not in self.stopWords]
-                #print("content words in model1 = {0}".format(contentWordsInModel1))
-                #print("content words in model2 = {0}".format(contentWordsInModel2))
-
-                scoreContentWords = self.getWord2VecScoreFromListsOfWords(contentWordsInModel1, contentWordsInModel2)
-                #print("scoreContentWords = {0}".format(scoreContentWords))
-                if scoreContentWords > maxContentWords:
-                    maxContentWords = scoreContentWords
-        
-        self.addFeature(maxAllWords)
-        self.addFeature(maxContentWords)
-
-        # we filter the words based on whether they asre in the model or not
-        # otherwise we would get a key error
-        
-
-    def getWord2VecScoreFromListsOfWords(self, words1, words2):
-        if words1 == [] or words2 == []:
-            # at least one of the sentences has no words in the model so simply return 0
-            score = 0.0
-        else:
-            # the score from the model on each list of words
-            score = self.model.n_similarity(words1, words2)
-        return score
-
+        # features 16 and 17: the best cosine similarity between the mean vectors of any of the split definitions, with all of their words
+        # and with only their content words. The unit mean vectors are in the definition profiles, so each similarity is a dot product
+        self.addFeature(self.getWord2VecScore(self.allWordsVectors1, self.allWordsVectors2))
+        self.addFeature(self.getWord2VecScore(self.contentWordsVectors1, self.contentWordsVectors2))
 
 
+    def getWord2VecScore(self, vectors1, vectors2):
+        # the scores are made floats, so the value is printed the same whether it comes from the feature values list or a featurizeBatch array.
+        # a split definition with no words in the model has a vector of zeros, so its score is 0 like before
+        return max(0.0, float(np.max(self.getSimilarities(vectors1, vectors2))))
 
 
+    def getSimilarities(self, vectors1, vectors2):
+        # the dot products are summed as float64 and given back as float32 like n_similarity. A float32 matrix product can round differently
+        # depending on the shapes of the matrices, which would make the scores of featurizeBatch differ from those of one pair at a time
+        return (vectors1.astype(np.float64) @ vectors2.T.astype(np.float64)).astype(np.float32)
 
 
+    def getBatchWord2VecScores(self, vectors1, vectors2List):
+        ''' returns the getWord2VecScore of vectors1 with each matrix of vectors2List, from a single matrix product '''
+        vectors2 = np.concatenate(vectors2List)
+        starts = np.cumsum([0] + [len(vectors) for vectors in vectors2List[:-1]])
+        scores = np.max(self.getSimilarities(vectors1, vectors2), axis=0) # the best split definition of word1 for each split definition of the words2
+        return np.maximum(np.maximum.reduceat(scores, starts), 0.0).astype(np.float64)
 
 
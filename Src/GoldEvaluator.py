@@ -9,6 +9,8 @@ class GoldEvaluator(object):
     def __init__(self, cogSetFile):
         self.cogSetFile = cogSetFile
         self.numToCognateSet, self.wordToCogNum  = self.createGoldDicts()
+        self.idToCogSetIDs = {} # caches the cognate set of a word ID as (number of cognates, set of cognate IDs) 
+        self.cogNumToCogSetIDs = {} # so that the words of the same cognate set share one set of IDs
 
 
     def createGoldDicts(self):
@@ -115,3 +117,22 @@ class GoldEvaluator(object):
             return cogSet
         else:
             return None
+
+
+    def getCogSetIDsFromID(self, wordID, wordTable):
+        ''' the ID version of getCogSetFromTuple. given the ID of a word tuple in the wordTable, returns (number of cognates, set of IDs of 
+        the cognates), or None if not part of a cognate set. The gold words get added to the wordTable, so IDs can be compared directly '''
+        if wordID in self.idToCogSetIDs:
+            return self.idToCogSetIDs[wordID]
+
+        cogNum = self.getCogNumFromTuple(wordTable[wordID])
+        if cogNum is None:
+            cogSetIDs = None
+        elif cogNum in self.cogNumToCogSetIDs:
+            cogSetIDs = self.cogNumToCogSetIDs[cogNum]
+        else:
+            cogSet = self.getCogSetFromCogNum(cogNum)
+            cogSetIDs = (len(cogSet), frozenset(wordTable.getID(cogTuple) for cogTuple in cogSet))
+            self.cogNumToCogSetIDs[cogNum] = cogSetIDs
+        self.idToCogSetIDs[wordID] = cogSetIDs
+        return cogSetIDs
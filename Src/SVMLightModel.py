@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+
+''' reads a linear svm_light model file (eg: polynesian_model.txt or substring_model_cree_fox.txt from svm_learn) and scores feature values with it,
+so pairs can be scored as they are featurized rather than writing every pair's features out for svm_classify.
+
+A model file is a header of "value # description" lines, ending with the threshold b, and then a line for each support vector:
+    alpha*y featureNum:value featureNum:value ... #
+For the linear kernel the score svm_classify gives a feature vector x is w.x - b, where w is the sum of alpha*y times each support vector,
+so the support vectors are added up into w once when the model is read.
+
+run as a script it scores a features file like svm_classify does, and reports the accuracy and precision/recall on the lines that have a
+classification of +1 or -1:
+./SVMLightModel.py ../Output/GeneralFeatures/feature_values_cree_fox.txt ../Output/GeneralModel/polynesian_model.txt predictions_cree_fox.txt
+
+'''
+
+import sys
+
+import numpy as np
+
+
+LINEAR_KERNEL = 0
+
+
+def formatScore(score):
+    ''' formats a score the way svm_classify writes it in the predictions file '''
+    return "{0:.8g}".format(score)
+
+
+def getAccuracyReport(classifications, scores):
+    ''' the accuracy and precision/recall lines svm_classify reports for the given classifications (+1 or -1) and scores. A score above 0
+    is a positive prediction '''
+    numCorrect = numTruePositives = numPredictedPositives = numPositives = 0
+    for classification, score in zip(classifications, scores):
+        isPositive = classification > 0
+        predictedPositive = score > 0
+        numCorrect += isPositive == predictedPositive
+        numTruePositives += isPositive and predictedPositive
+        numPredictedPositives += predictedPositive
+        numPositives += isPositive
+    numExamples = len(classifications)
+    return ("Accuracy on test set: {0:.2%} ({1} correct, {2} incorrect, {3} total)\n"
+            "Precision/recall on test set: {4:.2%}/{5:.2%}".format(numCorrect / max(numExamples, 1), numCorrect, numExamples - numCorrect, numExamples,
+                                                                   numTruePositives / max(numPredictedPositives, 1), numTruePositives / max(numPositives, 1)))
+
+
+
+class SVMLightModel(object):
+    ''' the weight vector and threshold of a linear svm_light model. weights[i] is the weight of feature number i (weights[0] is unused) '''
+
+    def __init__(self, modelFile):
+        self.modelFile = modelFile
+        self.readModelFile(modelFile)
+
+
+    def readModelFile(self, modelFile):
+        with open(modelFile) as file:
+            file.readline() # the version line
+            kernelType = int(file.readline().split("#")[0])
+            if kernelType != LINEAR_KERNEL:
+                sys.stderr.write("{0} has kernel type {1}, but only linear models (type 0) can be read!\n".format(modelFile, kernelType))
+                exit(-1)
+            for i in range(5):
+                file.readline() # the parameters of the other kernels
+            highestFeatureNum = int(file.readline().split("#")[0])
+            file.readline() # the number of training documents
+            file.readline() # the number of support vectors plus 1
+            self.threshold = float(file.readline().split("#")[0])
+
+            self.weights = np.zeros(highestFeatureNum + 1)
+            for line in file:
+                tokens = line.split("#")[0].split()
+                if not tokens:
+                    continue
+                alphaY = float(tokens[0])
+                for token in tokens[1:]:
+                    featureNum, value = token.split(":")
+                    if featureNum == "qid":
+                        continue
+                    featureNum = int(featureNum)
+                    if featureNum >= len(self.weights):
+                        self.weights = np.concatenate((self.weights, np.zeros(featureNum + 1 - len(self.weights))))
+                    self.weights[featureNum] += alphaY * float(value)
+
+
+    def getWeights(self, numFeatures):
+        # the weights of features 1 to numFeatures, with 0 for the features the model has never seen
+        weights = self.weights[1:numFeatures+1]
+        if len(weights) < numFeatures:
+            weights = np.concatenate((weights, np.zeros(numFeatures - len(weights))))
+        return weights
+
+
+    def scoreFeatureValues(self, featureValues):
+        ''' the score of a list of feature values, where featureValues[i] is the value of feature number i+1 (eg: GeneralFeaturizer.featureValues) '''
+        return float(np.dot(self.getWeights(len(featureValues)), featureValues)) - self.threshold
+
+
+    def scoreFeatureMatrix(self, featureMatrix):
+        ''' the scores of the rows of a feature matrix, eg: from GeneralFeaturizer.featurizeBatch '''
+        return featureMatrix @ self.getWeights(featureMatrix.shape[1]) - self.threshold
+
+
+    def scoreSparseFeatures(self, features):
+        ''' the score of an iterable of (featureNum, value), eg: the features of the substring featurizer '''
+        score = -self.threshold
+        for featureNum, value in features:
+            if featureNum < len(self.weights):
+                score += self.weights[featureNum] * value
+        return score
+
+
+    def scoreFeatureLine(self, featureLine):
+        ''' the score of a line of a features file ("classification featureNum:value ...") '''
+        tokens = featureLine.split("#")[0].split()
+        return self.scoreSparseFeatures((int(featureNum), float(value)) for featureNum, value in (token.split(":") for token in tokens[1:]))
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    parser = optparse.OptionParser(usage="%prog featuresFile modelFile predictionsFile")
+
+    options, args = parser.parse_args()
+
+    if len(args) != 3:
+        parser.print_help()
+        exit(-1)
+    featuresFile, modelFile, predictionsFile = args
+
+    model = SVMLightModel(modelFile)
+    classifications = []
+    scores = []
+    with open(featuresFile) as inputFile, open(predictionsFile, 'w') as outputFile:
+        for line in inputFile:
+            if line.strip() == "" or line.startswith("#"):
+                continue
+            score = model.scoreFeatureLine(line)
+            outputFile.write(formatScore(score) + "\n")
+            classification = float(line.split(None, 1)[0])
+            if classification != 0: # 0 is an unknown classification
+                classifications.append(classification)
+                scores.append(score)
+    if classifications:
+        print(getAccuracyReport(classifications, scores))
@@ -0,0 +1,84 @@
+''' helpers for the stage that featurizes, scores and filters the pairs as one stream (see runGeneralFeaturizerOnLangDicts.py -b):
+    StageCounters      - the number of pairs and the time spent in each step of the stream, to report the throughput of each one
+    ReservoirSampler   - keeps a uniform random sample of a fixed size of a stream of items of unknown length (Vitter's algorithm R)
+'''
+
+import numpy as np
+
+
+class StageCounters(object):
+    ''' the number of pairs that went through each stage and the seconds spent in it. The stages are reported in the order they were
+    first added to. Counters from different processes (eg: the chunks of a language pair) can be added together '''
+
+    def __init__(self):
+        self.numPairs = {}
+        self.seconds = {}
+
+
+    def add(self, stage, numPairs, seconds):
+        if stage not in self.numPairs:
+            self.numPairs[stage] = 0
+            self.seconds[stage] = 0.0
+        self.numPairs[stage] += numPairs
+        self.seconds[stage] += seconds
+
+
+    def addCounters(self, other):
+        for stage in other.numPairs:
+            self.add(stage, other.numPairs[stage], other.seconds[stage])
+
+
+    def getNumPairs(self, stage):
+        return self.numPairs.get(stage, 0)
+
+
+    def getReport(self):
+        ''' returns a line for each stage with its number of pairs and pairs per second '''
+        lines = []
+        for stage in self.numPairs:
+            numPairs = self.numPairs[stage]
+            seconds = self.seconds[stage]
+            lines.append("{0}: {1} pairs in {2:.2f}s = {3:.0f} pairs/sec".format(stage, numPairs, seconds, numPairs / max(seconds, 1e-9)))
+        return "\n".join(lines)
+
+
+
+class ReservoirSampler(object):
+    ''' a uniform random sample of at most size items of a stream. The stream is given in batches: getSlots says which items of the next batch
+    are kept and where, so that only those items need to be made (eg: their features lines written out), and then they are put in with addItem '''
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.numSeen = 0
+        self.samples = []
+        self.rng = np.random.default_rng(seed)
+
+
+    def getSlots(self, numItems):
+        ''' returns a list of (index in the batch, slot) of the items of the next numItems of the stream that are kept, in the order they
+        have to be added. The first size items of the stream fill the slots, then the item at position t (from 0) replaces a random one
+        of them with a chance of size/(t+1) '''
+        numFilling = min(max(self.size - self.numSeen, 0), numItems)
+        slots = [(i, self.numSeen + i) for i in range(numFilling)]
+        if numItems > numFilling:
+            positions = np.arange(self.numSeen + numFilling, self.numSeen + numItems)
+            randomSlots = self.rng.integers(0, positions + 1)
+            for i in (randomSlots < self.size).nonzero()[0].tolist():
+                slots.append((numFilling + i, int(randomSlots[i])))
+        self.numSeen += numItems
+        return slots
+
+
+    def addItem(self, slot, item):
+        if slot == len(self.samples):
+            self.samples.append(item)
+        else:
+            self.samples[slot] = item
+
+
+
+def getMergedSampleCounts(numsSeen, size, seed=0):
+    ''' given the number of items seen by each of several reservoirs of the same size, returns how many of each reservoir's samples to take
+    (at random) so that together they are a uniform random sample of all the items '''
+    rng = np.random.default_rng(seed)
+    return rng.multivariate_hypergeometric(np.array(numsSeen, dtype=np.int64), min(size, sum(numsSeen))).tolist()
@@ -119,3 +119,29 @@ def lcs(a, b):
             x -= 1
             y -= 1
     return result
+
+
+
+# a bit-parallel kernel, which only gives the LCS length, but is much quicker than filling in the whole matrix like lcs.
+# the positions of each letter in the source word are kept as the bits of a mask, and then each column of the matrix (one for each letter of the
+# target) is worked out at once from the previous one with a few operations on the bits of the whole column (the algorithm of Allison and Dix,
+# as written by Hyyro). The edit distance has a kernel like it (Myers'), but editdistance.eval is already quicker than it would be in Python
+
+def getPositionMasks(source):
+    ''' returns a dict mapping each letter of the source to the mask of its positions '''
+    masks = {}
+    for i, letter in enumerate(source):
+        masks[letter] = masks.get(letter, 0) | (1 << i)
+    return masks
+
+
+def lcsLength(a, b, masks=None):
+    ''' the length of the longest common subsequence of a and b (ie: len(lcs(a, b))). The masks of a can be given if they were made already '''
+    if masks is None:
+        masks = getPositionMasks(a)
+    allOnes = (1 << len(a)) - 1
+    v = allOnes # the bits that are 0 are where the LCS gets longer going down the current column
+    for letter in b:
+        u = v & masks.get(letter, 0)
+        v = ((v + u) | (v - u)) & allOnes
+    return len(a) - bin(v).count("1")
@@ -2,23 +2,45 @@
 
 ''' this module will contain the classes and methods needed to take words and definition pairs and create SVM feature values
     see runSubstringFeaturizer.py for an example of using these classes
+
+    By default the substring features are numbered by a feature dict, which is built while training and then read back for testing.
+    With a hashDimension, each feature is instead numbered by a hash of its substring (from 1 to hashDimension), so there is no feature dict:
+    training and testing number the features the same way without sharing anything, and any number of files can be featurized at once.
+    Substrings that hash to the same number share a feature, which getCollisionStats reports.
+    The hashed feature space is opt-in, and DEFAULT_HASH_DIMENSION is its size unless another is given.
 '''
 
 
 import StringSimilarity
 from collections import OrderedDict
+from hashlib import blake2b
+
+
+# 2^20 feature numbers. 20000 random Algonquian ASJP pairs at the default maximum substring length of 3 have 187220 distinct features,
+# 8.5% of which share a number with another (28.6% at 2^18, and 67% at 2^16). A linear model of this size is 8MB of weights
+DEFAULT_HASH_DIMENSION = 1 << 20
+
+
+def hashFeature(substring, hashDimension):
+    ''' the feature number (from 1 to hashDimension) of the substring in the hashed feature space. The hash is the same in every process
+    (unlike the built-in hash) '''
+    return int.from_bytes(blake2b(substring.encode("utf-8"), digest_size=8).digest(), 'little') % hashDimension + 1
 
 
 class Featurizer(object):
     ''' base class for featurizing. Has methods for initializing and printing outputs. '''
 
-    def __init__(self, maxSubstringLength, training, substitutionCost=2):
+    def __init__(self, maxSubstringLength, training, substitutionCost=2, hashDimension=None):
         # training bool indicates if training, or False if testing. The difference is in the way that features are added
         # if training then creates the feature dict and writes to file, if testing then reads it
+        # unless there is a hashDimension, in which case training and testing are the same (see the top of this module)
         self.maxSubstringLength = maxSubstringLength
         self.substitutionCost = substitutionCost # for the levenshtein algorithm, Bergsma-Kondrak use 2
         self.featureDict = OrderedDict()
         self.training = training
+        self.hashDimension = hashDimension
+        if hashDimension is not None:
+            self.hashedFeatures = {} # the feature number of each substring seen so far, for the collision stats (and so each is only hashed once)
         if not training:
             self.testingOnlyFeatures = set() # keep track of features that appear in testing that are not part of the feature dict
             self.seenTrainingFeatures = set() # keep track of features seen in testing that were also in training
@@ -46,7 +68,8 @@ class Featurizer(object):
         self.currentFeatures = OrderedDict()
         self.currentFeatureNumMapping = {}
         self.createAlignmentDicts()
-        self.createAllSubstrings()
+        # the substrings of createAllSubstrings are only needed by addMismatchFeatures, which isn't used, so it makes them itself rather than
+        # them being made for every pair
 
 
     def createAlignmentDicts(self):
@@ -104,17 +127,53 @@ class Featurizer(object):
 
 
     def addPhraseFeatures(self):
-        for leftSubstringTuple in self.leftSubstringsWithIndices:
-            for rightSubstringTuple in self.rightSubstringsWithIndices:
-                if self.areConsistent(leftSubstringTuple, rightSubstringTuple):
-                    # only add substring that are consistent with the alignment
-                    feature = leftSubstringTuple[0] + " " + rightSubstringTuple[0] # phrase features separated by a space
-                    self.addFeature(feature)
+        # adds a feature for every pair of substrings (up to maxSubstringLength long) that are consistent with the alignment (see areConsistent).
+        # rather than checking every left substring against every right substring, the right substrings consistent with each left one are found
+        # from the alignment, like the phrase pairs extracted in phrase-based machine translation: they must cover the span of the right positions
+        # the left substring is aligned to, and can only be widened over right positions that aren't aligned outside the left substring.
+        # the features are added in the same order as checking every pair would, so the feature numbers given in training are the same
+        maxLength = self.maxSubstringLength
+        lengthRight = len(self.word2)
+        for leftStart in range(len(self.word1)):
+            firstAligned = None # the span of right positions that the left substring is aligned to
+            lastAligned = None
+            for leftEnd in range(leftStart, min(leftStart + maxLength, len(self.word1))):
+                rightPosition = self.leftToRight[leftEnd]
+                if rightPosition is not None:
+                    if firstAligned is None or rightPosition < firstAligned:
+                        firstAligned = rightPosition
+                    if lastAligned is None or rightPosition > lastAligned:
+                        lastAligned = rightPosition
+                if firstAligned is None or lastAligned - firstAligned >= maxLength:
+                    # a substring that isn't aligned to anything can't be consistent, and the aligned span must fit in a right substring
+                    continue
+                if any(not self.isAlignedWithin(position, leftStart, leftEnd) for position in range(firstAligned, lastAligned + 1)):
+                    continue
+
+                # how far the right substring can be widened on each side, over the positions that aren't aligned outside the left substring
+                lowestStart = firstAligned
+                while lowestStart > 0 and lastAligned - (lowestStart - 1) < maxLength and self.isAlignedWithin(lowestStart - 1, leftStart, leftEnd):
+                    lowestStart -= 1
+                highestEnd = lastAligned
+                while highestEnd + 1 < lengthRight and highestEnd + 1 - firstAligned < maxLength and self.isAlignedWithin(highestEnd + 1, leftStart, leftEnd):
+                    highestEnd += 1
+
+                leftSubstring = self.word1[leftStart:leftEnd+1]
+                for rightStart in range(lowestStart, firstAligned + 1):
+                    for rightEnd in range(lastAligned, min(highestEnd, rightStart + maxLength - 1) + 1):
+                        self.addFeature(leftSubstring + " " + self.word2[rightStart:rightEnd+1]) # phrase features separated by a space
+
+
+    def isAlignedWithin(self, rightPosition, leftStart, leftEnd):
+        # True if the right position isn't aligned, or is aligned to a position from leftStart to leftEnd
+        leftAlign = self.rightToLeft[rightPosition]
+        return leftAlign is None or leftStart <= leftAlign <= leftEnd
 
 
 
     def areConsistent(self, leftSubstringTuple, rightSubstringTuple):
-        # returns true or false if a pair of substring tuples is consistent with the alignment
+        # returns true or false if a pair of substring tuples is consistent with the alignment.
+        # addPhraseFeatures adds the pairs this is true for without checking each one
         leftSubstring, leftStart, leftEnd = leftSubstringTuple
         rightSubstring, rightStart, rightEnd = rightSubstringTuple
 
@@ -191,6 +250,7 @@ class Featurizer(object):
                 '''
     def addMismatchFeatures(self):
         # look through all substrings and add those which are deemed to be a "mismatch" feature
+        self.createAllSubstrings() # setWords doesn't make the substrings
         for leftSubstringTuple in self.leftSubstringsWithIndices:
             for rightSubstringTuple in self.rightSubstringsWithIndices:
                 if self.areMismatch(leftSubstringTuple, rightSubstringTuple):
@@ -234,7 +294,9 @@ class Featurizer(object):
 
     def addFeature(self, substring):
         ''' sets the feature for the given substring. '''
-        if self.training:
+        if self.hashDimension is not None:
+            self.addFeatureHashed(substring)
+        elif self.training:
             self.addFeatureTraining(substring)
         else:
             self.addFeatureTesting(substring)
@@ -275,6 +337,26 @@ class Featurizer(object):
             self.currentFeatureNumMapping[featureNum] = substring 
 
 
+    def addFeatureHashed(self, substring):
+        if substring in self.hashedFeatures:
+            featureNum = self.hashedFeatures[substring]
+        else:
+            featureNum = hashFeature(substring, self.hashDimension)
+            self.hashedFeatures[substring] = featureNum
+
+        # the substrings that collide are counted together, so the current features are kept by feature number rather than by substring
+        if featureNum in self.currentFeatures:
+            self.currentFeatures[featureNum] += 1
+        else:
+            self.currentFeatures[featureNum] = 1
+            self.currentFeatureNumMapping[featureNum] = featureNum
+
+
+    def getCollisionStats(self):
+        ''' returns the number of distinct substrings seen so far, and the number of feature numbers they were hashed to '''
+        return len(self.hashedFeatures), len(set(self.hashedFeatures.values()))
+
+
     def printTestingOnlyFeatures(self):
         print("TESTING ONLY FEATURES")
         for substring in self.testingOnlyFeatures:
@@ -371,8 +453,8 @@ class SubstringFeaturizerForSVMLight(Featurizer):
     It contains methods for printng out the results in a way readable to svm-light '''
 
 
-    def  __init__(self, maxSubstringLength, training=True, substitutionCost=2):
-        super().__init__(maxSubstringLength, training, substitutionCost)
+    def  __init__(self, maxSubstringLength, training=True, substitutionCost=2, hashDimension=None):
+        super().__init__(maxSubstringLength, training, substitutionCost, hashDimension)
 
 
 
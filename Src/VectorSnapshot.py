@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+
+''' a snapshot of the word2vec vectors of only the words that the featurizer can ever ask for, ie: the words of the cleaned definitions of the
+language dictionaries and the gold cognate sets. The full vectors files have millions of words (GoogleNews-vectors-negative300.bin.gz is
+3.6 GB), but the definitions only use a few thousand, so a snapshot of them is small enough to load in milliseconds.
+
+For a vectors file "name.bin.gz" the snapshot is two files:
+    name.bin.gz.snapshot.npy    - float32 (numWords, vectorSize), the vector of each word
+    name.bin.gz.snapshot.vocab  - the words, one per line, in the same order as the rows
+The matrix is memory-mapped read-only, so every process that loads the snapshot (or is forked after loading it) shares the same pages.
+
+GeneralFeaturizer.loadVectors uses the snapshot instead of the vectors file when there is one that is newer than the vectors file (or the
+vectors file isn't there). A word that isn't in the snapshot is treated as a word that isn't in the model, so the snapshot has to be made again
+when definitions with new words are featurized.
+
+example run (makes the snapshot of the English vectors for the Algonquian dictionaries and both gold files):
+./VectorSnapshot.py --lang en
+
+'''
+
+import os
+import sys
+
+import numpy as np
+
+
+def getSnapshotPath(vectorsPath):
+    return vectorsPath + ".snapshot"
+
+
+def getMatrixFileName(snapshotPath):
+    return snapshotPath + ".npy"
+
+
+def getVocabFileName(snapshotPath):
+    return snapshotPath + ".vocab"
+
+
+def isSnapshotCurrent(vectorsPath, snapshotPath):
+    matrixFileName = getMatrixFileName(snapshotPath)
+    if not os.path.exists(matrixFileName) or not os.path.exists(getVocabFileName(snapshotPath)):
+        return False
+    # only the snapshot may be kept, since the vectors file is so large
+    return not os.path.exists(vectorsPath) or os.path.getmtime(matrixFileName) >= os.path.getmtime(vectorsPath)
+
+
+def writeSnapshot(model, words, snapshotPath):
+    ''' writes the snapshot of the vectors of the words that are in the model. Returns the number of words written '''
+    wordsInModel = sorted(word for word in words if word in model)
+    vectors = np.zeros((len(wordsInModel), model.vector_size), dtype=np.float32)
+    for i, word in enumerate(wordsInModel):
+        vectors[i] = model[word]
+
+    # written under other names (with the process ID, in case two processes make the snapshot at once) and then renamed, the matrix last
+    # since it is what isSnapshotCurrent checks the time of
+    vocabFileName = getVocabFileName(snapshotPath)
+    partFileName = "{0}.{1}.part".format(vocabFileName, os.getpid())
+    with open(partFileName, 'w') as file:
+        for word in wordsInModel:
+            file.write(word + "\n")
+    os.replace(partFileName, vocabFileName)
+    matrixFileName = getMatrixFileName(snapshotPath)
+    partFileName = "{0}.{1}.part".format(matrixFileName, os.getpid())
+    with open(partFileName, 'wb') as file:
+        np.save(file, vectors)
+    os.replace(partFileName, matrixFileName)
+    return len(wordsInModel)
+
+
+
+class VectorSnapshot(object):
+    ''' the memory-mapped vectors of a snapshot. Can be used in place of the word2vec model by the featurizer: "word in snapshot",
+    snapshot[word] and snapshot.vector_size work like they do for the model '''
+
+    def __init__(self, snapshotPath):
+        self.vectors = np.load(getMatrixFileName(snapshotPath), mmap_mode='r')
+        with open(getVocabFileName(snapshotPath)) as file:
+            self.wordToIndex = {word: i for i, word in enumerate(file.read().split("\n")[:-1])}
+        self.vector_size = self.vectors.shape[1]
+
+
+    def __len__(self):
+        return len(self.wordToIndex)
+
+
+    def __contains__(self, word):
+        return word in self.wordToIndex
+
+
+    def __getitem__(self, word):
+        return self.vectors[self.wordToIndex[word]]
+
+
+
+def getDefinitionWords(definitions):
+    ''' returns the set of words of the cleaned definitions, split like the featurizer splits them '''
+    import DefinitionCleaner
+    words = set()
+    for defn in definitions:
+        for cleanDef in DefinitionCleaner.definitionCleanAndSplit(defn):
+            words.update(cleanDef.split())
+    return words
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+    import time
+
+    from GeneralFeaturizer import DATA_PATH, ENGLISH_VECTORS, SPANISH_VECTORS
+    from CogSetFileReader import CogSetFileReader
+
+    parser = optparse.OptionParser()
+    parser.add_option('--lang', '-l', action='store', dest='defnLanguage', help="the language of the definitions and vectors. default = en", default="en")
+    parser.add_option('-g', action='store', dest='goldFiles', help="the comma separated gold cognate set files whose definitions are included. "
+                      "default = ../Data/GoldSetsAlgonquian.txt,../Data/GoldSetsPolynesian.txt",
+                      default="../Data/GoldSetsAlgonquian.txt,../Data/GoldSetsPolynesian.txt")
+    parser.add_option('-v', action='store', dest='vectorsPath', help="the vectors file. default = the one GeneralFeaturizer uses for the language")
+
+    options, args = parser.parse_args()
+
+    if options.vectorsPath is not None:
+        vectorsPath = options.vectorsPath
+    elif options.defnLanguage == "en":
+        vectorsPath = DATA_PATH + "/" + ENGLISH_VECTORS
+    elif options.defnLanguage == "es":
+        vectorsPath = DATA_PATH + "/" + SPANISH_VECTORS
+    else:
+        sys.stderr.write("unknown definition language {0}!\n".format(options.defnLanguage))
+        exit(-1)
+
+    definitions = []
+    if options.defnLanguage == "en":
+        # the Algonquian dictionaries are the only ones with English definitions
+        from LanguageDictParser import AlgonquianLanguageDictParser
+        for langDict in AlgonquianLanguageDictParser():
+            for defs in langDict.values():
+                definitions.extend(defs)
+    for goldFile in options.goldFiles.split(","):
+        for cognateSet in CogSetFileReader(goldFile).getNumToCognateSet().values():
+            definitions.extend(defn for acc, word, defn in cognateSet)
+    words = getDefinitionWords(definitions)
+    sys.stderr.write("{0} words in {1} definitions\n".format(len(words), len(definitions)))
+
+    t1 = time.time()
+    sys.stderr.write("reading vectors file {0}...\n".format(vectorsPath))
+    from gensim.models import KeyedVectors
+    model = KeyedVectors.load_word2vec_format(vectorsPath, binary=True)
+    numWritten = writeSnapshot(model, words, getSnapshotPath(vectorsPath))
+    t2 = time.time()
+    sys.stderr.write("wrote the vectors of the {0} words in the model to {1} in {2:.2f}s\n".format(numWritten, getSnapshotPath(vectorsPath), t2 - t1))
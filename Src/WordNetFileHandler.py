@@ -1,20 +1,119 @@
-''' this script is used to read in the lang_forms.txt, lang_synonyms.txt, etc files and populate a dict.
+''' this script is used to read in the lang_forms.txt, lang_synonyms.txt, etc files and populate a mapping table.
 each line looks something like:
 jump jumps jumped jumping
 or
 ambition  ambitiousness  aspiration  dream
-or 
+or
 he takes a new stand    stand takes new
 the keys are the first words(or defs) in each line and the values are a set of the following words in that line.
 
+The table is not kept as a dict of sets, since the featurizer is shared by forked processes (see runGeneralFeaturizerOnLangDicts.py --parallelize),
+and every lookup in a dict of Python objects writes to their reference counts, so each process slowly ends up with its own copy of the pages.
+Instead it is kept in a few numpy arrays, which are only ever read:
+    hashes   - uint64, a hash of each key, sorted
+    offsets  - uint64, the record of key i is at offsets[i]:offsets[i+1] in the records blob
+    records  - the "key\\0value1 value2 ..." bytes of every key, in the same order as the hashes
+so a lookup is a binary search of the hashes. Each process only keeps a small cache of the sets it has looked up recently.
+
+Parsing the text files takes a few seconds, so the arrays are compiled once into a table file next to each text file ("en_synsets.txt.tbl"):
+    header   - the signature, the size and modification time (ns) of the text file it was compiled from, the number of keys and the length
+               of the records blob
+    hashes, offsets and records, as above
+The table file is memory-mapped the first time a lookup is made, so creating a handler reads nothing, and it is compiled again whenever
+the text file has changed (or is missing if the text file's directory can't be written to, in which case the table is only kept in memory).
+
+BitsetWordNetFileHandler is another backend over the same table, for when many sets are intersected with each other (as the featurizer does).
+The words and synsets are given IDs by a WordNetVocabulary the first time they are seen, and a set of them is kept as a bitset: an int with bit i set
+for ID i. Intersections and unions are then single & and | operations over the machine words of the ints, rather than hashing strings one by one.
+Since IDs are only given to what is looked up, the bitsets stay as small as the part of WordNet that is used.
+
+run as a script it compares the two backends on the given synsets and hyperonyms files:
+python3 WordNetFileHandler.py ../Data/en_synsets.txt ../Data/en_hyperonyms.txt
+
 '''
 
-from collections import defaultdict 
+from collections import defaultdict
+from functools import lru_cache
+from hashlib import blake2b
+import os
+from struct import Struct
 import sys
 
+import numpy as np
+
+
+LOOKUP_CACHE_SIZE = 10000 # the number of looked up sets each process keeps
+
+TABLE_SIGNATURE = b"WNTBL001"
+headerStruct = Struct('<8sQQQQ') # the signature, the size and mtime of the text file, the number of keys, and the length of the records blob
+
+
+def hashKey(key):
+    ''' a hash of the key bytes that is the same in every process (unlike the built-in hash) '''
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), 'little')
+
+
+def getTableFileName(fileName):
+    return fileName + ".tbl"
+
+
+def getSourceStamp(fileName):
+    ''' the size and modification time of the text file, which are kept in the table file to tell if it has changed since '''
+    stat = os.stat(fileName)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def isTableFileCurrent(fileName, tableFileName):
+    if not os.path.exists(tableFileName):
+        return False
+    with open(tableFileName, 'rb') as file:
+        header = file.read(headerStruct.size)
+    if len(header) < headerStruct.size:
+        return False
+    signature, sourceSize, sourceMTime, numKeys, recordsLength = headerStruct.unpack(header)
+    return signature == TABLE_SIGNATURE and (sourceSize, sourceMTime) == getSourceStamp(fileName)
+
+
+
 class WordNetFileHandler(object):
     def __init__(self, fileName):
-        self.mappingDict = self.createMappingDict(fileName)
+        self.fileName = fileName
+        self.hashes = None # the table is only opened by the first lookup (see openTable)
+        self.lookUp = lru_cache(maxsize=LOOKUP_CACHE_SIZE)(self.lookUpInTable)
+
+
+    def openTable(self):
+        ''' maps the compiled table file of the text file, compiling it first if it isn't current '''
+        tableFileName = getTableFileName(self.fileName)
+        if not isTableFileCurrent(self.fileName, tableFileName):
+            sys.stderr.write("compiling the table of {0}...\n".format(self.fileName))
+            sourceStamp = getSourceStamp(self.fileName)
+            self.createMappingTable(self.createMappingDict(self.fileName))
+            try:
+                self.writeTableFile(tableFileName, sourceStamp)
+            except OSError as error:
+                sys.stderr.write("could not write {0} ({1}), keeping the table in memory\n".format(tableFileName, error))
+                return
+
+        content = np.asarray(np.memmap(tableFileName, dtype=np.uint8, mode='r')) # a plain array over the map, whose slices are quicker to make
+        signature, sourceSize, sourceMTime, self.numKeys, recordsLength = headerStruct.unpack(content[:headerStruct.size].tobytes())
+        start = headerStruct.size
+        self.hashes = content[start : start + 8*self.numKeys].view('<u8')
+        start += 8*self.numKeys
+        self.offsets = content[start : start + 8*(self.numKeys + 1)].view('<u8')
+        start += 8*(self.numKeys + 1)
+        self.records = content[start : start + recordsLength]
+
+
+    def writeTableFile(self, tableFileName, sourceStamp):
+        # written under another name and then renamed, so that a process never sees half a table
+        partFileName = "{0}.{1}.part".format(tableFileName, os.getpid())
+        with open(partFileName, 'wb') as file:
+            file.write(headerStruct.pack(TABLE_SIGNATURE, sourceStamp[0], sourceStamp[1], self.numKeys, len(self.records)))
+            file.write(self.hashes.astype('<u8').tobytes())
+            file.write(self.offsets.astype('<u8').tobytes())
+            file.write(self.records.tobytes())
+        os.replace(partFileName, tableFileName)
 
 
     def createMappingDict(self, fileName):
@@ -24,7 +123,7 @@ class WordNetFileHandler(object):
                 line = line.strip() # remove trailing newline
                 if line == "":
                     continue # last line may be empty
-                words = line.split() 
+                words = line.split()
                 try:
                     key = words.pop(0) # the first word is the key
                 except:
@@ -35,15 +134,50 @@ class WordNetFileHandler(object):
         return mappingDict
 
 
+    def createMappingTable(self, mappingDict):
+        ''' packs the mapping dict into the hashes, offsets and records arrays described at the top of the module '''
+        records = [key.encode("utf-8") + b"\x00" + " ".join(sorted(words)).encode("utf-8") for key, words in mappingDict.items()]
+        hashes = np.array([hashKey(key.encode("utf-8")) for key in mappingDict], dtype=np.uint64)
+        order = np.argsort(hashes, kind='stable')
+        records = [records[i] for i in order.tolist()]
+        self.hashes = hashes[order]
+        self.offsets = np.zeros(len(records) + 1, dtype=np.uint64)
+        self.offsets[1:] = np.cumsum([len(record) for record in records])
+        self.records = np.frombuffer(b"".join(records), dtype=np.uint8)
+        self.numKeys = len(records)
+
+
+    def __len__(self):
+        if self.hashes is None:
+            self.openTable()
+        return self.numKeys
+
+
+    def lookUpInTable(self, lookup):
+        ''' returns the frozenset of words the key maps to, which is empty if the key isn't in the table '''
+        if self.hashes is None:
+            self.openTable()
+        key = lookup.encode("utf-8")
+        keyHash = hashKey(key)
+        i = int(np.searchsorted(self.hashes, np.uint64(keyHash)))
+        while i < self.numKeys and int(self.hashes[i]) == keyHash:
+            record = self.records[int(self.offsets[i]):int(self.offsets[i+1])].tobytes()
+            recordKey, words = record.split(b"\x00", 1)
+            if recordKey == key:
+                return frozenset(words.decode("utf-8").split())
+            i += 1
+        return frozenset()
+
+
     def at(self, lookup):
         ''' given a word (or a set), returns the set of coresponding mapping. May be empty.
         if the lookup is a set, then looks up each element in the set and unions them together to form the result'''
         if isinstance(lookup, str):
-            return self.mappingDict[lookup]
-        elif isinstance(lookup, set):
+            return self.lookUp(lookup)
+        elif isinstance(lookup, (set, frozenset)):
             result = set()
             for word in lookup:
-                currentSet = self.mappingDict[word]
+                currentSet = self.lookUp(word)
                 result.update(currentSet)
             return result
         else:
@@ -56,3 +190,140 @@ class WordNetFileHandler(object):
         return checkWord in self.at(key)
 
 
+
+class WordNetVocabulary(object):
+    ''' gives each word (or synset) an ID the first time it is seen, so that sets of them can be kept as bitsets '''
+
+    def __init__(self):
+        self.stringToID = {}
+        self.idToString = []
+
+
+    def __len__(self):
+        return len(self.idToString)
+
+
+    def getID(self, string):
+        if string in self.stringToID:
+            return self.stringToID[string]
+        stringID = len(self.idToString)
+        self.stringToID[string] = stringID
+        self.idToString.append(string)
+        return stringID
+
+
+    def getBits(self, strings):
+        ''' returns the bitset of the set of strings '''
+        bits = 0
+        for string in strings:
+            bits |= 1 << self.getID(string)
+        return bits
+
+
+    def getStrings(self, bits):
+        ''' returns the set of strings of the bitset '''
+        strings = set()
+        while bits:
+            lowestBit = bits & -bits
+            strings.add(self.idToString[lowestBit.bit_length() - 1])
+            bits ^= lowestBit
+        return strings
+
+
+
+class BitsetWordNetFileHandler(WordNetFileHandler):
+    ''' looks up bitsets of keys, and gives back bitsets of the words they map to. The keys and the words are given IDs by the two vocabularies,
+    which can be shared with other handlers, eg: the synsets of words are the keys of the hyperonyms '''
+
+    def __init__(self, fileName, keyVocabulary, valueVocabulary):
+        super().__init__(fileName)
+        self.keyVocabulary = keyVocabulary
+        self.valueVocabulary = valueVocabulary
+        self.keyIDToBits = {} # the bitset each key that has been looked up maps to
+
+
+    def getBitsOfKey(self, keyID):
+        if keyID in self.keyIDToBits:
+            return self.keyIDToBits[keyID]
+        bits = self.valueVocabulary.getBits(sorted(self.lookUp(self.keyVocabulary.idToString[keyID])))
+        self.keyIDToBits[keyID] = bits
+        return bits
+
+
+    def at(self, lookup):
+        ''' given a bitset of keys, returns the bitset of the union of their mappings. Otherwise it is the same as WordNetFileHandler.at '''
+        if isinstance(lookup, int):
+            result = 0
+            while lookup:
+                lowestBit = lookup & -lookup
+                result |= self.getBitsOfKey(lowestBit.bit_length() - 1)
+                lookup ^= lowestBit
+            return result
+        return super().at(lookup)
+
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+    import random
+    import time
+    import tracemalloc
+
+    parser = optparse.OptionParser(usage="%prog synsetsFile hyperonymsFile")
+    parser.add_option('-n', action='store', dest='numProfiles', type='int', help="the number of keyword sets to make profiles of. default = 3000", default=3000)
+    parser.add_option('-k', action='store', dest='numKeywords', type='int', help="the number of keywords in each set. default = 3", default=3)
+    parser.add_option('-v', action='store', dest='vocabularySize', type='int', help="the number of words the keywords are drawn from, "
+                      "about the number of distinct definition words of a language pair. default = 5000", default=5000)
+    parser.add_option('-p', action='store', dest='numPairs', type='int', help="the number of pairs of profiles to featurize. default = 200000", default=200000)
+
+    options, args = parser.parse_args()
+
+    if len(args) != 2:
+        parser.print_help()
+        exit(-1)
+    synsetsFile, hyperonymsFile = args
+
+    random.seed(1)
+    with open(synsetsFile) as file:
+        allWords = [line.split()[0] for line in file if line.strip()]
+    vocabulary = random.sample(allWords, min(options.vocabularySize, len(allWords)))
+    keywordSets = [set(random.sample(vocabulary, options.numKeywords)) for i in range(options.numProfiles)]
+    profilePairs = [(random.randrange(options.numProfiles), random.randrange(options.numProfiles)) for i in range(options.numPairs)]
+
+    def createSetHandlers():
+        return WordNetFileHandler(synsetsFile), WordNetFileHandler(hyperonymsFile), (lambda keywords: keywords)
+
+    def createBitsetHandlers():
+        words = WordNetVocabulary()
+        synsetIDs = WordNetVocabulary()
+        return BitsetWordNetFileHandler(synsetsFile, words, synsetIDs), BitsetWordNetFileHandler(hyperonymsFile, synsetIDs, synsetIDs), words.getBits
+
+    for name, createHandlers in [("sets", createSetHandlers), ("bitsets", createBitsetHandlers)]:
+        tracemalloc.start()
+        t1 = time.time()
+        synsets, hyperonyms, getKeywords = createHandlers()
+        t2 = time.time()
+        loadMemory = tracemalloc.get_traced_memory()[0]
+
+        # the synsets and hyperonyms of each keyword set, like the profiles of GeneralFeaturizer
+        profiles = []
+        for keywords in keywordSets:
+            profileSynsets = synsets.at(getKeywords(keywords))
+            profiles.append((profileSynsets, hyperonyms.at(profileSynsets)))
+        t3 = time.time()
+        profilesMemory = tracemalloc.get_traced_memory()[0] - loadMemory
+        tracemalloc.stop()
+
+        # the hyperonym feature (8) of each pair
+        numMatches = 0
+        for i, j in profilePairs:
+            synsets1, hyperonyms1 = profiles[i]
+            synsets2, hyperonyms2 = profiles[j]
+            if (hyperonyms1 & synsets2) or (hyperonyms2 & synsets1):
+                numMatches += 1
+        t4 = time.time()
+
+        sys.stderr.write("{0}:\tload {1:.2f}s, {2:.1f}MB\tprofiles {3:.2f}s, {4:.1f}MB\tpairs {5:.2f}us each ({6} matches)\n".format(name, t2 - t1,
+                         loadMemory / 2**20, t3 - t2, profilesMemory / 2**20, (t4 - t3) / len(profilePairs) * 1e6, numMatches))
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+''' a table that interns (acc, word, defn) word tuples as dense int IDs, so that the pairs reader, clusterer and evaluator
+can key everything on small ints rather than hashing the same long definition strings over and over.
+The tuples are only decoded back into strings when writing output. '''
+
+
+class WordTupleTable(object):
+    def __init__(self):
+        self.tupleToID = {} # maps a word tuple to its ID
+        self.idToTuple = [] # the ID of a word tuple is its index in this list
+        self.sortRanks = [] # sortRanks[ID] is where that word tuple falls when all the word tuples are sorted
+
+
+    def getID(self, wordTuple):
+        ''' returns the ID of the word tuple, giving it the next ID if it has not been seen yet '''
+        wordID = self.tupleToID.get(wordTuple)
+        if wordID is None:
+            wordID = len(self.idToTuple)
+            self.tupleToID[wordTuple] = wordID
+            self.idToTuple.append(wordTuple)
+        return wordID
+
+
+    def lookupID(self, wordTuple):
+        ''' returns the ID of the word tuple, or None if it was never added to the table '''
+        return self.tupleToID.get(wordTuple)
+
+
+    def getTuple(self, wordID):
+        return self.idToTuple[wordID]
+
+
+    def updateSortRanks(self):
+        ''' recalculates the sort ranks if new tuples were added since the ranks were last calculated '''
+        if len(self.sortRanks) == len(self.idToTuple):
+            return
+        self.sortRanks = [0] * len(self.idToTuple)
+        for rank, wordID in enumerate(sorted(range(len(self.idToTuple)), key=self.idToTuple.__getitem__)):
+            self.sortRanks[wordID] = rank
+
+
+    def getRank(self, wordID):
+        ''' returns the position of this word tuple among all the word tuples in sorted order.
+        Sorting IDs by their rank gives the same order as sorting the tuples themselves '''
+        self.updateSortRanks()
+        return self.sortRanks[wordID]
+
+
+    def sortIDs(self, wordIDs):
+        ''' returns a list of the given IDs, in the order their tuples would be sorted '''
+        self.updateSortRanks()
+        return sorted(wordIDs, key=self.sortRanks.__getitem__)
+
+
+    def __getitem__(self, wordID):
+        return self.idToTuple[wordID]
+
+    def __contains__(self, wordTuple):
+        return wordTuple in self.tupleToID
+
+    def __iter__(self):
+        return iter(self.idToTuple)
+
+    def __len__(self):
+        return len(self.idToTuple)
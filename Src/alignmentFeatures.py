@@ -15,16 +15,32 @@ import struct
 
 from UniToALINEConverter import uniToALINE
 from ASJPToALINEConverter import asjpToALINE
+from ALINEAligner import ALINEAligner
+from AlignmentScoreIndex import AlignmentScoreIndex
 import binaryReadAndWrite
 
 vowels = set('aeiou3EOI')
 
 nonCons = vowels | {"-", "|"} # non consonants
 
+aligner = ALINEAligner() # caches the segments of the words it has seen, so is shared by every call
+
 
 def getAlignmentFeatures(s1, s2):
-    lines = Nusimil.nusimil(s1, s2)
-    return getAlignmentFeaturesFromNusimilOutput(lines)
+    score, (firstAlignment, secondAlignment) = aligner.align(s1, s2)
+    return score, alignedConsonants(firstAlignment, secondAlignment)
+
+
+def getAlignmentFeaturesOneToMany(aline, otherAlines, threshold=None):
+    ''' returns the (score, normalizedAlignedConsonants) of the aline word with each of the other aline words, like getAlignmentFeatures.
+    If a threshold is given, the normalizedAlignedConsonants is only worked out for the pairs that score above it (it is None for the rest) '''
+    features = []
+    for score, alignment in aligner.alignOneToMany(aline, otherAlines, threshold):
+        if alignment is None:
+            features.append((score, None))
+        else:
+            features.append((score, alignedConsonants(*alignment)))
+    return features
 
 def getAlignmentFeaturesFromNusimilOutput(lines):
     try:
@@ -73,23 +89,31 @@ def alignedConsonants(letters1, letters2):
 
 
 
+def lookUpScores(scoresDict, aline1, aline2):
+    ''' returns the (score, normalizedAlignedConsonants) of the two aline words from an AlignmentScoreIndex or a dict from
+    binaryReadAndWrite.readFromBinary, or None if the pair isn't there. The scores of the pair in the order given are used if it was aligned
+    in that order, and otherwise those of the other order (the normalized aligned consonants can differ between the two) '''
+    if isinstance(scoresDict, AlignmentScoreIndex):
+        return scoresDict.getPair(aline1, aline2)
+    bytes1 = bytes(aline1, "ASCII")
+    bytes2 = bytes(aline2, "ASCII")
+    scores = scoresDict.get((bytes1, bytes2))
+    if scores is None:
+        scores = scoresDict.get((bytes2, bytes1))
+    return scores
+
+
 def lookUpWordPair(scoresDict, aline1, aline2):
     ''' given a alignment score dictionary read from a file, and two aline words, it looks up their
     score in the dictionary. If they are not present in the dictionary, computes their scores from scratch '''
 
-    bytes1 = bytes(aline1, "ASCII")
-    bytes2 = bytes(aline2, "ASCII")
-    wordTuple1 = (bytes1, bytes2)
-    wordTuple2 = (bytes2, bytes1) # can't be sure what order they are in (unless we look at accs? TODO?)
-
     if scoresDict is None:
-        score, normalizedAlignedConsonants  = getAlignmentFeatures(aline1, aline2) 
-    elif wordTuple1 in scoresDict:
-        score, normalizedAlignedConsonants = scoresDict[wordTuple1]
-    elif wordTuple2 in scoresDict:
-        score, normalizedAlignedConsonants = scoresDict[wordTuple2]
-    else:
-        score, normalizedAlignedConsonants  = getAlignmentFeatures(aline1, aline2) # they not in the dict somehow; shouldnt happen
+        return getAlignmentFeatures(aline1, aline2)
+
+    scores = lookUpScores(scoresDict, aline1, aline2)
+    if scores is None:
+        scores = getAlignmentFeatures(aline1, aline2) # they not in the dict somehow; shouldnt happen
+    score, normalizedAlignedConsonants = scores
 
     return score, normalizedAlignedConsonants
 
@@ -101,17 +125,10 @@ def lookUpWordPairStrict(scoresDict, aline1, aline2):
     if scoresDict is None:
         return None, None
 
-    bytes1 = bytes(aline1, "ASCII")
-    bytes2 = bytes(aline2, "ASCII")
-    wordTuple1 = (bytes1, bytes2)
-    wordTuple2 = (bytes2, bytes1) # can't be sure what order they are in (unless we look at accs? TODO?)
-
-    if wordTuple1 in scoresDict:
-        score, normalizedAlignedConsonants = scoresDict[wordTuple1]
-    elif wordTuple2 in scoresDict:
-        score, normalizedAlignedConsonants = scoresDict[wordTuple2]
-    else:
-        score, normalizedAlignedConsonants  =  None, None
+    scores = lookUpScores(scoresDict, aline1, aline2)
+    if scores is None:
+        return None, None
+    score, normalizedAlignedConsonants = scores
 
     return score, normalizedAlignedConsonants
 
@@ -120,8 +137,9 @@ def lookUpWordPairStrict(scoresDict, aline1, aline2):
 class AlignmentFeatureValuesWriter(object):
     ''' this class will write the alignment features to file. Inherited by other classes which decide where the pairs come from '''
 
-    def __init__(self, outputFileName):
+    def __init__(self, outputFileName, threshold=-1):
         self.outputFileName = outputFileName
+        self.threshold = threshold # only the pairs that score above this are written. A default of -1 means all pairs are written
         # open the file just to overwrite them to nothing, since we will be appending to them,
         # and don't want to append to a previous run of the code
         with open(self.outputFileName, 'w') as file:
@@ -156,6 +174,9 @@ class AlignmentFeatureValuesWriter(object):
     def getAlignmentFeatures(self, s1, s2):
         return getAlignmentFeatures(s1, s2)
 
+    def getAlignmentFeaturesOneToMany(self, aline, otherAlines, threshold=None):
+        return getAlignmentFeaturesOneToMany(aline, otherAlines, threshold)
+
     def getAlignmentFeaturesFromNusimilOutput(self, lines):
         return getAlignmentFeaturesFromNusimilOutput(lines)
 
@@ -169,5 +190,13 @@ class AlignmentFeatureValuesWriter(object):
         binaryReadAndWrite.writeToBinary(self.outputFile, aline1, aline2, alineScore, consScore, self.scoreStruct, self.lengthStruct)
 
 
+    def writeAlignedPairs(self, aline1, alines2):
+        ''' aligns the aline word with each of the other aline words and writes the pairs that pass the threshold to the binary file '''
+        features = self.getAlignmentFeaturesOneToMany(aline1, alines2, self.threshold)
+        for aline2, (score, normalizedAlignedCons) in zip(alines2, features):
+            if score > self.threshold:
+                self.writeToBinaryFile(aline1, aline2, score, normalizedAlignedCons)
+
+
     def writeFinalBytes(self):
         binaryReadAndWrite.writeFinalBytes(self.outputFile, self.lengthStruct)
@@ -7,6 +7,7 @@ from collections import defaultdict
 
 from GoldEvaluator import GoldEvaluator
 from DefSetsReader import DefSetsReader
+from ClassifiedPairsReader import readClassifiedPairs
 
 class OutputAnnotator(object):
     ''' this class will take a given output file and annotate it but putting together all words (from primary or secondary cognates) of a given set together if they 
@@ -155,6 +156,22 @@ class DefSetAnnotator(OutputAnnotator):
             self.annotateList(allWords)
             print("")
 
+
+class ClassifiedPairsAnnotator(OutputAnnotator):
+    ''' class to use if the input file to annotate is a classified pairs file (text or binary). Each pair is treated as a set of two words '''
+    def partitionFile(self, pairsFileToAnnotate):
+        self.allPartitions = defaultdict(list)
+        self.foundNums = set()
+        for wordTuple1, wordTuple2, svmValue, features in readClassifiedPairs(pairsFileToAnnotate):
+            self.partitionIntoGoldSets([wordTuple1, wordTuple2])
+
+
+    def annotateFile(self, pairsFileToAnnotate):
+        for wordTuple1, wordTuple2, svmValue, features in readClassifiedPairs(pairsFileToAnnotate):
+            print("SVM Value: " + svmValue)
+            self.annotateList([wordTuple1, wordTuple2])
+            print("")
+
 if __name__ == "__main__":
     import sys
     import optparse
@@ -162,6 +179,7 @@ if __name__ == "__main__":
     parser = optparse.OptionParser()
     parser.add_option('-g', action='store', dest='goldFile', help="the gold cognate file (deafult: GoldSetsAlgonquian.txt)", default="../Data/GoldSetsAlgonquian.txt")
     parser.add_option('-i', action='store', dest='inputFile', help="name of file to partitino/annotate")
+    parser.add_option('-p', action='store_true', dest='classifiedPairs', help="flag if the input file is a classified pairs file (text or binary) rather than def sets.", default=False)
 
     parser.add_option('-f', action='store_true', dest='printFoundSets', help="flag if want to print found sets as Gold Sets.",default=False)
     parser.add_option('-n', action='store_true', dest='printFoundNumbers', help="flag if want to print just the numbers of the found sets.",default=False)
@@ -178,7 +196,10 @@ if __name__ == "__main__":
         sys.stderr.write("Must provide file name!\n")
         exit(-1)
 
-    ca = DefSetAnnotator(options.goldFile)
+    if options.classifiedPairs:
+        ca = ClassifiedPairsAnnotator(options.goldFile)
+    else:
+        ca = DefSetAnnotator(options.goldFile)
    
 
     if options.printFoundSets:
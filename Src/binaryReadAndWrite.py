@@ -7,6 +7,14 @@ from struct import Struct
 
 import sys
 
+def getCanonicalPair(word1, word2):
+    ''' returns the two words with the smaller one first, so (a, b) and (b, a) give the same key (eg: to hash a pair in AlignmentScoreIndex).
+    The scores of a pair depend on the order it was aligned in, so pairs are still written in the order they were aligned '''
+    if word2 < word1:
+        return word2, word1
+    return word1, word2
+
+
 def writeToBinary(fileHandle, word1, word2, alineScore, consScore, scoreStruct, lengthStruct):
     # fileHandle should be opened binary append 'ab'
     packed1 = bytes(word1, 'ASCII')
@@ -42,7 +50,6 @@ def readFromBinary(fileName):
     followed by 8 bytes for the two score float values 
 
     [length 2 bytes][word1 ASCII][NULL][word2 ASCII][alineScore][consScore]
-
     '''
 
     scoresDict = {} # this dict will map tuples of the words to a tuple containing each type of score
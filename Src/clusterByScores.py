@@ -6,37 +6,53 @@ this script will merge clusters together that have a total score
 
 import re
 import sys
+import time
+import heapq
 from collections import defaultdict, OrderedDict
 from DefSetsReader import DefSetsReader
 from ClassifiedPairsReader import ClassifiedPairsReader
 
 from LanguageDictParser import AlgonquianLanguageDictParser
 
-from copy import deepcopy
+from WordTupleTable import WordTupleTable
 
 class Cluster(object):
-    def __init__(self, originalTupleList):
-        self.wordTuplesList = originalTupleList
+    def __init__(self, originalIDList, wordTable):
+        # the words in a cluster are held as their IDs in the wordTable, and only turned back into word tuples when written out
+        self.wordIDList = originalIDList
+        self.wordTable = wordTable
         self.avgSim = 0
         self.totalSim = 0
         self.numCompares = 0
         #self.clusterString = "-".join([str(orig) for orig in originalTupleList])
-        self.additionOrder = [(deepcopy(originalTupleList), None)] # keep tracks of the order and avg score when adding a new word
-        # starts as simply the original tuple with a score of None
+        self.additionOrder = [(list(originalIDList), None)] # keep tracks of the order and avg score when adding a new word
+        # starts as simply the original IDs with a score of None
 
     def merge(self, other, avg, total, numComps):
         # given another cluster, merge by combining the wordlists and updating similarity stats
         self.totalSim = self.totalSim + total
         self.numCompares = self.numCompares + numComps
         self.avgSim = self.totalSim / self.numCompares
-        self.wordTuplesList.extend(other.wordTuplesList)
+        self.wordIDList.extend(other.wordIDList)
         self.additionOrder.append((other.additionOrder, avg))
+
+    def getAdditionOrderTuples(self, additionOrder=None):
+        ''' returns the addition order with the word IDs turned back into word tuples. 
+        The first entry of an addition order holds the original IDs, every other entry holds the addition order of a merged cluster '''
+        if additionOrder is None:
+            additionOrder = self.additionOrder
+        originalIDs, score = additionOrder[0]
+        decoded = [([self.wordTable[wordID] for wordID in originalIDs], score)]
+        for otherAdditionOrder, avg in additionOrder[1:]:
+            decoded.append((self.getAdditionOrderTuples(otherAdditionOrder), avg))
+        return decoded
                                   
     def __iter__(self):
-        return iter(sorted(self.wordTuplesList))
+        # the IDs are sorted by where their word tuples would be sorted, so we go through words in the same order as the tuples
+        return iter(self.wordTable.sortIDs(self.wordIDList))
 
     def __len__(self):
-        return len(self.wordTuplesList)
+        return len(self.wordIDList)
 
     def __lt__(self, other):
         # so we can sort a list of clusters
@@ -51,24 +67,26 @@ class Clusterer(object):
         self.progress = progress
         self.displayOrder = displayOrder
         self.noSameLang = noSameLang
+        self.wordTable = WordTupleTable() # every word tuple gets an int ID, which is what the pairs and clusters hold
 
         sys.stderr.write("reading pairs...\n")
-        t1 = time.clock()
-        self.pairsReader = ClassifiedPairsReader(classifiedPairsFile, bothWays=False)
-        t2 = time.clock()
+        t1 = time.time()
+        self.pairsReader = ClassifiedPairsReader(classifiedPairsFile, bothWays=False, wordTable=self.wordTable)
+        t2 = time.time()
         sys.stderr.write("time to read pairs was {0:.2f}m\n".format((t2-t1)/60.0))
         sys.stderr.write("Initializing clusters...\n")
         self.initializeClusters()
-        t1 = time.clock()
+        t1 = time.time()
         sys.stderr.write("Initializing score mapping...\n")
         self.initializeMappingToScores()
-        t2 = time.clock()
-        sys.stderr.write("took {0:.2f}m\n".format((t2-21)/60.0))
+        self.initializeScoreAdjacency()
+        t2 = time.time()
+        sys.stderr.write("took {0:.2f}m\n".format((t2-t1)/60.0))
         sys.stderr.write("Initializing Similarities...\n")
-        t1 = time.clock()
+        t1 = time.time()
         self.initializeSimilarities()       
-        t2 = time.clock()
-        sys.stderr.write("took {0:.2f}m\n".format((t2-21)/60.0))
+        t2 = time.time()
+        sys.stderr.write("took {0:.2f}m\n".format((t2-t1)/60.0))
 
 
 
@@ -79,16 +97,18 @@ class Clusterer(object):
         sys.stderr.write("Time recalculating max similarity = {0:.2f}m\n".format(self.maxSimTime/60.0))
         sys.stderr.write("Total lookup time = {0:.2f}m\n".format(self.totalLookupTime/60.0))
         sys.stderr.write("Total cluster time = {0:.2f}m\n".format(self.totalClusterTime/60.0))
+        if self.totalClusterTime > 0:
+            sys.stderr.write("Merges per second = {0:.2f}\n".format(self.count / self.totalClusterTime))
             
 
     def initializeMappingToScores(self):
         self.mappingToScores = {} # defaultdict(None)
-        for wordTuple in self.pairsReader:
-            currentAcc = wordTuple[0]
-            otherTuplesWithScores = self.pairsReader[wordTuple]
+        for wordID in self.pairsReader:
+            currentAcc = self.wordTable[wordID][0]
+            otherTuplesWithScores = self.pairsReader[wordID]
             for other in otherTuplesWithScores:
-                otherTuple = other[:-1]
-                otherAcc = otherTuple[0]
+                otherID = other[0]
+                otherAcc = self.wordTable[otherID][0]
                 if currentAcc == otherAcc:
                     if self.noSameLang:
                         # if don't want any pairs of words from the same language, then don't put them in the mapping
@@ -97,46 +117,82 @@ class Clusterer(object):
                         score = 0
                 else:
                     score = float(other[-1])
-                self.mappingToScores[(wordTuple,otherTuple)] = score
+                self.mappingToScores[(wordID, otherID)] = score
+
+
+    def initializeScoreAdjacency(self):
+        ''' turns the mapping of (wordID, otherID) -> score into an adjacency list, wordID -> {otherID: score},
+            holding each pair in both directions. This way we only ever visit the words that actually have a score with a word. '''
+        self.scoreAdjacency = defaultdict(dict)
+        for (wordID, otherID), score in self.mappingToScores.items():
+            self.scoreAdjacency[wordID][otherID] = score
+        for (wordID, otherID), score in self.mappingToScores.items():
+            # the reverse direction only gets filled in if the pair wasn't already in the mapping in that direction,
+            # which is the same precedence that looking up both directions in the mapping used to have
+            self.scoreAdjacency[otherID].setdefault(wordID, score)
+        self.scoreAdjacency.default_factory = None # from now on, a missing word should not create an empty entry
+        del self.mappingToScores # all lookups go through the adjacency now
+
+
+    def getCandidateClusterPairs(self):
+        ''' returns a sorted list of (clustIDA, clustIDB) with A < B for every pair of clusters that have at least one pair
+            of words with a score between them. Any other pair of clusters has no similarity, so never needs to be calculated '''
+        wordToClusterIDs = defaultdict(list) # a word can be in more than one cluster when starting from sets
+        for clustID, cluster in self.clusterDict.items():
+            for wordID in cluster.wordIDList:
+                wordToClusterIDs[wordID].append(clustID)
+
+        candidatePairs = set()
+        for wordID, clustIDs in wordToClusterIDs.items():
+            otherIDs = self.scoreAdjacency.get(wordID)
+            if otherIDs is None:
+                continue
+            for otherID in otherIDs:
+                for clustIDB in wordToClusterIDs.get(otherID, ()):
+                    for clustIDA in clustIDs:
+                        if clustIDA < clustIDB:
+                            candidatePairs.add((clustIDA, clustIDB))
+                        elif clustIDB < clustIDA:
+                            candidatePairs.add((clustIDB, clustIDA))
+        return sorted(candidatePairs)
 
 
     def addSimilarityScore(self, avgSim, totalSim, numCompares, clustIDA, clustIDB):
-        self.allSimsList.append(avgSim)
-        self.simsToClusterIDs[avgSim].add((clustIDA,clustIDB))
+        # the heap is a min heap, so negate everything. This pops the highest similarity first, and for ties
+        # it pops the highest (clustIDA, clustIDB) pair first, which is the order the clusters have always been merged in
+        heapq.heappush(self.similarityHeap, (-avgSim, -clustIDA, -clustIDB))
         self.similarityDict[clustIDA][clustIDB] = (avgSim, totalSim, numCompares)
+        self.neighbourDict[clustIDA].add(clustIDB)
+        self.neighbourDict[clustIDB].add(clustIDA)
 
 
     def initializeSimilarities(self):
-        ''' calculates the similarity between each pair of clusters and stores them in a dict of dicts. 
-            Also initalizes the maxSim tuple '''
+        ''' calculates the similarity between each pair of clusters that share a scored pair of words and stores them in a dict of dicts. 
+            Also initalizes the similarity heap '''
 
         self.similarityDict = defaultdict(dict) # a defualt dict (of a dict) will assume that an entry is an empty dict
 
         self.totalLookupTime = 0
-        self.simsToClusterIDs = defaultdict(set) # this reverse mapping will map a simialrity score to a list of (clustID1, clustID2) tuples with that score
-        self.allSimsList = [] # this will keep a sorted copy of the similarities so it is easy to get the next best one without having to sort the keys of simsToClusterIDs every time
+        self.neighbourDict = defaultdict(set) # maps a cluster ID to the IDs of all clusters it has a similarity with (in either direction)
+        self.similarityHeap = [] # a heap of (-avgSim, -clustIDA, -clustIDB) so the next best similarity can be popped without sorting
+        # entries are deleted lazily: when a similarity is removed or changed, its old entry stays in the heap until it is popped
 
 
-        sys.stderr.write("\n")
-        for clustIDA in self.clusterDict:
-            sys.stderr.write("\033[F")
-            sys.stderr.write("set {0} / {1}\n".format(clustIDA, len(self.clusterDict)))
+        candidatePairs = self.getCandidateClusterPairs()
+        sys.stderr.write("{0} pairs of clusters with a similarity out of {1} clusters\n".format(len(candidatePairs), len(self.clusterDict)))
 
-            for clustIDB in self.clusterDict:
-                if clustIDB <= clustIDA:
-                    # we only want to look at clusters with a higher ID number
-                    continue
-
-                avgSimilarity, totalSimilarity, numCompares = self.calculateClusterSimilarity(clustIDA, clustIDB)
-                if avgSimilarity is None:
-                    # if avg Sim is None, this means that none of the words between this clusters have a comparison
-                    # therefore we don't add anything to the similarity lists on dictionaries
-                    continue
+        t1 = time.time()
+        for clustIDA, clustIDB in candidatePairs:
+            avgSimilarity, totalSimilarity, numCompares = self.calculateClusterSimilarity(clustIDA, clustIDB)
+            if avgSimilarity is None:
+                # if avg Sim is None, this means that none of the words between this clusters have a comparison
+                # therefore we don't add anything to the similarity lists on dictionaries
+                continue
 
-                self.addSimilarityScore(avgSimilarity, totalSimilarity, numCompares, clustIDA, clustIDB)
+            self.addSimilarityScore(avgSimilarity, totalSimilarity, numCompares, clustIDA, clustIDB)
+        self.totalLookupTime += time.time() - t1
 
         sys.stderr.write("Total lookup time = {0:.2f}m\n".format(self.totalLookupTime/60.0))
-        self.allSimsList.sort()
 
             
     def calculateClusterSimilarity(self, clustIDA, clustIDB):
@@ -147,12 +203,12 @@ class Clusterer(object):
         totalSimilarity = 0
         numCompares = 0
 
-        for wordTuple1 in clusterA:
-            for wordTuple2 in clusterB:
-                t1 = time.clock()
-                similarity = self.lookupScoreBetweenTuples(wordTuple1, wordTuple2)
-                t2 = time.clock()
-                self.totalLookupTime += (t2 - t1)
+        for wordID1 in clusterA:
+            otherIDs = self.scoreAdjacency.get(wordID1)
+            if otherIDs is None:
+                continue # this word has no scores with anything
+            for wordID2 in clusterB:
+                similarity = otherIDs.get(wordID2)
                 if similarity is None:
                     continue # don't count towards average: perhaps too lenient
                     #return (-1, -1, 0) # harsh: if any word pair not compared then punish the whole set: negative to whole setwise
@@ -174,13 +230,13 @@ class Clusterer(object):
 
 
     def lookupScoreBetweenTuples(self, wordTuple1, wordTuple2):
-        # not sure which direction this tuple could be in the mapping, so check both
-        if (wordTuple1, wordTuple2) in self.mappingToScores:
-            return self.mappingToScores[(wordTuple1, wordTuple2)]
-        if (wordTuple2 ,wordTuple1) in self.mappingToScores:
-            return self.mappingToScores[(wordTuple2, wordTuple1)]
-        # if not in the mapping period, then return None
-        return None
+        # the adjacency holds both directions, so only one probe is needed
+        wordID1 = self.wordTable.lookupID(wordTuple1)
+        wordID2 = self.wordTable.lookupID(wordTuple2)
+        if wordID1 is None or wordID1 not in self.scoreAdjacency:
+            # if not in the mapping period, then return None
+            return None
+        return self.scoreAdjacency[wordID1].get(wordID2)
 
 
 
@@ -195,29 +251,32 @@ class Clusterer(object):
 
         self.count = 0
         while len(self.clusterDict) > 1:
-            start = time.clock()
-            maxSim = self.getMaxSimilarity() # the IDs of the two clusters with the current max similarity
-            self.maxSimTime += time.clock()-start
+            start = time.time()
+            maxSimTuple = self.getMaxSimilarity() # the current max similarity along with the IDs of its two clusters
+            self.maxSimTime += time.time()-start
 
 
-            if maxSim is None or  maxSim <= self.mergeThreshold:
+            if maxSimTuple is None:
+                break
+
+            maxSim, clustIDA, clustIDB = maxSimTuple
+            if maxSim <= self.mergeThreshold:
                 break
 
-            clustIDA, clustIDB = sorted(self.simsToClusterIDs[maxSim], reverse=True)[0] # could be more than one cluster pair with the max current score
             if self.progress:
                 sys.stderr.write("{0} Clusters, MaxSim: {1} between {2} and {3}!\n".format(len(self.clusterDict), maxSim, clustIDA, clustIDB))
             self.merge(clustIDA, clustIDB) # merge these two clusters
 
-            self.removeSimilarityScore(maxSim, clustIDA, clustIDB)
+            self.removeSimilarityScore(clustIDA, clustIDB)
 
-            start2 = time.clock()
+            start2 = time.time()
             self.updateSimilarities(clustIDA, clustIDB) # update the similarity for those pairs involving these two clusters
-            self.similarityTime += time.clock()-start2
+            self.similarityTime += time.time()-start2
 
             del self.clusterDict[clustIDB] # get rid of clustIDB in the clustDict
 
             self.count += 1
-            self.totalClusterTime += time.clock() - start
+            self.totalClusterTime += time.time() - start
             if self.progress and self.count % 100 == 0:
                 self.reportTimes()
 
@@ -234,49 +293,44 @@ class Clusterer(object):
 
 
     def getMaxSimilarity(self):
-        while True:
-            try:
-                maxSimilarity = self.allSimsList.pop()
-            except IndexError:
-                return None
-            if maxSimilarity in self.simsToClusterIDs:
-                # it is possible that this score doesn't actually exist anymore
-                # when we update the scores we only update simsToClusterIDs since it is a dictionary and way faster
-                # the allSimsList still contains all old similarities and are only seen now when we pop
-                # if the score does exist, then we break the loop
-                break
-        return maxSimilarity
+        ''' pops the heap until it finds an entry that is still a current similarity, and returns (maxSim, clustIDA, clustIDB).
+            returns None once the heap is empty '''
+        while self.similarityHeap:
+            negativeSim, negativeIDA, negativeIDB = heapq.heappop(self.similarityHeap)
+            maxSimilarity, clustIDA, clustIDB = -negativeSim, -negativeIDA, -negativeIDB
+            currentSims = self.similarityDict.get(clustIDA)
+            if currentSims is not None and clustIDB in currentSims and currentSims[clustIDB][0] == maxSimilarity:
+                # it is possible that this entry doesn't hold anymore, since one of its clusters was merged away or
+                # the similarity between the two clusters was updated. similarityDict holds the "true" similarities
+                return maxSimilarity, clustIDA, clustIDB
+        return None
 
 
     def updateSimilarities(self, clustIDKept, clustIDGone):
         ''' given the ID of two clusters that have now been merged into clustKept, update the similarities dictionary for any pair
             involving either of the clusters. Any similarity to cluster Gone needs to be removed  and similarities to cluster
-            Kept need to be recalculated. '''
-        # all IDs before Kept in the cluster list need to update their similarity dictionary
-
-        for clustIDCurrent in self.clusterDict:
-            if clustIDCurrent == clustIDKept or clustIDCurrent == clustIDGone:
-                continue
+            Kept need to be recalculated. 
+            Only the neighbours of Kept and Gone can change, so every other cluster is left alone. '''
 
+        neighbourIDs = (self.neighbourDict[clustIDKept] | self.neighbourDict[clustIDGone]) - {clustIDKept, clustIDGone}
+        for clustIDCurrent in neighbourIDs:
             newAvgSim, newTotalSim, newNumComp = self.getNewSimilaritiesAndRemoveOldInDicts(clustIDCurrent, clustIDKept, clustIDGone)
             if newAvgSim is not None:
                 if clustIDCurrent < clustIDKept:
                     self.addSimilarityScore(newAvgSim, newTotalSim, newNumComp, clustIDCurrent, clustIDKept)
                 else:
                     self.addSimilarityScore(newAvgSim, newTotalSim, newNumComp, clustIDKept, clustIDCurrent)
-        self.allSimsList.sort() # now we sort the all sims list so that when we want to find the max next time we simply need to pop
+        del self.neighbourDict[clustIDGone]
 
 
-    def removeSimilarityScore(self, sim, clustIDA, clustIDB):
-        self.simsToClusterIDs[sim].remove((clustIDA, clustIDB))
-        if self.simsToClusterIDs[sim] == set():
-            del self.simsToClusterIDs[sim]
+    def removeSimilarityScore(self, clustIDA, clustIDB):
         del self.similarityDict[clustIDA][clustIDB]
-        # note: theoretically you could remove the sim from self.allSimsList here as well;
-        # however this would be order(n) time for every removal
-        # instead, leave the sim in the list and be "lazy" about deletion.
-        # when we check a new max simlarity we will just need to check if that similarity is 
-        # still in the simsToClusterIDs dictionary which holds the "true" similarities between clusters.
+        self.neighbourDict[clustIDA].discard(clustIDB)
+        self.neighbourDict[clustIDB].discard(clustIDA)
+        # note: the entry in self.similarityHeap is not removed here, since that would be order(n) time for every removal
+        # instead, leave it in the heap and be "lazy" about deletion.
+        # when we pop a new max simlarity we will just need to check if that similarity is 
+        # still in the similarityDict which holds the "true" similarities between clusters.
 
 
     def getNewSimilaritiesAndRemoveOldInDicts(self, clustIDCurrent, clustIDKept, clustIDGone):
@@ -284,20 +338,20 @@ class Clusterer(object):
             we set the new similarity of Current and Kept by using the already calculated similarities between current and Kept and current and Gone. 
             Rather than recalculate using the pairwise scores. '''
 
-        # need to remove these scores from the similarityToClusterIDs dictionary
+        # need to remove these scores from the similarity dictionary
         # since the score
         if clustIDCurrent < clustIDKept:
             # current is below kept so the similarity is stored in current's dict
             if clustIDKept in self.similarityDict[clustIDCurrent]:
                 avgSimKept, totalSimKept, numCompKept = self.similarityDict[clustIDCurrent][clustIDKept]
-                self.removeSimilarityScore(avgSimKept, clustIDCurrent, clustIDKept)
+                self.removeSimilarityScore(clustIDCurrent, clustIDKept)
             else:
                 avgSimKept, totalSimKept, numCompKept = None, None, 0
         else:
             # else similarity is stored in Kept's dictionary
             if clustIDCurrent in self.similarityDict[clustIDKept]:
                 avgSimKept, totalSimKept, numCompKept = self.similarityDict[clustIDKept][clustIDCurrent]
-                self.removeSimilarityScore(avgSimKept, clustIDKept, clustIDCurrent)
+                self.removeSimilarityScore(clustIDKept, clustIDCurrent)
             else:
                 avgSimKept, totalSimKept, numCompKept = None, None, 0
 
@@ -305,14 +359,14 @@ class Clusterer(object):
             # current is below Gone so the similarity is stored in current's dict
             if clustIDGone in self.similarityDict[clustIDCurrent]:
                 avgSimGone, totalSimGone, numCompGone = self.similarityDict[clustIDCurrent][clustIDGone]
-                self.removeSimilarityScore(avgSimGone, clustIDCurrent, clustIDGone)
+                self.removeSimilarityScore(clustIDCurrent, clustIDGone)
             else:
                 avgSimGone, totalSimGone, numCompGone = None, None, 0
         else:
             # else similarity is stored in Gone's dictionary
             if clustIDCurrent in self.similarityDict[clustIDGone]:
                 avgSimGone, totalSimGone, numCompGone = self.similarityDict[clustIDGone][clustIDCurrent]
-                self.removeSimilarityScore(avgSimGone, clustIDGone, clustIDCurrent)
+                self.removeSimilarityScore(clustIDGone, clustIDCurrent)
             else:
                 avgSimGone, totalSimGone, numCompGone = None, None, 0
 
@@ -344,12 +398,12 @@ class Clusterer(object):
                 if len(cluster) == 1:
                     continue
                 file.write("Cluster {0}: Average Similarity = {1:.3f}\n".format(i, cluster.avgSim))
-                for wordTuple in cluster:
-                    file.write("\t".join(wordTuple) + "\n")
+                for wordID in cluster:
+                    file.write("\t".join(self.wordTable[wordID]) + "\n")
         
                 if self.displayOrder:
                     file.write("Order of Additions:\n")
-                    for additionScore in cluster.additionOrder:
+                    for additionScore in cluster.getAdditionOrderTuples():
                         file.write(str(additionScore) + "\n")
                 file.write("\n")
 
@@ -360,7 +414,7 @@ class Clusterer(object):
             numVertices = len(self.clusterDict)
             file.write("*Vertices {0}\n".format(numVertices)) # each word is in a cluster and hence its own vertex to start
             for clusterNum in self.clusterDict:
-                wordTuple = self.clusterDict[clusterNum].wordTuplesList[0] # should only have one wordTuple in it
+                wordTuple = self.wordTable[self.clusterDict[clusterNum].wordIDList[0]] # should only have one wordTuple in it
                 tupleAsString = "\t".join(wordTuple)
                 #file.write(str(clusterNum))
                 #file.write(tupleAsString)
@@ -398,7 +452,8 @@ class FromSetsClusterer(Clusterer):
 
         # the cluster IDs start as the index of the def set in the file
         for i, defSet in enumerate(self.setsReader):
-            self.clusterDict[i] = Cluster(defSet.wordTupleList) # each cluster starts out as the list of cluster in that defSet
+            wordIDList = [self.wordTable.getID(wordTuple) for wordTuple in defSet.wordTupleList]
+            self.clusterDict[i] = Cluster(wordIDList, self.wordTable) # each cluster starts out as the list of cluster in that defSet
             #print("cluster dict [{0}] = {1}".format(i, defSet.wordTupleList))
 
 
@@ -431,7 +486,7 @@ class FromLangDictsClusterer(Clusterer):
                 definitions = langDict[word]
                 for defn in definitions:
                     wordTuple = (langAcc, word, defn)
-                    self.clusterDict[clustID] = Cluster([wordTuple]) # each cluster starts out as one word by itself.
+                    self.clusterDict[clustID] = Cluster([self.wordTable.getID(wordTuple)], self.wordTable) # each cluster starts out as one word by itself.
                     clustID += 1
 
 
@@ -439,25 +494,27 @@ class WithSubstringClusterer(FromLangDictsClusterer):
     # this class uses classified pairs from the general SVM (like the super class), but also takes in those same pairs
     # classified by the substring SVM
     def __init__(self, generalClassifiedPairsFile, clustersFile, substringClassifiedPairsFile, substringWeight, mergeThreshold, progress, displayOrder, noSameLang):
-        sys.stderr.write("reading substring pairs...\n")
-        t1 = time.clock()
-        self.substringPairsReader = ClassifiedPairsReader(substringClassifiedPairsFile, bothWays=True)
-        t2 = time.clock()
-        sys.stderr.write("time to read substring pairs was {0:.2f}m\n".format((t2-t1)/60.0))
+        self.substringClassifiedPairsFile = substringClassifiedPairsFile # read in with the score mapping, once the word table exists
         self.substringWeight = substringWeight
 
         super().__init__(generalClassifiedPairsFile, clustersFile, mergeThreshold, progress, displayOrder, noSameLang)
 
 
     def initializeMappingToScoresFromSubstringPairs(self):
+        sys.stderr.write("reading substring pairs...\n")
+        t1 = time.time()
+        self.substringPairsReader = ClassifiedPairsReader(self.substringClassifiedPairsFile, bothWays=True, wordTable=self.wordTable)
+        t2 = time.time()
+        sys.stderr.write("time to read substring pairs was {0:.2f}m\n".format((t2-t1)/60.0))
+
         self.mappingToScores = {} 
 
-        for wordTuple in self.substringPairsReader:
-            currentAcc = wordTuple[0]
-            otherTuplesWithScores = self.pairsReader[wordTuple]
+        for wordID in self.substringPairsReader:
+            currentAcc = self.wordTable[wordID][0]
+            otherTuplesWithScores = self.pairsReader[wordID]
             for other in otherTuplesWithScores:
-                otherTuple = other[:-1]
-                otherAcc = otherTuple[0]
+                otherID = other[0]
+                otherAcc = self.wordTable[otherID][0]
                 if currentAcc == otherAcc:
                     if self.noSameLang:
                         # if don't want any pairs of words from the same language, then don't put them in the mapping
@@ -468,28 +525,28 @@ class WithSubstringClusterer(FromLangDictsClusterer):
                     score = float(other[-1])
 
                 ''' Since we just give a score of 0 anyways to these, doesn't really matter...?
-                if (wordTuple,otherTuple) in self.mappingToScores:
+                if (wordID, otherID) in self.mappingToScores:
                     # when reading in pairs from the same language, they will have two entrees in the substring classified
                     # pairs file (since it is not symmetric.
                     # therefore, we look for them to appear twice and simply average the score between both times occuring
                     # note: (is it possible that in one direction we have a positive score and one direction a negative score?
                     # -then will only appear once in the positive classified pairs, guess thats ok just take that one score)
-                    previousScore = self.mappingToScores[(wordTuple,otherTuple)]
-                    self.mappingToScores[(wordTuple,otherTuple)] = (prevousScore + score)/2
+                    previousScore = self.mappingToScores[(wordID, otherID)]
+                    self.mappingToScores[(wordID, otherID)] = (prevousScore + score)/2
                 else:
                 '''
-                self.mappingToScores[(wordTuple,otherTuple)] = score
+                self.mappingToScores[(wordID, otherID)] = score
 
 
     def initializeMappingToScores(self):
         self.initializeMappingToScoresFromSubstringPairs() # first fill it with the substring scores
 
-        for wordTuple in self.pairsReader:
-            currentAcc = wordTuple[0]
-            otherTuplesWithScores = self.pairsReader[wordTuple]
+        for wordID in self.pairsReader:
+            currentAcc = self.wordTable[wordID][0]
+            otherTuplesWithScores = self.pairsReader[wordID]
             for other in otherTuplesWithScores:
-                otherTuple = other[:-1]
-                otherAcc = otherTuple[0]
+                otherID = other[0]
+                otherAcc = self.wordTable[otherID][0]
                 if currentAcc == otherAcc:
                     if self.noSameLang:
                         # if don't want any pairs of words from the same language, then don't put them in the mapping
@@ -498,9 +555,9 @@ class WithSubstringClusterer(FromLangDictsClusterer):
                 else:
                     score = float(other[-1])
 
-                if (wordTuple,otherTuple) in self.mappingToScores:
-                    substringScore = self.mappingToScores[(wordTuple,otherTuple)]
-                    self.mappingToScores[(wordTuple,otherTuple)] = (substringScore * self.substringWeight) + (score * (1 - self.substringWeight))
+                if (wordID, otherID) in self.mappingToScores:
+                    substringScore = self.mappingToScores[(wordID, otherID)]
+                    self.mappingToScores[(wordID, otherID)] = (substringScore * self.substringWeight) + (score * (1 - self.substringWeight))
                 else:
                     # if it wasnt already in mappingToScores from the substring pairs, then that means
                     # it didn't get a positive score from that model, so we don't add it here.
@@ -511,7 +568,6 @@ class WithSubstringClusterer(FromLangDictsClusterer):
 if __name__ == "__main__":
 
     import optparse
-    import time
 
     parser = optparse.OptionParser()
     parser.add_option('-s', action='store', dest='setsFile', help="Name of def sets file. Only required if clustering starting from some already existing clusters.")
@@ -546,7 +602,7 @@ if __name__ == "__main__":
 
     mergeThreshold = float(options.mergeThreshold)
 
-    start = time.clock()
+    start = time.time()
     if options.langDicts:
         if options.substringClassifiedPairsFile is not None:
             weight = float(options.substringWeight)
@@ -562,7 +618,7 @@ if __name__ == "__main__":
         clust.writeGraphFile(options.outputGraphFile)
     clust.cluster()
 
-    end = time.clock()
+    end = time.time()
     sys.stderr.write("Total time of execution = {0:.2f}m\n".format((end-start)/60.0))
 
 
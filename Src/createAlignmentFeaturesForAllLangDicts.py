@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+''' creates the alignment features files for every pair of Algonquian languages (the same files as running
+createAlignmentFeaturesForLangDicts.py on each pair one after the other), using a pool of processes.
+
+Each language pair is split into shards: blocks of consecutive words of the first language. The shards of all the pairs are run by the pool,
+and each one is written to its own file in the shards directory. A shard is only given its final name once it is finished, so if the run is killed,
+running the same command again skips the finished shards and only redoes the rest. A shard's file name has the range of words it covers, so only
+a shard of exactly the same words is reused (eg: not when the run is started again with another -s). Once every shard of a language pair is done, they are merged in
+order into alignment_features_{lang1}_{lang2}_{threshold}Threshold.bin, which is byte for byte what a single process writes.
+
+example run:
+./createAlignmentFeaturesForAllLangDicts.py -o ../Output/AlignmentValues -t 0.35 -n 8
+
+'''
+
+import glob
+import os
+import sys
+import time
+
+from multiprocessing import Pool
+
+import binaryReadAndWrite
+from createAlignmentFeaturesForLangDicts import LangDictsAlignmentFeatureValuesWriter
+from LanguageDictParser import LanguageDictParser
+
+
+langTuples = [("cree", "C"), ("fox", "F"), ("meno", "M"), ("oji", "O")]
+accToLangFile = dict([("C", "cree.xml"), ("F", "fox.xml"), ("M", "meno.xml"), ("O", "oji.xml")])
+
+END_BYTES = b'\x00\x00' # the packed 0 length that binaryReadAndWrite.writeFinalBytes puts at the end of a file
+
+
+def getOutputFileName(outputPath, lang1, lang2, threshold):
+    return "{0}/alignment_features_{1}_{2}_{3}Threshold.bin".format(outputPath, lang1, lang2, threshold)
+
+
+def getShardFileName(shardPath, lang1, lang2, threshold, start, end):
+    return "{0}/alignment_features_{1}_{2}_{3}Threshold_{4}_{5}.bin".format(shardPath, lang1, lang2, threshold, start, end)
+
+
+def removeOtherShards(shardPath, lang1, lang2, threshold):
+    # the shards of the language pair left over from a run with another shard size, which were never used
+    for shardFileName in glob.glob(getShardFileName(shardPath, lang1, lang2, threshold, "*", "*") + "*"):
+        sys.stderr.write("removing unused shard file {0}\n".format(shardFileName))
+        os.remove(shardFileName)
+
+
+def createShard(shard):
+    ''' the function run by each process of the pool: writes the alignment features of one block of words to its shard file '''
+    lang1, acc1, lang2, acc2, start, end, definitionLanguage, threshold, shardFileName = shard
+    t1 = time.time()
+    partFileName = shardFileName + ".part"
+    with LangDictsAlignmentFeatureValuesWriter(acc1, acc2, accToLangFile[acc1], accToLangFile[acc2], definitionLanguage, partFileName,
+                                               float(threshold), start, end, showProgress=False) as creator:
+        creator.createFeatures()
+    os.replace(partFileName, shardFileName) # only now is the shard finished
+    return lang1, lang2, start, end, time.time() - t1
+
+
+def mergeShards(outputFileName, shardFileNames):
+    ''' concatenates the records of the shard files (in order) into the output file, followed by a single end marker '''
+    partFileName = outputFileName + ".part"
+    with open(partFileName, 'wb') as outputFile:
+        for shardFileName in shardFileNames:
+            with open(shardFileName, 'rb') as shardFile:
+                content = shardFile.read()
+            if not content.endswith(END_BYTES):
+                sys.stderr.write("shard file {0} is not complete!\n".format(shardFileName))
+                exit(-1)
+            outputFile.write(content[:-len(END_BYTES)])
+        outputFile.write(END_BYTES)
+    os.replace(partFileName, outputFileName)
+    for shardFileName in shardFileNames:
+        os.remove(shardFileName)
+
+
+def getShardsForEachLanguagePair(outputPath, shardPath, threshold, shardSize, definitionLanguage):
+    ''' returns a dict mapping each (lang1, lang2) that still needs to be created to its list of shards, in order. A language pair whose output
+    file already exists is finished, so it is left out '''
+    ldp = LanguageDictParser([acc for lang, acc in langTuples], [accToLangFile[acc] for lang, acc in langTuples], definitionLanguage)
+    langDicts = ldp.parseAllFiles()
+
+    shardsForPair = {}
+    for i, (lang1, acc1) in enumerate(langTuples):
+        for j in range(i, len(langTuples)):
+            lang2, acc2 = langTuples[j]
+            if os.path.exists(getOutputFileName(outputPath, lang1, lang2, threshold)):
+                sys.stderr.write("{0} and {1} are already done\n".format(lang1, lang2))
+                continue
+            numWords1 = len(langDicts[acc1])
+            shardsForPair[(lang1, lang2)] = [(lang1, acc1, lang2, acc2, start, min(start + shardSize, numWords1), definitionLanguage, threshold,
+                                              getShardFileName(shardPath, lang1, lang2, threshold, start, min(start + shardSize, numWords1)))
+                                             for start in range(0, numWords1, shardSize)]
+    return shardsForPair
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    parser = optparse.OptionParser()
+    parser.add_option('-o', action='store', dest='outputPath', help="the directory to write the alignment features files to.")
+    parser.add_option('-t', action='store', dest='threshold', help="the threshold score required to write a pair to the file. default = 0.35", default="0.35")
+    parser.add_option('-n', action='store', dest='numProcesses', type='int', help="the number of processes to run at once. default = the number of cores",
+                      default=os.cpu_count())
+    parser.add_option('-s', action='store', dest='shardSize', type='int', help="the number of words of the first language in each shard. default = 250",
+                      default=250)
+    parser.add_option('--lang', action='store', dest='language', help="the language of the definitions in the dictionaries. default = en", default="en")
+
+    options, args = parser.parse_args()
+
+    if options.outputPath is None:
+        sys.stderr.write("Must provide the output path!\n")
+        exit(-1)
+
+    shardPath = "{0}/shards".format(options.outputPath)
+    os.makedirs(shardPath, exist_ok=True)
+
+    t1 = time.time()
+    shardsForPair = getShardsForEachLanguagePair(options.outputPath, shardPath, options.threshold, options.shardSize, options.language)
+
+    # the shards that were finished by an earlier run don't need to be done again
+    allShards = [shard for shards in shardsForPair.values() for shard in shards]
+    shardsToRun = [shard for shard in allShards if not os.path.exists(shard[-1])]
+    sys.stderr.write("{0} shards to run ({1} already finished) with {2} processes\n".format(len(shardsToRun), len(allShards) - len(shardsToRun),
+                                                                                         options.numProcesses))
+
+    with Pool(options.numProcesses) as pool:
+        for numFinished, (lang1, lang2, start, end, seconds) in enumerate(pool.imap_unordered(createShard, shardsToRun), 1):
+            sys.stderr.write("{0} / {1} shards finished: {2} and {3} words {4} to {5} took {6:.2f}s\n".format(numFinished, len(shardsToRun), lang1, lang2,
+                                                                                                           start, end, seconds))
+
+    for (lang1, lang2), shards in shardsForPair.items():
+        mergeShards(getOutputFileName(options.outputPath, lang1, lang2, options.threshold), [shard[-1] for shard in shards])
+        removeOtherShards(shardPath, lang1, lang2, options.threshold)
+    if not os.listdir(shardPath):
+        os.rmdir(shardPath)
+
+    t2 = time.time()
+    seconds = t2- t1
+    minutes = seconds/60.0
+    hours = minutes/60.0
+    sys.stderr.write("Time to run was {0:.2f}s = {1:.2f}m = {2:.2f}h\n".format(seconds, minutes, hours))
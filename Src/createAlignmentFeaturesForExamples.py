@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+''' this file reads an example pairs file and writes the alignment features (ALINE score and # aligned consonants) of each pair to a binary file.
+Replaces running createPreparedALINEFileForExamples.py, nusimil and createAlignmentFeaturesFromNusimilOutput.py one after the other.
+
+example run:
+./createAlignmentFeaturesForExamples.py -i training_pairs_polynesian.txt -o alignment_features_training_pairs_polynesian.bin
+
+'''
+
+import sys
+import time
+
+from alignmentFeatures import AlignmentFeatureValuesWriter
+
+class ExamplesAlignmentFeatureValuesWriter(AlignmentFeatureValuesWriter):
+
+    def __init__ (self, examplePairsFile, outputFileName, threshold):
+        super().__init__(outputFileName, threshold)
+        self.examplePairsFile = examplePairsFile
+
+
+    def createFeatures(self):
+
+        t1 = time.time()
+        sys.stderr.write("\n")
+
+        with open(self.examplePairsFile) as inputFile:
+            length = sum(1 for line in inputFile)
+
+        with open(self.examplePairsFile) as inputFile:
+            for i, line in enumerate(inputFile):
+                t2 = time.time()
+                seconds = t2- t1
+                minutes = seconds/60.0
+                hours = minutes/60.0
+                sys.stderr.write("\033[F")
+                sys.stderr.write("{0} / {1}  pairs analyzed; Time so far is {2:.2f}s = {3:.2f}m = {4:.2f}h\n".format(i, length, seconds, minutes, hours))
+
+                classification, wordString1, wordString2 = line.strip().split("\t\t")
+                wordTuple1 = wordString1.split("\t")
+                wordTuple2 = wordString2.split("\t")
+
+                aline1 = self.getALINE(wordTuple1[1])
+                aline2 = self.getALINE(wordTuple2[1])
+                score, normalizedAlignedCons = self.getAlignmentFeatures(aline1, aline2)
+                if score > self.threshold:
+                    self.writeToBinaryFile(aline1, aline2, score, normalizedAlignedCons)
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    parser = optparse.OptionParser()
+    parser.add_option('-o', action='store', dest='outputName', help="the output file.")
+    parser.add_option('-i', action='store', dest='examplePairsFile', help="the input example pairs file.")
+    parser.add_option('-t', action='store', dest='threshold', help="the threshold score required to write a pair to the file. By setting this threshold, the final file will be a lot smaller.",
+                      default=-1) # a default of -1 means all pairs will pass the threshold and be written
+
+    options, args = parser.parse_args()
+
+
+    if options.outputName is None:
+        sys.stderr.write("Must provide the output name!\n")
+        exit(-1)
+
+
+    if options.examplePairsFile is None:
+        sys.stderr.write("Must provide the input examples pairs file!\n")
+        exit(-1)
+
+    threshold = float(options.threshold)
+
+    t1 = time.time()
+    with ExamplesAlignmentFeatureValuesWriter(options.examplePairsFile, options.outputName, threshold) as creator:
+        creator.createFeatures()
+    t2 = time.time()
+    seconds = t2- t1
+    minutes = seconds/60.0
+    hours = minutes/60.0
+    sys.stderr.write("Time to run was {0:.2f}s = {1:.2f}m = {2:.2f}h\n".format(seconds, minutes, hours))
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+
+''' this file reads from two languages and calculates alignment features (ALINE score and # aligned consonants) for each possible pair between them.
+the pairs that pass the threshold are written to a binary file with a given output name (readable with binaryReadAndWrite.readFromBinary).
+
+This does in one pass what createPreparedALINEFileForLangDicts.py, nusimil and createAlignmentFeaturesFromNusimilOutput.py do one after the other:
+the pairs are the same (and in the same order) as the prepared file, but they are streamed straight to the aligner, one word of the first
+language at a time, so no intermediate files are written and the memory used doesn't grow with the number of pairs.
+
+example run:
+./createAlignmentFeaturesForLangDicts.py --l1 C --l2 M -t 0.35 -o alignmentFeaturesCreeMeno0.35Threshold.bin
+
+'''
+
+import sys
+import time
+
+from alignmentFeatures import AlignmentFeatureValuesWriter
+from createPreparedALINEFileForLangDicts import LangDictsALINEFileCreator
+
+class LangDictsAlignmentFeatureValuesWriter(AlignmentFeatureValuesWriter):
+
+    def __init__ (self, acc1, acc2, langFile1, langFile2, definitionLanguage, outputFileName, threshold, start=0, end=None, showProgress=True,
+                  blockingKeyTypes=None):
+        super().__init__(outputFileName, threshold)
+        # only used for its pairs, so no prepared file is opened
+        self.pairsCreator = LangDictsALINEFileCreator(acc1, acc2, langFile1, langFile2, definitionLanguage, None)
+        self.start = start # the block of the first language's words to look at (see LangDictsALINEFileCreator.iterALINERows)
+        self.end = end
+        self.showProgress = showProgress
+        self.blockingKeyTypes = blockingKeyTypes # if given, only the candidate pairs from CandidateBlocker.KeyBlocker are aligned
+
+
+    def createFeatures(self):
+        for aline1, alines2 in self.pairsCreator.iterALINERows(self.start, self.end, self.showProgress, self.blockingKeyTypes):
+            self.writeAlignedPairs(aline1, alines2)
+
+
+
+if __name__ == "__main__":
+
+    import optparse
+
+    parser = optparse.OptionParser()
+    parser.add_option('-o', action='store', dest='outputName', help="the output file.")
+    parser.add_option('--l1', action='store', dest='acc1', help="the language Acc for first language (ex. C,F,M,O)")
+    parser.add_option('--l2', action='store', dest='acc2', help="the language Acc for second language (ex. C,F,M,O)")
+    parser.add_option('--lang', action='store', dest='language', help="the language of the definitions in the example pairs. default = en", default="en")
+    parser.add_option('-t', action='store', dest='threshold', help="the threshold score required to write a pair to the file. By setting this threshold, the final file will be a lot smaller.",
+                      default=-1) # a default of -1 means all pairs will pass the threshold and be written
+    parser.add_option('--start', action='store', dest='start', type='int', help="the index of the first word of the first language to look at. default = 0", default=0)
+    parser.add_option('-b', action='store', dest='blockingKeyTypes', help="only align the pairs that share a key of these comma separated types "
+                      "(see CandidateBlocker.py, ex. sound,definition). default = align every pair", default=None)
+    parser.add_option('--end', action='store', dest='end', type='int', help="the index after the last word of the first language to look at. default = all of them", default=None)
+
+    options, args = parser.parse_args()
+
+    accToLangFile = dict([("C", "cree.xml"), ("F", "fox.xml"), ("M", "meno.xml"), ("O", "oji.xml")])
+
+    if options.outputName is None:
+        sys.stderr.write("Must provide the output name!\n")
+        exit(-1)
+
+
+    if options.acc1 is None or options.acc2 is None:
+        sys.stderr.write("Must provide the language accronyms!\n")
+        exit(-1)
+
+
+    langFile1 = accToLangFile[options.acc1]
+    langFile2 = accToLangFile[options.acc2]
+    threshold = float(options.threshold)
+    blockingKeyTypes = options.blockingKeyTypes.split(",") if options.blockingKeyTypes else None
+
+    t1 = time.time()
+    with LangDictsAlignmentFeatureValuesWriter(options.acc1, options.acc2, langFile1, langFile2, options.language, options.outputName, threshold,
+                                               options.start, options.end, blockingKeyTypes=blockingKeyTypes) as creator:
+        creator.createFeatures()
+    t2 = time.time()
+    seconds = t2- t1
+    minutes = seconds/60.0
+    hours = minutes/60.0
+    sys.stderr.write("Time to run was {0:.2f}s = {1:.2f}m = {2:.2f}h\n".format(seconds, minutes, hours))
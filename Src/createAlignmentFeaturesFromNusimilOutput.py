@@ -19,10 +19,9 @@ class AlignmentFeatureValuesWriterFromNusimil(AlignmentFeatureValuesWriter):
 
 
     def __init__ (self, alineFileName, nusimilFileName, outputFileName, threshold):
-        super().__init__(outputFileName)
+        super().__init__(outputFileName, threshold)
         self.alineFileName = alineFileName
         self.nusimilFileName = nusimilFileName
-        self.threshold = threshold
 
 
     def createFeatures(self):
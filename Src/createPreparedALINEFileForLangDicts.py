@@ -13,6 +13,7 @@ import time
 
 from PreparedFileCreator import ALINEFileCreator
 from LanguageDictParser import LanguageDictParser
+from CandidateBlocker import KeyBlocker
 
 class LangDictsALINEFileCreator(ALINEFileCreator):
 
@@ -26,15 +27,25 @@ class LangDictsALINEFileCreator(ALINEFileCreator):
 
 
     def createALINEFile(self):
+        for aline1, alines2 in self.iterALINERows():
+            for aline2 in alines2:
+                self.writeToFile(aline1, aline2)
+
+
+    def iterALINERows(self, start=0, end=None, showProgress=True, blockingKeyTypes=None):
+        ''' yields (aline1, alines2) for each word of the first language, where alines2 are the ALINE words of the second language
+        that it is paired with (all of them, or just the ones after it if the two languages are the same).
+        start and end pick out a block of the (sorted) words of the first language, so that it can be split up between processes.
+        If blockingKeyTypes are given, each word is only paired with the words that CandidateBlocker.KeyBlocker finds for it '''
         ldp = LanguageDictParser([self.acc1, self.acc2], [self.langFile1, self.langFile2], self.definitionLanguage)
         self.langDicts = ldp.parseAllFiles()
 
-        sys.stderr.write("looking at {0} and {1}\n".format(self.langFile1, self.langFile2))
-        sys.stderr.write("size of dict1 = {0}\n".format(len(self.langDicts[self.acc1])))
-        sys.stderr.write("size of dict2 = {0}\n\n".format(len(self.langDicts[self.acc2])))
+        if showProgress:
+            sys.stderr.write("looking at {0} and {1}\n".format(self.langFile1, self.langFile2))
+            sys.stderr.write("size of dict1 = {0}\n".format(len(self.langDicts[self.acc1])))
+            sys.stderr.write("size of dict2 = {0}\n\n".format(len(self.langDicts[self.acc2])))
 
         t1 = time.time()
-        countOuter = 0
 
         dict1 = self.langDicts[self.acc1]
         dict2 = self.langDicts[self.acc2]
@@ -42,24 +53,32 @@ class LangDictsALINEFileCreator(ALINEFileCreator):
         words1.sort()
         words2 = list(dict2.keys())
         words2.sort()
+        alines2 = [self.getALINE(word2) for word2 in words2]
+        blocker = None
+        if blockingKeyTypes:
+            blocker = KeyBlocker(dict1, dict2, self.acc1 == self.acc2, blockingKeyTypes)
+
+        if end is None:
+            end = len(words1)
 
         startIndex = 0
-        for i, word1 in enumerate(words1):
-            countOuter += 1
-            t2 = time.time()
-            seconds = t2- t1
-            minutes = seconds/60.0
-            hours = minutes/60.0
-            sys.stderr.write("\033[F")
-            sys.stderr.write("{0} / {1}  dict1 words looked at; Time so far is {2:.2f}s = {3:.2f}m = {4:.2f}h\n".format(i, len(words1), seconds, minutes, hours))
+        for i in range(start, end):
+            word1 = words1[i]
+            if showProgress:
+                t2 = time.time()
+                seconds = t2- t1
+                minutes = seconds/60.0
+                hours = minutes/60.0
+                sys.stderr.write("\033[F")
+                sys.stderr.write("{0} / {1}  dict1 words looked at; Time so far is {2:.2f}s = {3:.2f}m = {4:.2f}h\n".format(i, len(words1), seconds, minutes, hours))
 
             aline1 = self.getALINE(word1)
             if self.acc1 == self.acc2:
                 startIndex = i + 1
-            for j in range(startIndex, len(words2)):
-                word2 = words2[j]
-                aline2 = self.getALINE(word2)
-                self.writeToFile(aline1, aline2)
+            if blocker is not None:
+                yield aline1, [alines2[j] for j in blocker.getCandidates(i)]
+            else:
+                yield aline1, alines2[startIndex:]
 
     
 
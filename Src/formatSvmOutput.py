@@ -3,6 +3,7 @@
 ''' this script reads in words pairs, features, and svm scores, and prints them in a formatted fashion '''
 
 
+from ClassifiedPairsFile import writeClassifiedPairsFile
 from GoldEvaluator import GoldEvaluator
 
 from collections import defaultdict
@@ -107,6 +108,24 @@ class OutputFormatter(object):
             self.printPairsWithGivenScore(score)
 
 
+    def iterPairs(self, allPairs=False, negativePairs=False):
+        ''' yields (wordTuple1, wordTuple2, score, features) in the same order the print functions print them '''
+        for score in sorted(self.scoreMapping, reverse=True):
+            if not allPairs:
+                if negativePairs and score >= 0:
+                    continue
+                if not negativePairs and score < 0:
+                    break # since list is sorted, as soon is one is below 0 they all will be
+            for features, (wordTuple1, wordTuple2) in self.scoreMapping[score]:
+                yield wordTuple1, wordTuple2, score, features
+
+
+    def writeBinaryPairs(self, fileName, allPairs=False, negativePairs=False):
+        ''' writes the pairs to a binary classified pairs file (see ClassifiedPairsFile.py) rather than printing them '''
+        numPairs = writeClassifiedPairsFile(fileName, self.iterPairs(allPairs, negativePairs))
+        sys.stderr.write("wrote {0} pairs to {1}\n".format(numPairs, fileName))
+
+
 
 class RestrictedOutputFormatter(OutputFormatter):
     # this class prints out a simplified version of the pairs, without scores or feature values, and
@@ -185,6 +204,7 @@ if __name__ == "__main__":
     parser.add_option('-a', action='store_true', dest='allPairs', help="Optional: use if want to print all pairs, not just passed pairs.", default=False)
     parser.add_option('-n', action='store_true', dest='negativePairs', help="Optional: use if want to print negative score pairs, not passed(positive score) pairs.", default=False)
     parser.add_option('-d', action='store_true', dest='debug', help="debug prints extra", default=False)
+    parser.add_option('-b', action='store', dest='binaryFile', help="Optional: write the pairs to this binary classified pairs file instead of printing them.", default=None)
 
 
     parser.add_option('--r2', action='store', dest='restrict2', help="If want to restrict the second words to a specific language family", default=None)
@@ -201,6 +221,10 @@ if __name__ == "__main__":
         parser.print_help()
         exit()
 
+    if options.binaryFile is not None and options.restrict:
+        sys.stderr.write("-r only applies to the printed text output, not -b\n")
+        exit(-1)
+
 
     if options.restrict:
         formatter = RestrictedOutputFormatter(options.svmOutput, options.wordPairs, options.features, options.restrict2, options.goldFile1, options.goldFile2)
@@ -209,7 +233,9 @@ if __name__ == "__main__":
                       
     
     sys.stderr.write("\nwriting output...\n")
-    if options.allPairs:
+    if options.binaryFile is not None:
+        formatter.writeBinaryPairs(options.binaryFile, options.allPairs, options.negativePairs)
+    elif options.allPairs:
         formatter.printAllPairs()
     elif options.negativePairs:
         formatter.printNegativePairs()
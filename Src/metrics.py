@@ -9,12 +9,13 @@ from collections import defaultdict
 
 
 
-def bCubed(clustering, goldEvaluator, zeroWeightSingletons):
+def bCubed(clustering, goldEvaluator, zeroWeightSingletons, wordTable=None):
 
     # working B3
 
     ''' The clustering input is a dictionary from a cluster label to a list of (acc, word, defn) tuples within that cluster.
-    The goldEvaluator is an object of type GoldEvaluator. Used to see if two words are cognate to eachother '''
+    The goldEvaluator is an object of type GoldEvaluator. Used to see if two words are cognate to eachother 
+    If a WordTupleTable is given, then the clusters hold IDs of word tuples in that table rather than the tuples themselves '''
     allRecalls = [] # keep track of the recall of each individual wordTuple
     allPrecisions = [] # keep track of the precision of each individual wordTuple
     recallWeights = []
@@ -33,14 +34,24 @@ def bCubed(clustering, goldEvaluator, zeroWeightSingletons):
 
         for wordTuple1 in cluster:
             # each wordTuple1 gets its own precision and (possibly) recall
-            cogSet = goldEvaluator.getCogSetFromTuple(wordTuple1)
-            if cogSet is None:
-                numCogs = 1
-                cognateMatches = 1
+            if wordTable is not None:
+                cogSetIDs = goldEvaluator.getCogSetIDsFromID(wordTuple1, wordTable)
+                if cogSetIDs is None:
+                    numCogs = 1
+                    cognateMatches = 1
+                else:
+                    numCogs, cogIDs = cogSetIDs
+                    cognateMatches = len(cogIDs & clusterAsSet)
 
             else:
-                numCogs = len(cogSet)
-                cognateMatches = len(set(cogSet) & clusterAsSet)
+                cogSet = goldEvaluator.getCogSetFromTuple(wordTuple1)
+                if cogSet is None:
+                    numCogs = 1
+                    cognateMatches = 1
+
+                else:
+                    numCogs = len(cogSet)
+                    cognateMatches = len(set(cogSet) & clusterAsSet)
                
             precision = float(cognateMatches) / len(cluster)
             allPrecisions.append(precision)
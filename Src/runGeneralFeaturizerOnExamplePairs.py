@@ -2,6 +2,10 @@
 
 ''' this file reads the example pairs file which was already created, and featurizes all pairs from this file. 
 It outputs the feature values in a given output file
+
+Given an svm_light model (-m), the pairs are also scored as they are featurized and the scores written to a predictions file (-s), so there is
+no need to run svm_classify on the features file. With a score threshold (-c) only the pairs that score at least the threshold are written,
+and the lines of the example pairs file of those pairs can be written to another file (-o) so that it still lines up with the other two
 '''
 
 
@@ -11,13 +15,16 @@ import random
 
 from FeatureRunner import GeneralFeatureRunner
 from GeneralFeaturizer import GeneralFeaturizer
+from SVMLightModel import SVMLightModel
 
 class RunnerForExamples(GeneralFeatureRunner):
-    def __init__(self, examplePairsFile, outputFeaturesFile, featurizer):
-        super().__init__(outputFeaturesFile, featurizer)
+    def __init__(self, examplePairsFile, outputFeaturesFile, featurizer, model=None, outputPredictionsFile=None, scoreThreshold=None,
+                 outputPairsFile=None):
+        super().__init__(outputFeaturesFile, featurizer, model, outputPredictionsFile, scoreThreshold)
         self.numPositiveExamples = 0
         self.numNegativeExamples = 0
         self.examplePairsFile = examplePairsFile
+        self.outputPairsFile = outputPairsFile
 
 
 
@@ -29,6 +36,8 @@ class RunnerForExamples(GeneralFeatureRunner):
         self.getInputFileLength()
 
         sys.stderr.write("\n\n")
+        outputPairsHandle = open(self.outputPairsFile, 'w') if self.outputPairsFile is not None else None
+        numWritten = 0
         with open(self.examplePairsFile) as inputFile:
             for i, line in enumerate(inputFile):
                 sys.stderr.write("\033[F")
@@ -55,7 +64,14 @@ class RunnerForExamples(GeneralFeatureRunner):
                 else:
                     classification = -1
 
-                self.featurizeGivenPair(uni1, uni2, asjp1, asjp2, aline1, aline2, def1, def2, cleanedDef1, cleanedDef2, acc1, acc2, classification)
+                if self.featurizeGivenPair(uni1, uni2, asjp1, asjp2, aline1, aline2, def1, def2, cleanedDef1, cleanedDef2, acc1, acc2, classification):
+                    numWritten += 1
+                    if outputPairsHandle is not None:
+                        outputPairsHandle.write(line)
+        if outputPairsHandle is not None:
+            outputPairsHandle.close()
+        if self.scoreThreshold is not None:
+            sys.stderr.write("{0} / {1} pairs scored at least {2}\n".format(numWritten, self.length, self.scoreThreshold))
 
 
 
@@ -74,12 +90,24 @@ if __name__ == "__main__":
     parser.add_option('-u', action='store', dest='UseFeatureNumbers', help="feature numbers to use. ex: 1,2,9,13")
     parser.add_option('-y', action='store', dest='UseFeatureType', help="feature type to use. ex: 'surface' or 'word2Vec'")
 
+    # to score the pairs in place of svm_classify
+    parser.add_option('-m', action='store', dest='modelFile', help="the svm_light model file (linear kernel) to score the pairs with. ex: polynesian_model.txt")
+    parser.add_option('-s', action='store', dest='outputPredictionsName', help="the output name for the scores of the pairs (only used with a model)")
+    parser.add_option('-c', action='store', dest='scoreThreshold', type='float', help="only write the pairs that score at least this much "
+                      "(only used with a model). default = write every pair")
+    parser.add_option('-o', action='store', dest='outputPairsName', help="the output name for the lines of the input pairs file that are written "
+                      "(only used with a score threshold)")
+
                       
     options, args = parser.parse_args()
 
     if options.inputPairsName is None:
         sys.stderr.write("Must provide input file!\n")
         exit(-1)
+
+    if options.modelFile is None and (options.outputPredictionsName is not None or options.scoreThreshold is not None):
+        sys.stderr.write("Must provide a model file to score the pairs!\n")
+        exit(-1)
                       
     if options.UseFeatureNumbers is not None:
         stringNumbers =  options.doNotUseFeatureNumbers.split(",")
@@ -96,10 +124,12 @@ if __name__ == "__main__":
 
     featurizer = GeneralFeaturizer(options.defnLanguage, options.alignmentFeaturesFile, featureNumbersToUse)
     # now we have our featurizer created
-    t1 = time.clock()
-    with RunnerForExamples(options.inputPairsName, options.outputFeaturesName, featurizer) as runner:
+    model = SVMLightModel(options.modelFile) if options.modelFile is not None else None
+    t1 = time.time()
+    with RunnerForExamples(options.inputPairsName, options.outputFeaturesName, featurizer, model, options.outputPredictionsName,
+                           options.scoreThreshold, options.outputPairsName) as runner:
         runner.run()
-    t2 = time.clock()
+    t2 = time.time()
     seconds = t2- t1
     minutes = seconds/60.0
     hours = minutes/60.0
@@ -5,47 +5,105 @@ this script reads in the language dictionaires from two languages and their corr
 for the pairs that exceed the given threshold, creates the features and outputs the pair and the feature values to the two respective output files
 
 - can also be ran in parallel with --parallel, and this creates the features for all lang pairs at the same time.
-- when ran in parallel, only one featurizer is created, so the large word2vec model only needs to be read into memory once
+  Each language pair is split into chunks of --chunkSize words of the first language, and the chunks of all the pairs are run by a pool of -n processes
+  (largest first), so a large pair is spread over all the cores rather than finishing alone. The chunks of each pair are then merged in order into
+  feature_values_{lang1}_{lang2}.txt and word_pairs_{lang1}_{lang2}.txt, which are the same as featurizing the pair in one go.
+- when ran in parallel, only one featurizer is created, so the large word2vec model only needs to be read into memory once.
+  The processes are forked from this one, so they share its memory rather than being sent a copy of the featurizer. The large read-only parts of it
+  are kept where the processes don't write to their pages (which would give each one its own copy): the word2vec matrix and the alignment
+  indices are memory-mapped read-only, and the WordNet tables are numpy arrays (see WordNetFileHandler.py). So the memory used stays close to one
+  featurizer whatever the number of processes.
+- with -s, each word is also paired with its -s nearest words by the meaning of their definitions (see CandidateBlocker.SemanticNeighbourBlocker),
+  even when the pair doesn't pass the ALINE threshold. The alignment features of those pairs are worked out as they are featurized, since they
+  aren't in the threshold alignment files.
+- with -m, the pairs are scored by the svm_light model as they are featurized (see SVMLightModel.py), and only the pairs that score at least
+  -c (default 0, ie: the pairs svm_classify would call positive) are written, along with their scores in the predictions file (-o, or
+  predictions_{lang1}_{lang2}.txt when parallelizing). This is what formatSvmOutput.py reads after svm_classify, without ever writing out the
+  features of the many negative pairs.
+- with -b (and -m), the pairs are featurized, scored and filtered in one stream (see ClassifyingRunnerForLangDicts), and the pairs that pass are
+  written straight to the binary positive classified pairs file (-p, or positive_classified_pairs_{lang1}_{lang2}.bin when parallelizing) that
+  formatSvmOutput.py -b would make. No features, pairs or predictions files are written. With -k, a random sample of that many of the pairs that
+  didn't pass is written too (--negatives, or negative_sample_pairs_{lang1}_{lang2}.bin when parallelizing). The throughput of each stage is
+  reported at the end.
 
 '''
 
+import gc
+import os
+import shutil
 import sys
 import time
 
-from multiprocessing import Process, Pipe
+import multiprocessing
+
+import numpy as np
 
 from LanguageDictParser import AlgonquianLanguageDictParser
 from alignmentFeatures import lookUpWordPairStrict
+from AlignmentScoreIndex import AlignmentScoreIndex
+from CandidateBlocker import AlignmentThresholdBlocker, SemanticNeighbourBlocker, UnionBlocker
+from UniToALINEConverter import uniToALINE
 
 
 from FeatureRunner import GeneralFeatureRunner
 from GeneralFeaturizer import GeneralFeaturizer
+from SVMLightModel import SVMLightModel, formatScore
+from ClassifiedPairsFile import ClassifiedPairsWriter, ClassifiedPairsFile, mergeClassifiedPairsFiles
+from StreamingStages import StageCounters, ReservoirSampler, getMergedSampleCounts
 from ExampleCreator import ExampleCreator
 
 
 
+def getLanguageDictParser(family):
+    if family == "totonac":
+        return TotonacLanguageDictParser()
+    elif family == "algonquian":
+        return AlgonquianLanguageDictParser()
+    else:
+        sys.stderr.write("unknown language family!\n")
+        exit(-1)
+
+
+def createBlocker(dict1, dict2, acc1, acc2, alignmentFeaturesDict, threshold, readFromThreshold, getALINE=uniToALINE, model=None,
+                  numNeighbours=0):
+    # returns the blocker of the pairs to visit, or None if every pair of the cross product has to be looked up and checked against the threshold.
+    # this is the AlignmentThresholdBlocker of the pairs above the threshold, along with the numNeighbours semantic neighbours of each word if given
+    if not isinstance(alignmentFeaturesDict, AlignmentScoreIndex) or not (readFromThreshold or numNeighbours > 0):
+        return None
+    blocker = AlignmentThresholdBlocker(dict1, dict2, acc1 == acc2, alignmentFeaturesDict, threshold, getALINE)
+    if numNeighbours > 0:
+        semanticBlocker = SemanticNeighbourBlocker(dict1, dict2, acc1 == acc2, model, numNeighbours)
+        blocker = UnionBlocker(dict1, dict2, acc1 == acc2, [blocker, semanticBlocker])
+    return blocker
+
+
+
 class RunnerForLangDicts(GeneralFeatureRunner):
 
-    def __init__(self, outputPairsFile, outputFeaturesFile, featurizer, family,  acc1, acc2, threshold, readFromThreshold):
-        super().__init__(outputFeaturesFile, featurizer)
+    def __init__(self, outputPairsFile, outputFeaturesFile, featurizer, family,  acc1, acc2, threshold, readFromThreshold, start=0, end=None,
+                 blocker=None, model=None, outputPredictionsFile=None, scoreThreshold=None):
+        super().__init__(outputFeaturesFile, featurizer, model, outputPredictionsFile, scoreThreshold)
         self.outputPairsFile = outputPairsFile
         self.acc1 = acc1
         self.acc2 = acc2
         self.threshold = threshold
         self.readFromThreshold = readFromThreshold        
 
-        if family == "totonac":
-            ldp = TotonacLanguageDictParser()
-        elif family == "algonquian":
-            ldp = AlgonquianLanguageDictParser()
-        else:
-            sys.stderr.write("unknown language family!\n")
-            exit(-1)
-
+        ldp = getLanguageDictParser(family)
         self.dict1 = ldp[self.acc1]
         self.dict2 = ldp[self.acc2]
         self.words1 = sorted(list(self.dict1.keys()))
         self.words2 = sorted(list(self.dict2.keys()))
+        # only the words1 from start up to end are featurized (so a language pair can be split into chunks)
+        self.start = start
+        self.end = len(self.words1) if end is None else end
+
+        # when the alignment file only has the pairs above the threshold, those pairs are the only ones that need to be visited,
+        # rather than looking up every pair of the cross product just to skip most of them
+        self.blocker = blocker
+        if self.blocker is None:
+            self.blocker = createBlocker(self.dict1, self.dict2, self.acc1, self.acc2, self.featurizer.alignmentFeaturesDict, self.threshold,
+                                         self.readFromThreshold, self.getALINE)
 
 
     def displayCurrentProgress(self, startTime, currentTime, currentIndex):
@@ -54,63 +112,90 @@ class RunnerForLangDicts(GeneralFeatureRunner):
         hours = minutes/60.0
         sys.stderr.write("\033[F")
         sys.stderr.write("{0} / {1} dict1 words created; Time so far is {2:.2f}s " 
-                         "= {3:.2f}m = {4:.2f}h\n".format(currentIndex, len(self.words1), seconds, minutes, hours))
+                         "= {3:.2f}m = {4:.2f}h\n".format(currentIndex - self.start, self.end - self.start, seconds, minutes, hours))
+
+
+    def displayStartOfRun(self):
+        sys.stderr.write("looking at {0} and {1}\n".format(self.acc1, self.acc2))
+        sys.stderr.write("size of dict1 = {0}\n".format(len(self.dict1)))
+        sys.stderr.write("size of dict2 = {0}\n\n".format(len(self.dict2)))
+
+
+    def iterBatches(self, showProgress=True):
+        ''' yields (wordTuple1, record1, records2) for each definition of each word of dict1 from start to end, where records2 are the
+        records of the words and definitions of dict2 to pair it with (see GeneralFeatureRunner.getWordRecord) '''
+        t1 = time.time()
+        for i in range(self.start, self.end):
+            uni1 = self.words1[i]
+            t2 = time.time()
+            if showProgress:
+                self.displayCurrentProgress(t1, t2, i)
+            asjp1 = self.getASJP(uni1)
+            aline1 = self.getALINE(uni1)
+
+            for def1 in self.dict1[uni1]:
+                cleanedDef1 = self.getClean(def1)
+                if cleanedDef1 == "":
+                    continue
+                record1 = self.getWordRecord(uni1, asjp1, aline1, def1, cleanedDef1, self.acc1)
+
+                if self.acc1 == self.acc2:
+                    startIndex = i + 1
+                else:
+                    startIndex = 0
+
+                # the pairs of a blocker have already passed the threshold (or are semantic neighbours that don't need to)
+                if self.blocker is not None:
+                    indices2 = self.blocker.getCandidates(i)
+                else:
+                    indices2 = range(startIndex, len(self.words2))
 
+                # all the pairs of this definition are featurized together
+                records2 = []
+                for j in indices2:
+                    uni2 = self.words2[j]
+                    asjp2 = self.getASJP(uni2)
+                    aline2 = self.getALINE(uni2)
+
+                    if self.blocker is None and self.belowThreshold(aline1, aline2):
+                        continue
+
+                    for def2 in self.dict2[uni2]:
+                        cleanedDef2 = self.getClean(def2)
+                        if cleanedDef2 == "":
+                            continue
+                        records2.append(self.getWordRecord(uni2, asjp2, aline2, def2, cleanedDef2, self.acc2))
+
+                yield (self.acc1, uni1, def1), record1, records2
 
-    def run(self, sender=None):
-        if sender is None:
-            sys.stderr.write("looking at {0} and {1}\n".format(self.acc1, self.acc2))
-            sys.stderr.write("size of dict1 = {0}\n".format(len(self.dict1)))
-            sys.stderr.write("size of dict2 = {0}\n\n".format(len(self.dict2)))
+
+    def run(self, showProgress=True):
+        if showProgress:
+            self.displayStartOfRun()
 
         classification = -1 # the classification of each featurize pair is negative
+        numPairs = 0
+        numWritten = 0
 
         with ExampleCreator(self.outputPairsFile) as pairWriter:
             # this will have an instance of an example creator, since we want to write the example pairs that
             # pass the threshold to be featurized
             t1 = time.time()
-            active = True
-            for i, uni1 in enumerate(self.words1):
-                t2 = time.time()
-                if sender is None: 
-                    self.displayCurrentProgress(t1, t2, i)
-                else:
-                    sender.send((i, len(self.words1), self.acc1, self.acc2, active))
-                asjp1 = self.getASJP(uni1)
-                aline1 = self.getALINE(uni1)
-
-                for def1 in self.dict1[uni1]:
-                    cleanedDef1 = self.getClean(def1)
-                    if cleanedDef1 == "":
-                        continue
+            for wordTuple1, record1, records2 in self.iterBatches(showProgress):
+                # only the pairs that were written to the features file (ie: that passed the score threshold) are written here too
+                for k in self.featurizeGivenBatch(record1, records2, classification):
+                    pairWriter.writeNegativePair(wordTuple1, (self.acc2, records2[k].word, records2[k].defn))
+                    numWritten += 1
+                numPairs += len(records2)
 
-                    if self.acc1 == self.acc2:
-                        startIndex = i + 1
-                    else:
-                        startIndex = 0
-
-                    for j in range(startIndex, len(self.words2)):
-                        uni2 = self.words2[j]
-                        asjp2 = self.getASJP(uni2)
-                        aline2 = self.getALINE(uni2)
+        seconds = time.time() - t1
+        if showProgress:
+            sys.stderr.write("featurized {0} pairs in {1:.2f}s = {2:.0f} pairs/sec\n".format(numPairs, seconds, numPairs / max(seconds, 1e-9)))
+            if self.scoreThreshold is not None:
+                sys.stderr.write("{0} / {1} pairs scored at least {2}\n".format(numWritten, numPairs, self.scoreThreshold))
+        return numPairs
 
-                        if self.belowThreshold(aline1, aline2):
-                            continue
 
-                        for def2 in self.dict2[uni2]:
-                            cleanedDef2 = self.getClean(def2)
-                            if cleanedDef2 == "":
-                                continue
-                            self.featurizeGivenPair(uni1, uni2, asjp1, asjp2, aline1, aline2, def1, def2, 
-                                                    cleanedDef1, cleanedDef2, self.acc1, self.acc2, classification)
-                            
-                            pairWriter.writeNegativePair((self.acc1, uni1, def1), (self.acc2, uni2, def2))
-
-            if sender is not None:
-                # send the last message to the receiver that we are finished
-                active = False
-                sender.send((len(self.words1), len(self.words1), self.acc1, self.acc2, active))    
-                        
     def belowThreshold(self, aline1, aline2):
         # given two words in ALINE format, we look the pair up in the alignment dictinoary. 
         # based on whether the pair is found in the dictionary, what the returned score is, and whether we are looking in a threshold alignment file,
@@ -136,6 +221,84 @@ class RunnerForLangDicts(GeneralFeatureRunner):
 
 
 
+class ClassifyingRunnerForLangDicts(RunnerForLangDicts):
+    ''' featurizes, scores and filters the pairs in one stream, and writes the pairs that score at least the score threshold straight to a
+    binary classified pairs file (see ClassifiedPairsFile.py). This is the same file that formatSvmOutput.py -b makes from the features, pairs
+    and predictions files, but those files are never written, and only the passed pairs are held in memory (in the compact arrays of the
+    binary file rather than as text). With numNegativeSamples, a uniform random sample of that many of the pairs that didn't pass is kept
+    as well and written to the negatives file, for looking into what the model turns down.
+    The number of pairs through each stage and the time they took are kept in self.counters '''
+
+    def __init__(self, outputPositivesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold, model, scoreThreshold=0.0, start=0,
+                 end=None, blocker=None, outputNegativesFile=None, numNegativeSamples=0, sortByScore=True, seed=0):
+        super().__init__(None, None, featurizer, family, acc1, acc2, threshold, readFromThreshold, start, end, blocker, model, None, scoreThreshold)
+        self.outputPositivesFile = outputPositivesFile
+        self.outputNegativesFile = outputNegativesFile
+        self.numNegativeSamples = numNegativeSamples
+        self.sortByScore = sortByScore # the chunks of a language pair aren't sorted, since they are sorted when they are merged
+        self.seed = seed
+        self.counters = StageCounters()
+
+    # nothing is written until the end of the run
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
+    def run(self, showProgress=True):
+        if showProgress:
+            self.displayStartOfRun()
+
+        classification = -1
+        positives = ClassifiedPairsWriter()
+        sampler = ReservoirSampler(self.numNegativeSamples, self.seed) if self.numNegativeSamples > 0 else None
+
+        for wordTuple1, record1, records2 in self.iterBatches(showProgress):
+            t1 = time.perf_counter()
+            featureMatrix = self.featurizer.featurizeBatch(record1, records2)
+            t2 = time.perf_counter()
+            self.counters.add("featurize", len(records2), t2 - t1)
+
+            scores = self.model.scoreFeatureMatrix(featureMatrix)
+            t3 = time.perf_counter()
+            self.counters.add("score", len(records2), t3 - t2)
+
+            # the scores are kept as svm_classify would have written them, so the file is the same as the one from its predictions
+            passed = scores >= self.scoreThreshold
+            indices = passed.nonzero()[0].tolist()
+            positives.addPairRows([wordTuple1] * len(indices), [(self.acc2, records2[k].word, records2[k].defn) for k in indices],
+                                  [formatScore(score) for score in scores[indices].tolist()], classification, featureMatrix[indices])
+            t4 = time.perf_counter()
+            self.counters.add("filter", len(indices), t4 - t3)
+
+            if sampler is not None:
+                negativeIndices = (~passed).nonzero()[0]
+                for i, slot in sampler.getSlots(len(negativeIndices)):
+                    k = negativeIndices[i]
+                    record2 = records2[k]
+                    # the row is copied so that the sample doesn't keep the whole batch's matrix
+                    sampler.addItem(slot, (wordTuple1, (self.acc2, record2.word, record2.defn), formatScore(scores[k]), featureMatrix[k].copy()))
+                self.counters.add("sample negatives", len(negativeIndices), time.perf_counter() - t4)
+
+        t1 = time.perf_counter()
+        positives.write(self.outputPositivesFile, self.sortByScore)
+        self.counters.add("write", len(positives), time.perf_counter() - t1)
+        if sampler is not None:
+            negatives = ClassifiedPairsWriter()
+            if sampler.samples:
+                wordTuples1, wordTuples2, negativeScores, featureRows = zip(*sampler.samples)
+                negatives.addPairRows(wordTuples1, wordTuples2, negativeScores, classification, np.array(featureRows))
+            negatives.write(self.outputNegativesFile, self.sortByScore)
+
+        if showProgress:
+            sys.stderr.write(self.counters.getReport() + "\n")
+            sys.stderr.write("{0} / {1} pairs scored at least {2}\n".format(len(positives), self.counters.getNumPairs("featurize"), self.scoreThreshold))
+        return self.counters.getNumPairs("featurize")
+
+
+
 
 
 if __name__ == "__main__":
@@ -167,13 +330,42 @@ if __name__ == "__main__":
     parser.add_option('--parallelize', action='store_true', dest='parallelize', help="flag if want to use automatic Python parallelization.", default=False)
     parser.add_option('--outputPath', action='store', dest='outputPath', help="the path to where the output features and pairs files should be created (only used if parallelize is turned on)")
     parser.add_option('--alignmentPath', action='store', dest='alignmentPath', help="the path to where the alignment feature files are found (only used if parallelize is turned on)")
+    parser.add_option('-n', action='store', dest='numProcesses', type='int', help="the number of processes to run at once when parallelizing. default = the number of cores",
+                      default=os.cpu_count())
+    parser.add_option('--chunkSize', action='store', dest='chunkSize', type='int', help="the number of words of the first language in each chunk when parallelizing. default = 100",
+                      default=100)
+    parser.add_option('-s', action='store', dest='numNeighbours', type='int', help="also featurize the pairs of each word with its this many "
+                      "nearest words by definition, whatever their ALINE score. Uses the word2vec vectors. default = 0", default=0)
+
+    # to score the pairs in place of svm_classify
+    parser.add_option('-m', action='store', dest='modelFile', help="the svm_light model file (linear kernel) to score the pairs with. ex: polynesian_model.txt")
+    parser.add_option('-o', action='store', dest='outputPredictionsName', help="the output name for the scores of the pairs (only used with a model, "
+                      "if not running in parallel)")
+    parser.add_option('-c', action='store', dest='scoreThreshold', type='float', help="only write the pairs that score at least this much "
+                      "(only used with a model). default = 0", default=0.0)
+    parser.add_option('-b', action='store_true', dest='classifyPairs', help="featurize, score and filter the pairs in one stage, writing only the "
+                      "binary classified pairs file of the pairs that pass to -p (needs a model)", default=False)
+    parser.add_option('-k', action='store', dest='numNegativeSamples', type='int', help="with -b, also write a random sample of this many of the "
+                      "pairs that don't pass. default = 0", default=0)
+    parser.add_option('--negatives', action='store', dest='outputNegativesName', help="with -k, the output name for the sample of the pairs "
+                      "that don't pass (only used if not running in parallel)")
 
     options, args = parser.parse_args()
 
-    if (options.outputFeaturesName is None or options.outputPairsName is None) and not options.parallelize:
+    if (options.outputFeaturesName is None or options.outputPairsName is None) and not options.parallelize and not options.classifyPairs:
         sys.stderr.write("Must provide the output name if not running in parallel!\n")
         parser.print_help()
         exit(-1)
+
+    if options.classifyPairs and (options.modelFile is None or (options.outputPairsName is None and not options.parallelize)):
+        sys.stderr.write("Must provide a model file and the output name for the pairs (if not running in parallel) with -b!\n")
+        parser.print_help()
+        exit(-1)
+
+    if options.numNegativeSamples > 0 and options.outputNegativesName is None and not options.parallelize:
+        sys.stderr.write("Must provide the output name for the sample of the negative pairs if not running in parallel!\n")
+        parser.print_help()
+        exit(-1)
         
 
     if (options.acc1 is None or options.acc2 is None) and not options.parallelize:
@@ -181,6 +373,11 @@ if __name__ == "__main__":
         parser.print_help()
         exit(-1)
 
+    if options.modelFile is not None and options.outputPredictionsName is None and not options.parallelize and not options.classifyPairs:
+        sys.stderr.write("Must provide the output name for the scores when scoring the pairs!\n")
+        parser.print_help()
+        exit(-1)
+
     if (options.outputPath is None or options.alignmentPath is None) and options.parallelize:
         sys.stderr.write("Must provide the output and alignment paths when parallelizing!\n")
         parser.print_help()
@@ -206,95 +403,141 @@ if __name__ == "__main__":
         return langTuples
 
 
+    def getAlignmentFeaturesFileName(alignmentPath, lang1, lang2):
+        # this assumes a certain format for the alignment features files
+        return "{0}/alignment_features_{1}_{2}_0.35Threshold.bin".format(alignmentPath, lang1, lang2)
+
     def addAlignmentFeaturesToFeaturizer(featurizer, langTuples, alignmentPath):
         # given a featurizer object, a langTuples list, and the path to where alignment feature files are found,
         # reads each file for pairs of languages and adds the scores to the featurizer
-        # this assumes a certain format for the alignment features files
         for i, tuple1 in enumerate(langTuples):
             acc1, lang1 = tuple1
             for j in range(i, len(langTuples)):
                 acc2, lang2 = langTuples[j]
-                alignmentFeaturesFile = "{0}/alignment_features_{1}_{2}_0.35Threshold.bin".format(alignmentPath, lang1, lang2)
-                featurizer.readAdditionalAlignmentFile(alignmentFeaturesFile)
+                featurizer.readAdditionalAlignmentFile(getAlignmentFeaturesFileName(alignmentPath, lang1, lang2))
 
-    def featurizeFile(sender, outputFeaturesFile, outputPairsFile, family, small, acc1, acc2, threshold, readFromThreshold):
-        # the function that is given to each job (or called once if we are not parallelizing)
+    def featurizeFile(outputPairsFile, outputFeaturesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold, start=0, end=None,
+                      blocker=None, showProgress=True, outputPredictionsFile=None):
+        # the function that is run for each chunk (or called once if we are not parallelizing)
         # a Runner is created with the input parameters, and the features and output pairs are written to the given file names
-        with RunnerForLangDicts(outputFeaturesFile, outputPairsFile, family, small, acc1, acc2, threshold, readFromThreshold) as runner:
-            runner.run(sender)
-
-    def createJobsForEachLanguagePair(featurizer, langTuples, family, outputPath, threshold, readFromThreshold):
-        # for each pair of languages in the langTuples list, a process is created that will featurize the given pair
-        # the receivers list contains a list of Pipes, able to get information from the jobs as they run
-        jobs = []
-        receivers = []
-        for i, tuple1 in enumerate(langTuples):
-            acc1, lang1 = tuple1
+        with RunnerForLangDicts(outputPairsFile, outputFeaturesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold, start, end,
+                                blocker, scoringModel, outputPredictionsFile, scoreThreshold) as runner:
+            return runner.run(showProgress)
+
+    def classifyFile(outputPositivesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold, start=0, end=None, blocker=None,
+                     showProgress=True, outputNegativesFile=None, sortByScore=True):
+        # like featurizeFile, but the pairs are featurized, scored and filtered in one stage. Returns the counters of the stages
+        with ClassifyingRunnerForLangDicts(outputPositivesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold, scoringModel,
+                                           scoreThreshold, start, end, blocker, outputNegativesFile, options.numNegativeSamples, sortByScore,
+                                           seed=start) as runner:
+            runner.run(showProgress)
+            return runner.counters
+
+    def featurizeChunk(chunk):
+        # the function run by each process of the pool. The featurizer and the blockers are the ones made before the pool was forked.
+        # when classifying the pairs, the chunk's two files are its passed pairs and its sample of the others
+        acc1, acc2, start, end, chunkPairsFile, chunkFeaturesFile, chunkPredictionsFile = chunk
+        t1 = time.time()
+        if options.classifyPairs:
+            counters = classifyFile(chunkPairsFile, featurizer, options.family, acc1, acc2, threshold, options.readFromThreshold, start, end,
+                                    blockers.get((acc1, acc2)), showProgress=False, outputNegativesFile=chunkFeaturesFile, sortByScore=False)
+            numPairs = counters.getNumPairs("featurize")
+        else:
+            counters = None
+            numPairs = featurizeFile(chunkPairsFile, chunkFeaturesFile, featurizer, options.family, acc1, acc2, threshold, options.readFromThreshold,
+                                     start, end, blockers.get((acc1, acc2)), showProgress=False, outputPredictionsFile=chunkPredictionsFile)
+        return acc1, acc2, start, end, numPairs, time.time() - t1, counters
+
+    def createBlockersForEachLanguagePair(langTuples, family, alignmentPath, threshold, readFromThreshold, model=None, numNeighbours=0):
+        # the blocker of each language pair is made once here, rather than once for each of its chunks. Returns a dict mapping (acc1, acc2) to it.
+        # the pairs of two languages that pass the threshold are all in their own alignment file, so each blocker only goes through that file
+        # rather than the pairs of every file that the featurizer has
+        ldp = getLanguageDictParser(family)
+        blockers = {}
+        for i, (acc1, lang1) in enumerate(langTuples):
             for j in range(i, len(langTuples)):
                 acc2, lang2 = langTuples[j]
-                outputFeaturesFile = "{0}/feature_values_{1}_{2}.txt".format(outputPath, lang1, lang2)
-                outputPairsFile = "{0}/word_pairs_{1}_{2}.txt".format(outputPath, lang1, lang2)
-                receiver, sender = Pipe() # the pipe is used to get information from each process regarding its progress
-                p = Process(target=featurizeFile, args=(sender, outputPairsFile, outputFeaturesFile, featurizer, family, acc1, acc2, threshold, readFromThreshold))
-                receivers.append(receiver)
-                p.start()
-                jobs.append(p)
-        return jobs, receivers
-
-
-    def displayProgressForAllJobs(receivers):
-        # this function gets status reports from each receiver about its corresponding job, and displays the progress info to stderr
-        CURSOR_UP_ONE = '\x1b[1A'
-        statusDict = {} # keeps the currrent status for given language pairs. 
-        # the status dict gets updated when the receiver gets new messages. Once a job is done, the last status remains forever in the dict
-        startTime = time.time()
-        sys.stderr.write("\n\n")
-        while len(receivers) > 0: # once a job is finished, the receiver will be removed from the list, so we loop while there are still some in the list
-
-            # reset the cursor for the next time through the loop
-            for _ in range(len(statusDict) + 1): # backtrack the length of the status dict + 1 for the time-report line
-                sys.stderr.write(CURSOR_UP_ONE)
-
-            currentTime = time.time()
-            seconds = currentTime - startTime
-            minutes = seconds/60.0
-            hours = minutes/60.0
-            sys.stderr.write("Time for featurizing = {0:.2f}s = {1:.2f}m = {2:.2f}h\n".format(seconds, minutes, hours))
-
-            time.sleep(1)
-            # check each reveiver for a status report, and if they are finished, then remove them from the receivers list
-            receiverIndicesToDelete = []
-            for i, receiver in enumerate(receivers):
-                status = None
-                while receiver.poll(): # check if the receiver has received a message
-                    # we loop so that we always check the most recent status report
-                    status = receiver.recv()
-                    active = status[4]
-                    if not active:
-                        receiverIndicesToDelete.append(i)
-                        break
-
-                if status is not None:
-                    current, total, acc1, acc2, active = status
-                    statusDict[(acc1,acc2)] = status
-
-            # now print out each status
-            for key in sorted(list(statusDict.keys())):
-                status = statusDict[key]
-                current, total, acc1, acc2, active = status            
-                if active:
-                    finishedFlag = ""
-                else:
-                    finishedFlag = "Complete!"
-                sys.stderr.write("{2} and {3}: {0} / {1}\t\t{4}\n".format(current, total, acc1, acc2, finishedFlag))
-
+                alignmentScores = AlignmentScoreIndex([getAlignmentFeaturesFileName(alignmentPath, lang1, lang2)])
+                blocker = createBlocker(ldp[acc1], ldp[acc2], acc1, acc2, alignmentScores, threshold, readFromThreshold,
+                                        model=model, numNeighbours=numNeighbours)
+                if blocker is not None:
+                    blockers[(acc1, acc2)] = blocker
+        return blockers
+
+    def getChunkCost(ldp, blockers, acc1, acc2, start, end):
+        # a rough number of word pairs to featurize in the chunk, so that the largest chunks can be started first
+        if (acc1, acc2) in blockers:
+            return sum(len(blockers[(acc1, acc2)].getCandidates(i)) for i in range(start, end))
+        if acc1 == acc2:
+            numWords = len(ldp[acc1])
+            return sum(numWords - i - 1 for i in range(start, end))
+        return (end - start) * len(ldp[acc2])
+
+    def createChunksForEachLanguagePair(langTuples, family, chunkPath, chunkSize, blockers):
+        # splits each pair of languages in the langTuples list into chunks of chunkSize words of the first language.
+        # returns a dict mapping each (lang1, lang2) to its list of chunks in order, and the list of all the chunks, largest first
+        ldp = getLanguageDictParser(family)
+        chunksForPair = {}
+        costs = {}
+        for i, (acc1, lang1) in enumerate(langTuples):
+            for j in range(i, len(langTuples)):
+                acc2, lang2 = langTuples[j]
+                chunks = []
+                for start in range(0, len(ldp[acc1]), chunkSize):
+                    end = min(start + chunkSize, len(ldp[acc1]))
+                    if options.classifyPairs:
+                        chunk = (acc1, acc2, start, end, "{0}/positive_classified_pairs_{1}_{2}_{3}.bin".format(chunkPath, lang1, lang2, start),
+                                 "{0}/negative_sample_pairs_{1}_{2}_{3}.bin".format(chunkPath, lang1, lang2, start), None)
+                    else:
+                        chunk = (acc1, acc2, start, end, "{0}/word_pairs_{1}_{2}_{3}.txt".format(chunkPath, lang1, lang2, start),
+                                 "{0}/feature_values_{1}_{2}_{3}.txt".format(chunkPath, lang1, lang2, start),
+                                 "{0}/predictions_{1}_{2}_{3}.txt".format(chunkPath, lang1, lang2, start) if scoringModel is not None else None)
+                    costs[chunk] = getChunkCost(ldp, blockers, acc1, acc2, start, end)
+                    chunks.append(chunk)
+                chunksForPair[(lang1, lang2)] = chunks
+        # the pool hands out the chunks in this order, so starting with the largest leaves the small ones to fill in at the end
+        allChunks = sorted(costs, key=lambda chunk: costs[chunk], reverse=True)
+        return chunksForPair, allChunks
+
+    def mergeChunks(outputFileName, chunkFileNames):
+        # concatenates the chunk files (in order) into the output file
+        with open(outputFileName, 'w') as outputFile:
+            for chunkFileName in chunkFileNames:
+                with open(chunkFileName) as chunkFile:
+                    shutil.copyfileobj(chunkFile, outputFile)
+                os.remove(chunkFileName)
+
+    def mergeNegativeSamples(outputFileName, chunkFileNames, numsSeen):
+        # the chunks each have a sample of their own negative pairs, so how many to take from each is drawn in proportion to the number of
+        # negative pairs each one saw, which makes the merged sample a uniform one of all the language pair's negative pairs
+        rng = np.random.default_rng(0)
+        negatives = ClassifiedPairsWriter()
+        for chunkFileName, numToTake in zip(chunkFileNames, getMergedSampleCounts(numsSeen, options.numNegativeSamples)):
+            pairsFile = ClassifiedPairsFile(chunkFileName)
+            for i in sorted(rng.choice(len(pairsFile), numToTake, replace=False).tolist()):
+                wordID1, wordID2 = pairsFile.pairs[i].tolist()
+                start, end = pairsFile.featureIndptr[i], pairsFile.featureIndptr[i+1]
+                negatives.addPairFeatures(pairsFile.wordTuples[wordID1], pairsFile.wordTuples[wordID2], pairsFile.scores[i], int(pairsFile.labels[i]),
+                                          pairsFile.featureNums[start:end].tolist(), pairsFile.featureValues[start:end].tolist())
+            os.remove(chunkFileName)
+        negatives.write(outputFileName, sortByScore=True)
+
+    def featurizeAllChunks(allChunks, numProcesses):
+        # the chunks are run by a pool of processes, each taking the next chunk as soon as it finishes one, so none sit idle while others are busy.
+        # the pool must be forked for the processes to share the featurizer (another start method would pickle a copy of it for each one),
+        # and the objects made so far are moved out of the garbage collector's reach so that its passes don't write to their pages in every process.
+        # returns a dict mapping each chunk's (acc1, acc2, start) to the counters of its stages, when classifying the pairs
+        context = multiprocessing.get_context("fork")
+        gc.freeze()
+        chunkCounters = {}
+        with context.Pool(numProcesses) as pool:
+            for numFinished, (acc1, acc2, start, end, numPairs, seconds, counters) in enumerate(pool.imap_unordered(featurizeChunk, allChunks), 1):
+                sys.stderr.write("{0} / {1} chunks finished: {2} and {3} words {4} to {5} took {6:.2f}s ({7} pairs = {8:.0f} pairs/sec)\n".format(
+                                 numFinished, len(allChunks), acc1, acc2, start, end, seconds, numPairs, numPairs / max(seconds, 1e-9)))
+                chunkCounters[(acc1, acc2, start)] = counters
+        return chunkCounters
 
-            #finally, remove the receivers that are finished. Must do it in reverse order of index
-            for index in sorted(receiverIndicesToDelete, reverse=True):
-                receivers[index].close()
-                del receivers[index]
 
-            
     # determine the feature numbers to use in the featurizer, based on arguments
     if options.UseFeatureNumbers is not None:
         stringNumbers =  options.doNotUseFeatureNumbers.split(",")
@@ -311,6 +554,18 @@ if __name__ == "__main__":
 
     featurizer = GeneralFeaturizer(options.defnLanguage, options.alignmentFeaturesFile, featureNumbersToUse)
 
+    model = None
+    if options.numNeighbours > 0:
+        # the semantic neighbours aren't in the threshold alignment files, so their alignment features are worked out instead
+        featurizer.alignMissingPairs = True
+        model = featurizer.model if hasattr(featurizer, "model") else featurizer.loadVectors()
+
+    # the svm_light model that scores the pairs, if they are scored here rather than by svm_classify
+    scoringModel = None
+    scoreThreshold = None
+    if options.modelFile is not None:
+        scoringModel = SVMLightModel(options.modelFile)
+        scoreThreshold = options.scoreThreshold
 
     threshold = float(options.threshold)
     t1 = time.time()
@@ -321,20 +576,57 @@ if __name__ == "__main__":
         # next, read in all the alignment features into the featurizer for each pair of langs
         addAlignmentFeaturesToFeaturizer(featurizer, langTuples, options.alignmentPath)
 
-        # then featurize each language pair in parallel. start a new job for each pair.
-        jobs, receivers = createJobsForEachLanguagePair(featurizer, langTuples, options.family, options.outputPath, threshold, options.readFromThreshold)
-
-        # now we just loop and get the status from each job. displays the progress of each language pair to stderr until all jobs are done.
-        displayProgressForAllJobs(receivers)
-
-        #finally, terminate all jobs
-        for job in jobs:
-            job.terminate()
+        # then split each language pair into chunks, and featurize the chunks in parallel
+        chunkPath = "{0}/chunks".format(options.outputPath)
+        os.makedirs(chunkPath, exist_ok=True)
+        blockers = createBlockersForEachLanguagePair(langTuples, options.family, options.alignmentPath, threshold, options.readFromThreshold, model,
+                                                     options.numNeighbours)
+        chunksForPair, allChunks = createChunksForEachLanguagePair(langTuples, options.family, chunkPath, options.chunkSize, blockers)
+        chunkCounters = featurizeAllChunks(allChunks, options.numProcesses)
+
+        # finally, put the chunks of each language pair back together in order
+        totalCounters = StageCounters()
+        for i, (acc1, lang1) in enumerate(langTuples):
+            for j in range(i, len(langTuples)):
+                acc2, lang2 = langTuples[j]
+                chunks = chunksForPair[(lang1, lang2)]
+                if options.classifyPairs:
+                    t3 = time.perf_counter()
+                    mergeClassifiedPairsFiles("{0}/positive_classified_pairs_{1}_{2}.bin".format(options.outputPath, lang1, lang2),
+                                              [chunk[4] for chunk in chunks], sortByScore=True)
+                    for chunk in chunks:
+                        os.remove(chunk[4])
+                    if options.numNegativeSamples > 0:
+                        mergeNegativeSamples("{0}/negative_sample_pairs_{1}_{2}.bin".format(options.outputPath, lang1, lang2),
+                                             [chunk[5] for chunk in chunks],
+                                             [chunkCounters[(acc1, acc2, chunk[2])].getNumPairs("sample negatives") for chunk in chunks])
+                    for chunk in chunks:
+                        totalCounters.addCounters(chunkCounters[(acc1, acc2, chunk[2])])
+                    totalCounters.add("merge", sum(chunkCounters[(acc1, acc2, chunk[2])].getNumPairs("write") for chunk in chunks),
+                                      time.perf_counter() - t3)
+                    continue
+                mergeChunks("{0}/word_pairs_{1}_{2}.txt".format(options.outputPath, lang1, lang2), [chunk[4] for chunk in chunks])
+                mergeChunks("{0}/feature_values_{1}_{2}.txt".format(options.outputPath, lang1, lang2), [chunk[5] for chunk in chunks])
+                if scoringModel is not None:
+                    mergeChunks("{0}/predictions_{1}_{2}.txt".format(options.outputPath, lang1, lang2), [chunk[6] for chunk in chunks])
+        os.rmdir(chunkPath)
+        if options.classifyPairs:
+            # the time of the stages run in the chunks is their total over all the processes
+            sys.stderr.write(totalCounters.getReport() + "\n")
 
     else:
         # if not parallelizing, then just featurize once, with the given language pair
-        sender = None # sender is only used when running in parallel
-        featurizeFile(sender, options.outputPairsName, options.outputFeaturesName, featurizer, options.family, options.acc1, options.acc2, threshold, options.readFromThreshold)
+        blocker = None
+        if options.numNeighbours > 0:
+            ldp = getLanguageDictParser(options.family)
+            blocker = createBlocker(ldp[options.acc1], ldp[options.acc2], options.acc1, options.acc2, featurizer.alignmentFeaturesDict, threshold,
+                                    options.readFromThreshold, model=model, numNeighbours=options.numNeighbours)
+        if options.classifyPairs:
+            classifyFile(options.outputPairsName, featurizer, options.family, options.acc1, options.acc2, threshold, options.readFromThreshold,
+                         blocker=blocker, outputNegativesFile=options.outputNegativesName)
+        else:
+            featurizeFile(options.outputPairsName, options.outputFeaturesName, featurizer, options.family, options.acc1, options.acc2, threshold,
+                          options.readFromThreshold, blocker=blocker, outputPredictionsFile=options.outputPredictionsName)
 
 
     t2 = time.time()
@@ -14,12 +14,14 @@ and featurizes each pair and writes the featurized output to file for svm-light
 
 if --training is specified then a feature dictionary is created and written to file
 if --testing is specified then the given feature dictionary is read from file
+unless --hashed is given, in which case the features are numbered by hashing them into --hashDimension numbers and there is no
+feature dictionary (see SubstringFeaturizer.py), so training and testing files can be featurized separately and in any order
 
 '''
 
 
 
-from SubstringFeaturizer import SubstringFeaturizerForSVMLight
+from SubstringFeaturizer import SubstringFeaturizerForSVMLight, DEFAULT_HASH_DIMENSION
 from FeatureRunner import SubstringFeatureRunner
 
 import time
@@ -47,10 +49,10 @@ class RunnerForExamples(SubstringFeatureRunner):
         if sender is None:
             sys.stderr.write("Featurizing file: {0}\n\n".format(self.examplePairsFile))
         with open(self.examplePairsFile) as file:
-            t1 = time.clock()
+            t1 = time.time()
             active = True
             for i, line in enumerate(file):
-                t2 = time.clock()
+                t2 = time.time()
                 if sender is None: 
                     self.displayCurrentProgress(t1, t2, i)
                 else:
@@ -66,7 +68,12 @@ class RunnerForExamples(SubstringFeatureRunner):
                 self.featurizeGivenPair(word1, word2, classification)
 
 
-            if sender is None:
+            if sender is None and self.featurizer.hashDimension is not None:
+                numFeatures, numHashedFeatures = self.featurizer.getCollisionStats()
+                sys.stderr.write("{0} distinct features were hashed to {1} of the {2} feature numbers ({3} collisions = {4:.2%})\n".format(numFeatures,
+                                 numHashedFeatures, self.featurizer.hashDimension, numFeatures - numHashedFeatures,
+                                 (numFeatures - numHashedFeatures) / max(numFeatures, 1)))
+            elif sender is None:
                 sys.stderr.write("The number of total training features is {0}\n".format(len(self.featurizer.featureDict)))            
                 if not self.trainingFlag:
                     sys.stderr.write("The number of total testing features is {0}\n".format(len(self.featurizer.allTestingFeatures)))
@@ -92,6 +99,10 @@ if __name__ == "__main__":
 
     parser.add_option('--training', action='store_true', dest='training', help="use if training, and hence will write to the feature dict file.", default=False)
     parser.add_option('--testing', action='store_true', dest='testing', help="use if testing, and hence will read from the feature dict file.", default=False)
+    parser.add_option('--hashed', action='store_true', dest='hashed', help="number the features by hashing them, instead of with a feature dict.",
+                      default=False)
+    parser.add_option('--hashDimension', action='store', dest='hashDimension', type='int', help="the number of feature numbers the features are hashed "
+                      "into with --hashed. default = {0}".format(DEFAULT_HASH_DIMENSION), default=DEFAULT_HASH_DIMENSION)
 
 
     # the following arguments are used when running in parallel
@@ -104,6 +115,8 @@ if __name__ == "__main__":
     parser.add_option('--family', action='store', dest='family', help="the language family, (only used if parallelize is turned on)", default="algonquian")
 
     options, args = parser.parse_args()
+    if not options.hashed:
+        options.hashDimension = None # the features are numbered by a feature dict
 
 
     if (options.inputPairsFile is None or options.outputFile is None) and not options.parallelize:
@@ -118,12 +131,12 @@ if __name__ == "__main__":
         exit(-1)
 
 
-    if options.testing and options.featureDictFile is None and not options.parallelize:
+    if options.testing and options.featureDictFile is None and not options.parallelize and options.hashDimension is None:
         sys.stderr.write("Must provide a feature dict file if testing!\n")
         parser.print_help()
         exit(-1)
 
-    if (options.outputPath is None or options.inputPath is None or options.featureDictPath is None) and options.parallelize:
+    if (options.outputPath is None or options.inputPath is None or (options.featureDictPath is None and not options.hashed)) and options.parallelize:
         sys.stderr.write("Must provide the file paths when parallelizing!\n")
         parser.print_help()
         exit(-1)
@@ -161,7 +174,10 @@ if __name__ == "__main__":
                 featureDictFile = "{0}/feature_dict_{1}_{2}.txt".format(featureDictPath, lang1, lang2)
                 outputFile = "{0}/substring_feature_values_{1}_{2}.txt".format(outputPath, lang1, lang2)
                 receiver, sender = Pipe() # the pipe is used to get information from each process regarding its progress
-                p = Process(target=featurizeFile, args=(sender, inputPairsFile, featureDictFile, outputFile, options.training, options.maxSubstringLength, options.substitutionCost))
+                if options.hashDimension is not None:
+                    featureDictFile = None # there is no feature dict when the features are hashed
+                p = Process(target=featurizeFile, args=(sender, inputPairsFile, featureDictFile, outputFile, options.training, options.maxSubstringLength,
+                                                        options.substitutionCost, options.hashDimension))
                 receivers.append(receiver)
                 p.start()
                 jobs.append(p)
@@ -169,8 +185,8 @@ if __name__ == "__main__":
         return jobs, receivers
 
 
-    def featurizeFile(sender, inputPairsFile, featureDictFile, outputFile, trainingFlag, maxSubstringLength, substitutionCost):
-        featurizer = SubstringFeaturizerForSVMLight(maxSubstringLength, trainingFlag, substitutionCost)
+    def featurizeFile(sender, inputPairsFile, featureDictFile, outputFile, trainingFlag, maxSubstringLength, substitutionCost, hashDimension=None):
+        featurizer = SubstringFeaturizerForSVMLight(maxSubstringLength, trainingFlag, substitutionCost, hashDimension)
         with RunnerForExamples(inputPairsFile, outputFile, featurizer, featureDictFile, trainingFlag) as exampleRunner:
             exampleRunner.run(sender)
 
@@ -246,6 +262,8 @@ if __name__ == "__main__":
     else:
         # if not parallelizing, then just featurize once, with the given language pair
         sender = None # sender is only used when running in parallel
-        featurizeFile(sender, options.inputPairsFile, options.featureDictFile, options.outputFile, options.training, options.maxSubstringLength, options.substitutionCost)
+        featureDictFile = options.featureDictFile if options.hashDimension is None else None # there is no feature dict when the features are hashed
+        featurizeFile(sender, options.inputPairsFile, featureDictFile, options.outputFile, options.training, options.maxSubstringLength, options.substitutionCost,
+                      options.hashDimension)
 
 
@@ -31,6 +31,11 @@ mkdirCommand = "mkdir ../Output/SubstringFeatures"
 handleCommand(mkdirCommand)
 mkdirCommand = "mkdir ../Output/SubstringModels"
 handleCommand(mkdirCommand)
+# for the substring features and models with a hashed feature space (see script_SubstringModels.py --hashed)
+mkdirCommand = "mkdir ../Output/SubstringFeaturesHashed"
+handleCommand(mkdirCommand)
+mkdirCommand = "mkdir ../Output/SubstringModelsHashed"
+handleCommand(mkdirCommand)
 
 # check for svm_learn and svm_classify in $PATH
 if not shutil.which("svm_learn"):
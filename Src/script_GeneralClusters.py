@@ -11,7 +11,7 @@ CLUSTERS_PATH = "../Output/Clusters"
 
 
 def cluster():
-    clusterCommand = ("./clusterByScores.py -p {0}/positive_classified_pairs_all_langs.txt -l "
+    clusterCommand = ("./clusterByScores.py -p {0}/positive_classified_pairs_all_langs.bin -l "
                       "--progress -t 0  -c {1}/clusters_0.35Threshold.txt --noSameLang ".format(GENERAL_FEATURES_PATH, CLUSTERS_PATH))
     handleCommand(clusterCommand)
 
@@ -3,6 +3,7 @@
 # this script runs the necessary files to create the features for each Algonquian language pair and then
 # classifies each pair using the general model that was trained on Polynesian data
 # use the -p argument for parallelizing. Otherwise, it is run sequential and takes longer.
+# use the -s argument to featurize, classify and keep the positive pairs in one stage, without writing the features of every pair or running svm_classify.
 
 import handleCommand
 
@@ -22,6 +23,24 @@ def featurizeInParallel():
     handleCommand(featurizeCommand)
 
 
+def classifyInParallel():
+    classifyCommand = ("./runGeneralFeaturizerOnLangDicts.py  --parallelize -b -m {2}/polynesian_model.txt --outputPath {0} --alignmentPath {1} "
+                       "-t 0.35 -r -y wordNet".format(GENERAL_FEATURES_PATH, ALIGNMENT_PATH, MODEL_PATH))
+    handleCommand(classifyCommand)
+
+
+def classifySequential():
+    for i, langTuple in enumerate(langTuples):
+        lang1, acc1 = langTuple
+        for j in range(i, len(langTuples)):
+            otherTuple = langTuples[j]
+            lang2, acc2 = otherTuple
+            classifyCommand = ("./runGeneralFeaturizerOnLangDicts.py  -b -m {2}/polynesian_model.txt -p {0}/positive_classified_pairs_{3}_{4}.bin "
+                               "-a {1}/alignment_features_{3}_{4}_0.35Threshold.bin -r  -t 0.35 -y wordNet"
+                               " --l1 {5} --l2 {6} ".format(GENERAL_FEATURES_PATH, ALIGNMENT_PATH, MODEL_PATH, lang1, lang2, acc1, acc2))
+            handleCommand(classifyCommand)
+
+
 def featurizeSequential():
     for i, langTuple in enumerate(langTuples):
         lang1, acc1 = langTuple
@@ -57,12 +76,13 @@ def formatClassifiedPairs():
             # next we format so we have the word pairs with their scores
             # just get the positive scores, since otherwise the amount of pairs gets so huge that we run out of  memory when clustering
             formatSVMCommand = ("./formatSvmOutput.py -s {0}/predictions_{1}_{2}.txt -p {0}/word_pairs_{1}_{2}.txt "
-                                "-f {0}/feature_values_{1}_{2}.txt > {0}/positive_classified_pairs_{1}_{2}.txt".format(GENERAL_FEATURES_PATH, lang1, lang2))
+                                "-f {0}/feature_values_{1}_{2}.txt -b {0}/positive_classified_pairs_{1}_{2}.bin".format(GENERAL_FEATURES_PATH, lang1, lang2))
             handleCommand(formatSVMCommand)
 
 
 def organizeOutputs():
-    combinePairsCommand = "cat {0}/positive_classified_pairs* > {0}/positive_classified_pairs_all_langs.txt".format(GENERAL_FEATURES_PATH)
+    combinePairsCommand = ("./ClassifiedPairsFile.py -m -o {0}/positive_classified_pairs_all_langs.bin "
+                           "{0}/positive_classified_pairs_*.bin".format(GENERAL_FEATURES_PATH))
     handleCommand(combinePairsCommand)
 
 
@@ -73,6 +93,7 @@ parser = optparse.OptionParser()
 
 parser.add_option('-p', action='store_true', dest='parallel', help="use flag if want to featurize in parallel.", default=False)
 parser.add_option('-d', action='store_true', dest='debug', help="use flag if want to just print the commands that woudl be executed.", default=False)
+parser.add_option('-s', action='store_true', dest='streaming', help="use flag if want to featurize, classify and filter the pairs in one stage.", default=False)
 options, args = parser.parse_args()
 
 if options.debug:
@@ -82,10 +103,16 @@ else:
 
 
 
-if options.parallel:
-    featurizeInParallel()
+if options.streaming:
+    if options.parallel:
+        classifyInParallel()
+    else:
+        classifySequential()
 else:
-   featurizeSequential()
-classify()
-formatClassifiedPairs()
+    if options.parallel:
+        featurizeInParallel()
+    else:
+       featurizeSequential()
+    classify()
+    formatClassifiedPairs()
 organizeOutputs()
@@ -29,18 +29,9 @@ handleCommand(trainingPairsCommand)
 
 
 
-prepareCommand = ("./createPreparedALINEFileForExamples.py -i {0}/training_pairs_polynesian.txt "
-                  "-o {0}/preparedALINEFile_training_pairs_polynesian.txt".format(OUTPUT_PATH))
-handleCommand(prepareCommand)
-nusimilCommand = "time cat {0}/preparedALINEFile_training_pairs_polynesian.txt | ./nusimil > {0}/nusimilOutput_training_pairs_polynesian.txt".format(OUTPUT_PATH)
-handleCommand(nusimilCommand)
-removeLinesCommand = "time sed -i -e '1,2d' {0}/nusimilOutput_training_pairs_polynesian.txt".format(OUTPUT_PATH) # get rid of first 2 lines since they are not needed
-handleCommand(removeLinesCommand)
-writeBinaryCommand = ("./createAlignmentFeaturesFromNusimilOutput.py -n {0}/nusimilOutput_training_pairs_polynesian.txt " 
-                      "-p {0}/preparedALINEFile_training_pairs_polynesian.txt -o {0}/alignment_features_training_pairs_polynesian.bin".format(OUTPUT_PATH))
-handleCommand(writeBinaryCommand)
-removeCommand = "rm {0}/prepared* {0}/nusimil*".format(OUTPUT_PATH)
-handleCommand(removeCommand)
+alignmentCommand = ("./createAlignmentFeaturesForExamples.py -i {0}/training_pairs_polynesian.txt "
+                    "-o {0}/alignment_features_training_pairs_polynesian.bin".format(OUTPUT_PATH))
+handleCommand(alignmentCommand)
 
 
 
@@ -14,7 +14,7 @@ CLUSTERS_PATH = "../Output/SubstringClusters"
 
 
 def clusterWithSubstringScores():
-    clusterCommand = ("./clusterByScores.py -p {0}/positive_classified_pairs_all_langs.txt -l --sp {1}/substring_positive_classified_pairs_all_langs.txt "
+    clusterCommand = ("./clusterByScores.py -p {0}/positive_classified_pairs_all_langs.bin -l --sp {1}/substring_positive_classified_pairs_all_langs.bin "
                       "--progress -t 0 -c {2}/clusters_0.35Threshold_WithSubstring.txt --noSameLang".format(GENERAL_FEATURES_PATH, SUBSTRING_FEATURES_PATH, CLUSTERS_PATH))
     handleCommand(clusterCommand)
 
@@ -3,13 +3,18 @@
 # this script runs the necessary files to create the substring features for each Algonquian language pair and then
 # classifies each pair using the specific substring models that were trained on each language pair
 # use the -p argument for parallelizing. Otherwise, it is run sequential and takes longer.
+# use the --hashed argument for the models trained with script_SubstringModels.py --hashed (with the same --hashDimension). The pairs are then
+# featurized without the feature dicts, scored with SVMLightModel.py rather than svm_classify, and written to their own path
 
 
 import handleCommand
+from SubstringFeaturizer import DEFAULT_HASH_DIMENSION
 
 GENERAL_FEATURES_PATH = "../Output/GeneralFeatures"
 SUBSTRING_FEATURES_PATH = "../Output/SubstringFeatures"
 MODEL_PATH = "../Output/SubstringModels"
+HASHED_SUBSTRING_FEATURES_PATH = "../Output/SubstringFeaturesHashed"
+HASHED_MODEL_PATH = "../Output/SubstringModelsHashed"
 
 langTuples = [("cree", "C"), ("fox", "F"), ("meno", "M"), ("oji", "O")]
 
@@ -27,14 +32,22 @@ def createSubstringTestingPairs():
                 sameLang = "-s"
             else:
                 sameLang = ""
-            createCommand = ("./createExamplePairsFromClassifiedPairs.py -c {0}/positive_classified_pairs_{2}_{3}.txt " 
+            createCommand = ("./createExamplePairsFromClassifiedPairs.py -c {0}/positive_classified_pairs_{2}_{3}.bin " 
                              " -o {1}/word_pairs_{2}_{3}.txt -n {1}/no_definition_pairs_{2}_{3}.txt {4}".format(GENERAL_FEATURES_PATH, SUBSTRING_FEATURES_PATH, lang1, lang2, sameLang ))
             handleCommand(createCommand)
 
 
+def getFeatureNumberingOptions(featureDictOptions):
+    # the options of runSubstringFeaturizerOnExamplePairs.py for how the features are numbered: by hashing them into the same numbers for
+    # every language pair with --hashed, and otherwise by the given feature dict options
+    if options.hashed:
+        return "--hashed --hashDimension {0}".format(options.hashDimension)
+    return featureDictOptions
+
+
 def featurizeSubstringTestingPairsInParallel():
-    featurizeCommand = ("./runSubstringFeaturizerOnExamplePairs.py  --parallelize --testing --outputPath {0} --inputPath {0} --featureDictPath {1} "
-                        "".format(SUBSTRING_FEATURES_PATH, MODEL_PATH ))
+    featurizeCommand = ("./runSubstringFeaturizerOnExamplePairs.py  --parallelize --testing --outputPath {0} --inputPath {0} {1} "
+                        "".format(SUBSTRING_FEATURES_PATH, getFeatureNumberingOptions("--featureDictPath {0}".format(MODEL_PATH)) ))
     handleCommand(featurizeCommand)
 
 
@@ -45,22 +58,26 @@ def featurizeSubstringTestingPairsSequential():
         for j in range(i, len(langTuples)):
             otherTuple = langTuples[j]
             lang2, acc2 = otherTuple
-            featurizeTrainCommand = ("./runSubstringFeaturizerOnExamplePairs.py --testing -i {0}/no_definition_pairs_{2}_{3}.txt -f {1}/feature_dict_{2}_{3}.txt "
-                                     " -o {0}/substring_feature_values_{2}_{3}.txt".format(SUBSTRING_FEATURES_PATH, MODEL_PATH, lang1, lang2))
+            featureDictOptions = "-f {0}/feature_dict_{1}_{2}.txt".format(MODEL_PATH, lang1, lang2)
+            featurizeTrainCommand = ("./runSubstringFeaturizerOnExamplePairs.py --testing -i {0}/no_definition_pairs_{1}_{2}.txt {3} "
+                                     " -o {0}/substring_feature_values_{1}_{2}.txt".format(SUBSTRING_FEATURES_PATH, lang1, lang2,
+                                                                                           getFeatureNumberingOptions(featureDictOptions)))
             handleCommand(featurizeTrainCommand)
         
 
 
 def classifySubstringTestingPairs():
     # we have the features, so now can used the learned model to classify these features
+    # svm_classify would read the hashed models too, but SVMLightModel.py adds up their weights once rather than for every pair
+    classifier = "./SVMLightModel.py" if options.hashed else "svm_classify"
     for i, langTuple in enumerate(langTuples):
         lang1, acc1 = langTuple
         for j in range(i, len(langTuples)):
             otherTuple = langTuples[j]
             lang2, acc2 = otherTuple
 
-            classifyCommand = ("svm_classify {0}/substring_feature_values_{2}_{3}.txt {1}/substring_model_{2}_{3}.txt "
-                               "{0}/substring_predictions_{2}_{3}.txt".format(SUBSTRING_FEATURES_PATH, MODEL_PATH, lang1, lang2))
+            classifyCommand = ("{4} {0}/substring_feature_values_{2}_{3}.txt {1}/substring_model_{2}_{3}.txt "
+                               "{0}/substring_predictions_{2}_{3}.txt".format(SUBSTRING_FEATURES_PATH, MODEL_PATH, lang1, lang2, classifier))
             handleCommand(classifyCommand)
 
 
@@ -74,13 +91,13 @@ def formatOutputSubstringTestingPairs():
             otherTuple = langTuples[j]
             lang2, acc2 = otherTuple
             formatCommand = ("./formatSvmOutput.py -s {0}/substring_predictions_{1}_{2}.txt -p {0}/word_pairs_{1}_{2}.txt -f {0}/substring_feature_values_{1}_{2}.txt "  
-                             " > {0}/substring_positive_classified_pairs_{1}_{2}.txt".format(SUBSTRING_FEATURES_PATH, lang1, lang2))
+                             " -b {0}/substring_positive_classified_pairs_{1}_{2}.bin".format(SUBSTRING_FEATURES_PATH, lang1, lang2))
             handleCommand(formatCommand)
 
 
 def combineClassifiedSubstringTestingPairs():
-    combineFilesCommand = ("cat {0}/substring_positive_classified_pairs_*.txt "  
-                           " > {0}/substring_positive_classified_pairs_all_langs.txt".format(SUBSTRING_FEATURES_PATH))
+    combineFilesCommand = ("./ClassifiedPairsFile.py -m -o {0}/substring_positive_classified_pairs_all_langs.bin "
+                           "{0}/substring_positive_classified_pairs_*.bin".format(SUBSTRING_FEATURES_PATH))
     handleCommand(combineFilesCommand)
 
 
@@ -90,6 +107,10 @@ parser = optparse.OptionParser()
 
 parser.add_option('-p', action='store_true', dest='parallel', help="use flag if want to featurize in parallel.", default=False)
 parser.add_option('-d', action='store_true', dest='debug', help="use flag if want to just print the commands that woudl be executed.", default=False)
+parser.add_option('--hashed', action='store_true', dest='hashed', help="use flag if the substring models were trained with hashed features.",
+                  default=False)
+parser.add_option('--hashDimension', action='store', dest='hashDimension', type='int', help="the number of feature numbers the models hashed into. "
+                  "default = {0}".format(DEFAULT_HASH_DIMENSION), default=DEFAULT_HASH_DIMENSION)
 options, args = parser.parse_args()
 
 if options.debug:
@@ -97,6 +118,10 @@ if options.debug:
 else:
     handleCommand = handleCommand.handleCommandPrintAndExecute
 
+if options.hashed:
+    SUBSTRING_FEATURES_PATH = HASHED_SUBSTRING_FEATURES_PATH
+    MODEL_PATH = HASHED_MODEL_PATH
+
 createSubstringTestingPairs()
 if options.parallel:
     featurizeSubstringTestingPairsInParallel()
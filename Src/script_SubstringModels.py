@@ -2,11 +2,15 @@
 
 # this script runs the necessary files to train the specific substring models for each Algonquian language pair.
 # use the -p argument for parallelizing. Otherwise, it is run sequential and takes longer.
+# use the --hashed argument to number the substring features by hashing them rather than with a feature dict for each language pair.
+# the hashed models are written to their own path, so both kinds can be trained and then evaluated side by side (see script_SubstringFeatures.py)
 
 import handleCommand
+from SubstringFeaturizer import DEFAULT_HASH_DIMENSION
 
 BASELINES_PATH = "../Output/Baselines"
 OUTPUT_PATH = "../Output/SubstringModels"
+HASHED_OUTPUT_PATH = "../Output/SubstringModelsHashed"
 
 
 langTuples = [("cree", "C"), ("fox", "F"), ("meno", "M"), ("oji", "O")]
@@ -24,10 +28,18 @@ def createSubstringTrainingPairs():
             # -l uses language dictionaies for negative examples, rather than only creating negative examples from the input file
             handleCommand(trainCreateCommand)
 
+
+def getFeatureNumberingOptions(featureDictOptions):
+    # the options of runSubstringFeaturizerOnExamplePairs.py for how the features are numbered: by hashing them into the same numbers for
+    # every language pair with --hashed, and otherwise by the given feature dict options
+    if options.hashed:
+        return "--hashed --hashDimension {0}".format(options.hashDimension)
+    return featureDictOptions
+
                 
 def featurizeSubstringTrainingPairsInParallel():
-    featurizeCommand = ("./runSubstringFeaturizerOnExamplePairs.py  --parallelize --training --outputPath {0} --inputPath {0} --featureDictPath {0} "
-                        "".format(OUTPUT_PATH ))
+    featurizeCommand = ("./runSubstringFeaturizerOnExamplePairs.py  --parallelize --training --outputPath {0} --inputPath {0} {1} "
+                        "".format(OUTPUT_PATH, getFeatureNumberingOptions("--featureDictPath {0}".format(OUTPUT_PATH)) ))
     handleCommand(featurizeCommand)
 
 
@@ -37,8 +49,9 @@ def featurizeSubstringTrainingPairsSequential():
         for j in range(i, len(langTuples)):
             otherTuple = langTuples[j]
             lang2, acc2 = otherTuple
-            featurizeTrainCommand = ("./runSubstringFeaturizerOnExamplePairs.py --training -i {0}/no_definition_pairs_{1}_{2}.txt -f {0}/feature_dict_{1}_{2}.txt "
-                                     " -o {0}/substring_feature_values_{1}_{2}.txt".format(OUTPUT_PATH, lang1, lang2))
+            featureDictOptions = "-f {0}/feature_dict_{1}_{2}.txt".format(OUTPUT_PATH, lang1, lang2)
+            featurizeTrainCommand = ("./runSubstringFeaturizerOnExamplePairs.py --training -i {0}/no_definition_pairs_{1}_{2}.txt {3} "
+                                     " -o {0}/substring_feature_values_{1}_{2}.txt".format(OUTPUT_PATH, lang1, lang2, getFeatureNumberingOptions(featureDictOptions)))
             handleCommand(featurizeTrainCommand)
 
 
@@ -59,6 +72,10 @@ parser = optparse.OptionParser()
 
 parser.add_option('-p', action='store_true', dest='parallel', help="use flag if want to featurize in parallel.", default=False)
 parser.add_option('-d', action='store_true', dest='debug', help="use flag if want to just print the commands that woudl be executed.", default=False)
+parser.add_option('--hashed', action='store_true', dest='hashed', help="use flag if want to hash the substring features rather than use feature dicts.",
+                  default=False)
+parser.add_option('--hashDimension', action='store', dest='hashDimension', type='int', help="the number of feature numbers to hash into with --hashed. "
+                  "default = {0}".format(DEFAULT_HASH_DIMENSION), default=DEFAULT_HASH_DIMENSION)
 options, args = parser.parse_args()
 
 if options.debug:
@@ -66,6 +83,9 @@ if options.debug:
 else:
     handleCommand = handleCommand.handleCommandPrintAndExecute
 
+if options.hashed:
+    OUTPUT_PATH = HASHED_OUTPUT_PATH
+
 
 createSubstringTrainingPairs()
 if options.parallel: